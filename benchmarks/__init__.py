@@ -0,0 +1,5 @@
+"""
+Banco de pruebas de rendimiento reproducible y sin conexión.
+
+Uso: python -m benchmarks --help
+"""
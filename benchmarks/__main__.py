@@ -0,0 +1,90 @@
+"""
+Punto de entrada del banco de pruebas: python -m benchmarks
+"""
+import sys
+import json
+import logging
+import argparse
+
+from benchmarks.run import (
+    run_benchmarks, check_startup, check_wer_drift, compare, save_report, STARTUP_BUDGET_SECONDS
+)
+
+STAGES = ("startup", "download", "decode", "model", "engine", "output")
+
+def parse_list(value, cast=str):
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Banco de pruebas de rendimiento sin conexión")
+    parser.add_argument("--stages", type=parse_list, default=list(STAGES),
+                        help=f"Etapas a medir, separadas por comas (por defecto: {','.join(STAGES)})")
+    parser.add_argument("--durations", type=lambda v: parse_list(v, float), default=[10.0, 60.0, 300.0],
+                        help="Duraciones en segundos de los audios sintéticos (por defecto: 10,60,300)")
+    parser.add_argument("--models", type=parse_list, default=["tiny", "base"],
+                        help="Modelos Whisper a medir, solo si ya están descargados (por defecto: tiny,base)")
+    parser.add_argument("--inference-durations", type=lambda v: parse_list(v, float), default=None,
+                        help="Duraciones usadas en la inferencia (por defecto: la más corta)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Repeticiones de cada medida; se guarda la mediana (por defecto: 3)")
+    parser.add_argument("--workdir", help="Directorio para los audios y salidas de prueba (por defecto: temporal)")
+    parser.add_argument("--output", "-o", help="Archivo JSON de resultados (por defecto: benchmarks/results/bench_<fecha>.json)")
+    parser.add_argument("--compare", help="Informe JSON anterior con el que comparar")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Aumento relativo de tiempo considerado regresión (por defecto: 0.2)")
+    parser.add_argument("--engine-audio", nargs="+",
+                        help="Audios (wav, npy o mp3) con los que medir la deriva de WER de int8 (por defecto: los sintéticos)")
+    parser.add_argument("--max-wer-drift", type=float, default=0.05,
+                        help="Deriva máxima de WER de int8 respecto a fp32 (por defecto: 0.05)")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_SECONDS,
+                        help=f"Tiempo máximo de arranque de la CLI en segundos (por defecto: {STARTUP_BUDGET_SECONDS})")
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    logger = logging.getLogger("vimeo_transcriber")
+    
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        logger.error(f"Etapas desconocidas: {', '.join(sorted(unknown))}")
+        return 2
+    
+    inference_durations = args.inference_durations or [min(args.durations)]
+    report = run_benchmarks(
+        args.stages, args.durations, args.models, inference_durations,
+        args.repeat, args.workdir, args.engine_audio
+    )
+    path = save_report(report, args.output)
+    
+    for stage, entries in report["results"].items():
+        for entry in entries:
+            if "skipped" in entry:
+                logger.info(f"{entry['name']}: omitido ({entry['skipped']})")
+            elif "wer_drift" in entry:
+                logger.info(f"{entry['name']}: {entry['wer_drift']:.2%}")
+            else:
+                extra = f", RTF {entry['realtime_factor']:.3f}" if "realtime_factor" in entry else ""
+                logger.info(f"{entry['name']}: {entry['seconds']:.4f} s{extra}")
+    logger.info(f"Resultados guardados en: {path}")
+    
+    problems = check_startup(report, args.startup_budget)
+    for problem in problems:
+        logger.error(f"Arranque lento: {problem}")
+    for name, drift in check_wer_drift(report, args.max_wer_drift):
+        logger.error(f"{name}: la deriva de WER ({drift:.2%}) supera el máximo ({args.max_wer_drift:.2%})")
+        problems.append(name)
+    
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for name, before, after in regressions:
+            logger.error(f"Regresión en {name}: {before:.4f} s -> {after:.4f} s")
+        if regressions:
+            return 1
+        logger.info("Sin regresiones respecto al informe anterior")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Servidor HTTP local y sustituto de yt_dlp.YoutubeDL para medir la descarga sin conexión.
+"""
+import shutil
+import threading
+import urllib.request
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class LocalFileServer:
+    """Sirve un directorio por HTTP en un puerto libre de localhost."""
+    
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._server = None
+        self._thread = None
+    
+    def __enter__(self):
+        handler = partial(_QuietHandler, directory=str(self.directory))
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        return False
+    
+    def url(self, name):
+        return f"http://127.0.0.1:{self._server.server_port}/{name}"
+
+class StubYoutubeDL:
+    """
+    Sustituto mínimo de yt_dlp.YoutubeDL.
+    
+    Descarga la URL (servida por LocalFileServer) a la plantilla `outtmpl`
+    y devuelve un `info` con la misma forma que el de yt-dlp. No recodifica:
+    el archivo servido debe estar ya en el formato que pide el postprocesador.
+    """
+    
+    def __init__(self, options):
+        self.options = options
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+    
+    def extract_info(self, url, download=True):
+        name = url.rsplit("/", 1)[-1]
+        stem, ext = name.rsplit(".", 1)
+        info = {"id": stem, "title": stem, "ext": ext, "duration": None}
+        if not download:
+            return info
+        
+        path = Path(self.options["outtmpl"].replace("%(title)s", stem).replace("%(id)s", stem).replace("%(ext)s", ext))
+        with urllib.request.urlopen(url) as response, open(path, "wb") as f:
+            shutil.copyfileobj(response, f, 1 << 20)
+        
+        for hook in self.options.get("progress_hooks", []):
+            hook({"status": "finished", "filename": str(path)})
+        info["requested_downloads"] = [{"filepath": str(path)}]
+        return info
@@ -0,0 +1,123 @@
+"""
+Generación de audios sintéticos con características parecidas a la voz.
+"""
+import shutil
+import subprocess
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from config import settings
+
+# Formantes (F1, F2, F3) aproximados de las vocales del español
+VOWEL_FORMANTS = [
+    (800, 1200, 2500),  # a
+    (450, 1900, 2600),  # e
+    (300, 2300, 3000),  # i
+    (450, 900, 2400),   # o
+    (300, 800, 2300),   # u
+]
+
+def synthesize_speech(duration, sample_rate=None, seed=0):
+    """
+    Genera una señal con estructura de habla: sílabas sonoras con tono y
+    formantes variables, consonantes como ráfagas de ruido y pausas entre
+    palabras y frases.
+    
+    Args:
+        duration: Duración en segundos
+        sample_rate: Frecuencia de muestreo (por defecto settings.AUDIO_SAMPLE_RATE)
+        seed: Semilla para que el audio sea reproducible
+    
+    Returns:
+        Array float32 con las muestras en [-1, 1]
+    """
+    sample_rate = sample_rate or settings.AUDIO_SAMPLE_RATE
+    rng = np.random.default_rng(seed)
+    total = int(duration * sample_rate)
+    audio = np.zeros(total, dtype=np.float32)
+    
+    position = int(0.3 * sample_rate)
+    while position < total:
+        # Palabra de 1 a 4 sílabas
+        for _ in range(rng.integers(1, 5)):
+            # Consonante: ráfaga corta de ruido filtrado
+            consonant = int(rng.uniform(0.03, 0.08) * sample_rate)
+            end = min(total, position + consonant)
+            noise = rng.standard_normal(end - position).astype(np.float32)
+            audio[position:end] += 0.05 * np.diff(noise, prepend=0)
+            position = end
+            
+            # Vocal: armónicos de F0 ponderados por los formantes
+            vowel = int(rng.uniform(0.08, 0.25) * sample_rate)
+            end = min(total, position + vowel)
+            n = end - position
+            if n <= 0:
+                break
+            t = np.arange(n) / sample_rate
+            f0 = rng.uniform(100, 220) * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(2, 6) * t))
+            phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+            formants = VOWEL_FORMANTS[rng.integers(len(VOWEL_FORMANTS))]
+            signal = np.zeros(n)
+            for harmonic in range(1, int(3500 / f0.max()) + 1):
+                freq = harmonic * f0.mean()
+                gain = sum(np.exp(-((freq - f) / 120) ** 2) for f in formants) + 0.02
+                signal += gain * np.sin(harmonic * phase)
+            envelope = np.sin(np.pi * np.arange(n) / n) ** 0.5
+            audio[position:end] += (0.3 * envelope * signal / max(1e-6, np.abs(signal).max())).astype(np.float32)
+            position = end
+        
+        # Pausa entre palabras y, a veces, entre frases
+        pause = rng.uniform(0.05, 0.2) if rng.random() > 0.15 else rng.uniform(0.4, 1.0)
+        position += int(pause * sample_rate)
+    
+    # Ruido de fondo
+    audio += 0.003 * rng.standard_normal(total).astype(np.float32)
+    return np.clip(audio, -1, 1)
+
+def write_wav(path, audio, sample_rate=None):
+    """Guarda un array float32 como WAV PCM de 16 bits mono."""
+    sample_rate = sample_rate or settings.AUDIO_SAMPLE_RATE
+    pcm = (np.clip(audio, -1, 1) * 32767).astype("<i2")
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+    return Path(path)
+
+def encode_mp3(wav_path, mp3_path, quality=None):
+    """Codifica un WAV a MP3 con ffmpeg. Devuelve None si ffmpeg no está disponible."""
+    if shutil.which("ffmpeg") is None:
+        return None
+    subprocess.run(
+        ["ffmpeg", "-nostdin", "-y", "-loglevel", "error", "-i", str(wav_path),
+         "-b:a", f"{quality or settings.AUDIO_QUALITY}k", str(mp3_path)],
+        check=True
+    )
+    return Path(mp3_path)
+
+def build_fixtures(directory, durations, seed=0):
+    """
+    Crea los audios de prueba de cada duración en los formatos disponibles.
+    
+    Returns:
+        Diccionario {duración: {"wav": ruta, "npy": ruta, "mp3": ruta o None}}
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    fixtures = {}
+    for duration in durations:
+        stem = directory / f"speech_{int(duration)}s"
+        wav_path = stem.with_suffix(".wav")
+        npy_path = stem.with_suffix(".npy")
+        if not (wav_path.exists() and npy_path.exists()):
+            audio = synthesize_speech(duration, seed=seed + int(duration))
+            write_wav(wav_path, audio)
+            np.save(npy_path, audio)
+        mp3_path = stem.with_suffix(".mp3")
+        if not mp3_path.exists():
+            mp3_path = encode_mp3(wav_path, mp3_path)
+        fixtures[duration] = {"wav": wav_path, "npy": npy_path, "mp3": mp3_path}
+    return fixtures
@@ -0,0 +1,413 @@
+"""
+Etapas del banco de pruebas: descarga, decodificación de audio, carga de
+modelo, inferencia y escritura de salidas.
+"""
+import os
+import json
+import time
+import random
+import logging
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from config import settings
+from benchmarks.fixtures import build_fixtures
+from benchmarks.fileserver import LocalFileServer, StubYoutubeDL
+
+logger = logging.getLogger("vimeo_transcriber")
+
+# Dependencias que no deben importarse al arrancar la CLI
+HEAVY_MODULES = ("torch", "whisper", "yt_dlp")
+# Segundos como máximo para arrancar la CLI (también lo comprueba tests/test_startup.py)
+STARTUP_BUDGET_SECONDS = 1.0
+
+def _cpu_seconds():
+    """Tiempo de CPU de este proceso y de sus hijos (ffmpeg)."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def measure(func, repeat):
+    """
+    Ejecuta `func` varias veces.
+    
+    Returns:
+        Tupla (diccionario con tiempos de reloj y de CPU, último valor devuelto)
+    """
+    wall, cpu = [], []
+    value = None
+    for _ in range(repeat):
+        cpu_start = _cpu_seconds()
+        start = time.perf_counter()
+        value = func()
+        wall.append(time.perf_counter() - start)
+        cpu.append(_cpu_seconds() - cpu_start)
+    return {
+        "seconds": statistics.median(wall),
+        "min_seconds": min(wall),
+        "cpu_seconds": statistics.median(cpu),
+        "runs": len(wall),
+    }, value
+
+def bench_startup(repeat):
+    """Arranque de la CLI en un intérprete nuevo y dependencias pesadas importadas al cargar main."""
+    def run_python(*args):
+        return subprocess.run(
+            [sys.executable, *args], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout
+    
+    check = (
+        "import sys, json, main; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    commands = {
+        "startup_python": ["-c", "pass"],
+        "startup_import_main": ["-c", check],
+        "startup_help": ["main.py", "--help"],
+    }
+    results = []
+    for name, args in commands.items():
+        stats, output = measure(lambda: run_python(*args), repeat)
+        stats["name"] = name
+        if name == "startup_import_main":
+            stats["heavy_modules"] = json.loads(output)
+        results.append(stats)
+    return results
+
+def check_startup(report, budget):
+    """
+    Comprueba que la CLI arranca dentro del presupuesto de tiempo y sin
+    importar dependencias pesadas.
+    
+    Returns:
+        Lista de mensajes con los problemas encontrados
+    """
+    problems = []
+    for entry in report["results"].get("startup", []):
+        if entry.get("heavy_modules"):
+            problems.append(f"{entry['name']}: importa {', '.join(entry['heavy_modules'])}")
+        if entry["name"] != "startup_python" and entry["seconds"] > budget:
+            problems.append(f"{entry['name']}: {entry['seconds']:.3f} s (máximo {budget} s)")
+    return problems
+
+def bench_download(fixtures, workdir, repeat, workers=(1, 4)):
+    """Descarga de los audios servidos en local con el VimeoDownloader real y un YoutubeDL sustituto."""
+    from src.downloader import VimeoDownloader
+    from src.vimeo import MetadataCache
+    
+    results = []
+    original_audio_dir = settings.AUDIO_DIR
+    served = {
+        "mp3": [f["mp3"] for f in fixtures.values() if f["mp3"]],
+        "wav": [f["wav"] for f in fixtures.values()],
+        "npy": [f["wav"] for f in fixtures.values()],  # Se sirve WAV y se convierte a npy
+    }
+    try:
+        settings.AUDIO_DIR = Path(workdir) / "audios"
+        settings.AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+        for audio_format, files in served.items():
+            if not files:
+                results.append({"name": f"download_{audio_format}", "skipped": "ffmpeg no disponible"})
+                continue
+            total_bytes = sum(os.path.getsize(f) for f in files)
+            with LocalFileServer(Path(files[0]).parent) as server:
+                urls = [server.url(Path(f).name) for f in files]
+                for n_workers in workers:
+                    downloader = VimeoDownloader(
+                        workers=n_workers, rate_limit=0,
+                        ydl_factory=StubYoutubeDL, audio_format=audio_format,
+                        metadata_cache=MetadataCache(Path(workdir) / "metadata")
+                    )
+                    
+                    def run():
+                        paths = downloader.download_batch(urls)
+                        for path in paths:
+                            os.remove(path)
+                        return paths
+                    
+                    stats, _ = measure(run, repeat)
+                    stats.update({
+                        "name": f"download_{audio_format}_w{n_workers}",
+                        "files": len(urls),
+                        "bytes": total_bytes,
+                        "mb_per_second": total_bytes / stats["seconds"] / 1e6,
+                    })
+                    results.append(stats)
+    finally:
+        settings.AUDIO_DIR = original_audio_dir
+    return results
+
+def bench_decode(fixtures, repeat):
+    """Decodificación a muestras de 16 kHz: MP3 con ffmpeg frente a PCM mapeado en memoria."""
+    import whisper
+    from src.audio import load_pcm
+    
+    def ffmpeg_load(path):
+        return whisper.load_audio(str(path))
+    
+    def pcm_load(path):
+        # Forzar la lectura completa para no medir solo el mapeo
+        return float(np.asarray(load_pcm(path)).sum())
+    
+    results = []
+    ffmpeg_available = shutil.which("ffmpeg") is not None
+    for duration, files in fixtures.items():
+        candidates = [
+            ("mp3_ffmpeg", files["mp3"], ffmpeg_load),
+            ("wav_ffmpeg", files["wav"], ffmpeg_load),
+            ("wav_mmap", files["wav"], pcm_load),
+            ("npy_mmap", files["npy"], pcm_load),
+        ]
+        for name, path, loader in candidates:
+            entry = {"name": f"decode_{name}_{int(duration)}s", "duration": duration}
+            if path is None or (loader is ffmpeg_load and not ffmpeg_available):
+                entry["skipped"] = "ffmpeg no disponible"
+                results.append(entry)
+                continue
+            stats, _ = measure(lambda: loader(path), repeat)
+            size = os.path.getsize(path)
+            entry.update(stats)
+            entry.update({
+                "bytes": size,
+                "bytes_per_hour": size / duration * 3600,
+                "realtime_factor": stats["seconds"] / duration,
+            })
+            results.append(entry)
+    return results
+
+def _model_available(model_name, download_root):
+    """Comprueba si el modelo está descargado, para no acceder a la red."""
+    import whisper
+    url = whisper._MODELS.get(model_name)
+    return url is not None and (Path(download_root) / os.path.basename(url)).exists()
+
+def bench_models(fixtures, models, inference_durations, repeat, download_root=None):
+    """Carga de cada modelo y factor de tiempo real de la inferencia."""
+    import whisper
+    import torch
+    
+    download_root = download_root or os.path.join(os.path.expanduser("~"), ".cache", "whisper")
+    results = []
+    for model_name in models:
+        if not _model_available(model_name, download_root):
+            results.append({"name": f"model_load_{model_name}", "skipped": "modelo no descargado"})
+            continue
+        
+        stats, model = measure(lambda: whisper.load_model(model_name, device="cpu", download_root=download_root), 1)
+        stats.update({"name": f"model_load_{model_name}", "torch_threads": torch.get_num_threads()})
+        results.append(stats)
+        
+        for duration in inference_durations:
+            audio = np.load(fixtures[duration]["npy"])
+            stats, transcription = measure(
+                lambda: model.transcribe(audio, language=settings.DEFAULT_LANGUAGE, verbose=None, fp16=False),
+                repeat
+            )
+            stats.update({
+                "name": f"inference_{model_name}_{int(duration)}s",
+                "duration": duration,
+                "realtime_factor": stats["seconds"] / duration,
+                "segments": len(transcription["segments"]),
+            })
+            results.append(stats)
+        del model
+    return results
+
+def _model_bytes(model):
+    """Tamaño de los pesos del modelo serializados."""
+    import io
+    import torch
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+def bench_engines(fixtures, models, repeat, audio_files=None, download_root=None):
+    """
+    Compara los motores de inferencia: tiempo de carga, tamaño de los pesos,
+    factor de tiempo real y deriva de la tasa de error por palabras (WER) de
+    int8 respecto a fp32 sobre un conjunto fijo de audios.
+    """
+    from src.engines import ENGINES, load_engine_model, word_error_rate
+    from src.transcriber import WhisperTranscriber
+    
+    download_root = download_root or os.path.join(os.path.expanduser("~"), ".cache", "whisper")
+    if audio_files:
+        audio_files = [Path(f) for f in audio_files]
+    else:
+        audio_files = [files["npy"] for files in fixtures.values()]
+    loader = WhisperTranscriber()
+    audios = {path.name: np.asarray(loader.load_audio(path)) for path in audio_files}
+    total_seconds = sum(len(audio) for audio in audios.values()) / settings.AUDIO_SAMPLE_RATE
+    
+    results = []
+    for model_name in models:
+        if not _model_available(model_name, download_root):
+            results.append({"name": f"engine_{model_name}", "skipped": "modelo no descargado"})
+            continue
+        
+        texts = {}
+        for engine in ENGINES:
+            stats, model = measure(lambda: load_engine_model(model_name, engine), 1)
+            stats.update({"name": f"engine_load_{model_name}_{engine}", "model_bytes": _model_bytes(model)})
+            results.append(stats)
+            
+            def run():
+                return {
+                    name: model.transcribe(audio, language=settings.DEFAULT_LANGUAGE, verbose=None, fp16=False)["text"]
+                    for name, audio in audios.items()
+                }
+            
+            stats, texts[engine] = measure(run, repeat)
+            stats.update({
+                "name": f"engine_inference_{model_name}_{engine}",
+                "audio_seconds": total_seconds,
+                "realtime_factor": stats["seconds"] / total_seconds,
+            })
+            results.append(stats)
+            del model
+        
+        per_file = {name: word_error_rate(texts["fp32"][name], texts["int8"][name]) for name in audios}
+        results.append({
+            "name": f"engine_wer_drift_{model_name}",
+            "wer_drift": statistics.mean(per_file.values()),
+            "files": per_file,
+        })
+    return results
+
+def synthetic_transcription(n_segments, seed=0):
+    """Transcripción con la forma de la de Whisper y `n_segments` segmentos."""
+    rng = random.Random(seed)
+    words = ["la", "función", "lista", "valor", "índice", "cadena", "vamos", "a", "ver", "ejemplo"]
+    segments = []
+    start = 0.0
+    for i in range(n_segments):
+        text = " " + " ".join(rng.choice(words) for _ in range(rng.randint(4, 14)))
+        end = start + rng.uniform(1.5, 6.0)
+        segments.append({
+            "id": i, "seek": int(start * 100), "start": round(start, 3), "end": round(end, 3),
+            "text": text, "tokens": [rng.randint(50365, 51865) for _ in range(len(text) // 3)],
+            "temperature": 0.0, "avg_logprob": -0.3, "compression_ratio": 1.4, "no_speech_prob": 0.01,
+        })
+        start = end
+    return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": "es"}
+
+def bench_outputs(workdir, repeat, segment_counts=(200, 2000)):
+    """Escritura de los archivos de salida en distintas configuraciones."""
+    from src.writers import write_outputs
+    
+    modes = {
+        "all_default": {"formats": ["txt", "json", "vtt", "srt"]},
+        "all_compact_packed": {"formats": ["txt", "json", "vtt", "srt"], "compact_json": True, "json_tokens": "packed"},
+        "json_compact_drop": {"formats": ["json"], "compact_json": True, "json_tokens": "drop"},
+        "srt_only": {"formats": ["srt"]},
+    }
+    Path(workdir).mkdir(parents=True, exist_ok=True)
+    results = []
+    for n_segments in segment_counts:
+        transcription = synthetic_transcription(n_segments)
+        for mode, options in modes.items():
+            base_path = Path(workdir) / f"salida_{mode}_{n_segments}"
+            stats, output_files = measure(lambda: write_outputs(transcription, base_path, **options), repeat)
+            stats.update({
+                "name": f"output_{mode}_{n_segments}seg",
+                "segments": n_segments,
+                "bytes": sum(os.path.getsize(p) for p in output_files.values()),
+            })
+            results.append(stats)
+    return results
+
+def environment():
+    """Datos del entorno para poder comparar resultados entre máquinas y commits."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def run_benchmarks(stages, durations, models, inference_durations, repeat, workdir=None, engine_audio=None):
+    """
+    Ejecuta las etapas pedidas.
+    
+    Returns:
+        Diccionario con el entorno y los resultados de cada etapa
+    """
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="bench_"))
+    fixtures = build_fixtures(workdir / "fixtures", durations)
+    report = {"environment": environment(), "results": {}}
+    
+    if "startup" in stages:
+        logger.info("Etapa: arranque de la CLI")
+        report["results"]["startup"] = bench_startup(repeat)
+    if "download" in stages:
+        logger.info("Etapa: descarga")
+        report["results"]["download"] = bench_download(fixtures, workdir, repeat)
+    if "decode" in stages:
+        logger.info("Etapa: decodificación de audio")
+        report["results"]["decode"] = bench_decode(fixtures, repeat)
+    if "model" in stages:
+        logger.info("Etapa: carga de modelo e inferencia")
+        report["results"]["model"] = bench_models(fixtures, models, inference_durations, repeat)
+    if "engine" in stages:
+        logger.info("Etapa: motores de inferencia (fp32 frente a int8)")
+        report["results"]["engine"] = bench_engines(fixtures, models, repeat, engine_audio)
+    if "output" in stages:
+        logger.info("Etapa: escritura de salidas")
+        report["results"]["output"] = bench_outputs(workdir / "salidas", repeat)
+    return report
+
+def check_wer_drift(report, max_drift):
+    """Devuelve los modelos cuya deriva de WER int8 frente a fp32 supera `max_drift`."""
+    return [
+        (entry["name"], entry["wer_drift"])
+        for entry in report["results"].get("engine", [])
+        if entry.get("wer_drift", 0) > max_drift
+    ]
+
+def compare(report, baseline, threshold):
+    """
+    Compara los tiempos con un informe anterior.
+    
+    Returns:
+        Lista de regresiones (nombre, segundos antes, segundos ahora)
+    """
+    previous = {
+        entry["name"]: entry["seconds"]
+        for entries in baseline.get("results", {}).values()
+        for entry in entries if "seconds" in entry
+    }
+    regressions = []
+    for entries in report["results"].values():
+        for entry in entries:
+            before = previous.get(entry["name"])
+            if before and "seconds" in entry and entry["seconds"] > before * (1 + threshold):
+                regressions.append((entry["name"], before, entry["seconds"]))
+    return regressions
+
+def save_report(report, output=None):
+    """Guarda el informe en JSON y devuelve su ruta."""
+    if output is None:
+        results_dir = settings.BASE_DIR / "benchmarks" / "results"
+        results_dir.mkdir(parents=True, exist_ok=True)
+        output = results_dir / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return Path(output)
@@ -12,18 +12,105 @@ LOGS_DIR = BASE_DIR / "logs"
 # Rutas de datos
 AUDIO_DIR = DATA_DIR / "audios"
 TRANSCRIPTION_DIR = DATA_DIR / "transcriptions"
+CACHE_DIR = DATA_DIR / "cache"
 URL_FILE = DATA_DIR / "urls.txt"
 
 # Configuración de Whisper
 WHISPER_MODEL = "base"  # opciones: "tiny", "base", "small", "medium", "large"
 DEFAULT_LANGUAGE = "es"  # Idioma por defecto para la transcripción
+TRANSCRIPTION_WORKERS = 1  # Procesos de transcripción (cada uno carga su modelo)
+INFERENCE_ENGINE = "fp32"  # "fp32" o "int8" (cuantización dinámica de las capas lineales, CPU)
+QUANTIZED_MODEL_DIR = DATA_DIR / "models"  # Pesos de los modelos cuantizados
+
+# División de audios largos en ventanas
+CHUNK_SECONDS = 0  # Duración de cada ventana (0 para no dividir)
+CHUNK_OVERLAP_SECONDS = 4  # Solapamiento entre ventanas consecutivas
+
+# Inferencia por lotes entre archivos (--batch-size)
+INFERENCE_BATCH_SIZE = 1  # Ventanas de 30 s decodificadas a la vez (1 para desactivar)
+BATCH_MAX_SECONDS = 600  # Los audios más largos se transcriben uno a uno
+
+# Transcripción incremental (--stream)
+STREAM_WINDOW_SECONDS = 30  # Duración de cada ventana que se escribe en disco al terminar
+
+# Configuración de los archivos de salida
+OUTPUT_FORMATS = ("txt", "json", "vtt", "srt")  # Formatos generados por defecto
+JSON_COMPACT = False  # JSON sin espacios ni indentación
+JSON_TOKENS = "full"  # Tokens de cada segmento en el JSON: "full", "packed" o "drop"
+WRITE_BUFFER_SIZE = 1024 * 1024  # Tamaño del búfer de escritura en bytes
+
+# Detección de voz antes de la inferencia (main.py --vad)
+VAD_ENABLED = False  # Transcribir solo los tramos con voz
+VAD_THRESHOLD_DB = 10  # dB sobre el ruido de fondo a partir de los que una trama puede ser voz
+VAD_MIN_SPEECH_SECONDS = 0.3  # Se descartan los tramos de voz más cortos
+VAD_MIN_SILENCE_SECONDS = 1.0  # Los silencios más cortos no cortan un tramo de voz
+VAD_PADDING_SECONDS = 0.3  # Margen que se añade a cada lado de los tramos de voz
+
+# Cascada de modelos (main.py --cascade-model): los segmentos dudosos del
+# modelo principal se re-transcriben con un modelo mayor
+CASCADE_MODEL = None  # Modelo mayor (None = sin cascada)
+CASCADE_LOGPROB_THRESHOLD = -0.8  # Log-probabilidad media por debajo de la cual se re-transcribe
+CASCADE_COMPRESSION_THRESHOLD = 2.2  # Razón de compresión (texto repetitivo) por encima de la cual se re-transcribe
+CASCADE_NO_SPEECH_THRESHOLD = 0.6  # Probabilidad de silencio por encima de la cual se re-transcribe
+CASCADE_MERGE_GAP_SECONDS = 1.0  # Los tramos dudosos más cercanos se re-transcriben juntos
+CASCADE_MARGIN_SECONDS = 0.3  # Audio extra a cada lado de un tramo para no cortar palabras
+
+# Índice de búsqueda de las transcripciones (main.py search)
+SEARCH_INDEX_PATH = DATA_DIR / "search.db"
+SEARCH_INDEX_ON_SAVE = True  # Indexar cada transcripción al guardarla
+
+# Configuración de metadatos de los videos
+METADATA_CACHE_DIR = DATA_DIR / "metadata"  # Resultados de extract_info por ID de video
+METADATA_TTL_SECONDS = 7 * 24 * 3600  # Validez de los metadatos guardados (0 = sin caducidad)
+
+# Configuración de la caché de transcripciones
+CACHE_MAX_BYTES = 1024 * 1024 * 1024  # Tamaño máximo de la caché (1 GB)
 
 # Configuración de yt-dlp
 AUDIO_FORMAT = "bestaudio"
-AUDIO_CODEC = "mp3"
+AUDIO_CODEC = "mp3"  # "mp3", "wav" (PCM 16 kHz mono) o "npy" (float32 16 kHz mono)
+AUDIO_EXTENSIONS = ("mp3", "wav", "npy")  # Formatos que se buscan en AUDIO_DIR
+AUDIO_SAMPLE_RATE = 16000  # Frecuencia de muestreo de entrada de Whisper
 AUDIO_QUALITY = "192"
+DOWNLOAD_WORKERS = 1  # Descargas simultáneas
+DOWNLOAD_RATE_LIMIT = 2.0  # Peticiones por segundo por host (0 para no limitar)
+
+# Configuración del servicio de transcripción (main.py serve)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+SERVER_MAX_MODELS = 2  # Modelos cargados a la vez; se descarga el usado hace más tiempo
+SERVER_MAX_JOBS = 1000  # Trabajos terminados que se recuerdan
+
+# Configuración del pipeline descarga -> transcripción
+PIPELINE_QUEUE_SIZE = 2  # Audios descargados que pueden esperar a ser transcritos
+
+# Vigilancia de AUDIO_DIR (main.py --watch)
+WATCH_SETTLE_SECONDS = 2  # Segundos sin cambios para dar un audio por terminado de escribir
+WATCH_POLL_SECONDS = 5  # Intervalo entre recorridos del directorio si no hay inotify
+WATCH_INOTIFY = True  # Usar inotify (Linux) en lugar de recorrer el directorio
+
+# Spool de audios descargados pendientes de transcribir
+SPOOL_DIR = None  # Directorio de descarga (None = AUDIO_DIR; p. ej. /dev/shm/vimeo para usar tmpfs)
+SPOOL_MAX_BYTES = 0  # Bytes de audio en espera como máximo (0 = sin límite)
+SPOOL_MAX_FILES = 0  # Audios en espera como máximo (0 = sin límite)
+
+# Cola de trabajos persistente compartida entre procesos y equipos (main.py --job-db)
+JOB_DB_PATH = None  # Ruta de la base de datos SQLite (None = sin cola persistente)
+JOB_LEASE_SECONDS = 600  # Caducidad de la concesión de una URL si su trabajador deja de renovarla
+JOB_MAX_ATTEMPTS = 3  # Intentos por URL antes de marcarla como fallida
+JOB_RETRY_SECONDS = 30  # Espera antes de reintentar una URL (se duplica en cada intento)
+JOB_POLL_SECONDS = 10  # Espera entre comprobaciones cuando las URLs restantes están concedidas a otros
+
+# Métricas (main.py --metrics-dir); None para no exportarlas
+METRICS_DIR = None
+
+# Perfilado (main.py --profile)
+PROFILE_DIR = LOGS_DIR / "profiles"  # Se crea un subdirectorio por ejecución
+PROFILE_TOP = 25  # Funciones o líneas que se muestran en cada informe
 
-# Crear directorios necesarios
-os.makedirs(AUDIO_DIR, exist_ok=True)
-os.makedirs(TRANSCRIPTION_DIR, exist_ok=True)
-os.makedirs(LOGS_DIR, exist_ok=True)
\ No newline at end of file
+def ensure_directories():
+    """Crea los directorios de trabajo. Se llama al arrancar, no al importar."""
+    os.makedirs(AUDIO_DIR, exist_ok=True)
+    os.makedirs(TRANSCRIPTION_DIR, exist_ok=True)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    os.makedirs(LOGS_DIR, exist_ok=True)
\ No newline at end of file
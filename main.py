@@ -12,9 +12,24 @@ from pathlib import Path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import settings
-from src.utils import setup_logger, Timer
+from src.utils import setup_logger, get_safe_filename, Timer
 from src.downloader import VimeoDownloader
 from src.transcriber import WhisperTranscriber
+from src.pipeline import BatchPipeline, SpoolPipeline
+from src.spool import AudioSpool
+from src.cache import TranscriptionCache
+from src.engines import ENGINES
+from src.metrics import metrics
+from src.vimeo import parse_vimeo_url, dedupe_urls, MetadataCache
+from src.profiling import Profiler, parse_profilers, PROFILERS
+from src import writers
+from src.writers import WRITERS
+
+# Modelos de Whisper de menor a mayor
+MODEL_SIZES = ["tiny", "base", "small", "medium", "large"]
+
+# Perfilador de la ejecución (--profile); None si no se ha pedido
+profiler = None
 
 def parse_arguments():
     """Procesa los argumentos de línea de comandos."""
@@ -32,7 +47,7 @@ def parse_arguments():
     )
     parser.add_argument(
         "--model", "-m",
-        choices=["tiny", "base", "small", "medium", "large"],
+        choices=MODEL_SIZES,
         default=settings.WHISPER_MODEL,
         help=f"Modelo de Whisper a utilizar (por defecto: {settings.WHISPER_MODEL})"
     )
@@ -61,8 +76,295 @@ def parse_arguments():
         action="store_true",
         help="Solo transcribir archivos de audio existentes, no descargar"
     )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=f"Vigilar {settings.AUDIO_DIR} y transcribir los audios nuevos a medida que llegan, "
+             "con el modelo cargado (Ctrl+C para terminar)"
+    )
+    parser.add_argument(
+        "--watch-settle",
+        type=float,
+        default=settings.WATCH_SETTLE_SECONDS,
+        help=f"Segundos sin cambios para dar un audio por terminado de escribir (por defecto: {settings.WATCH_SETTLE_SECONDS})"
+    )
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=settings.TRANSCRIPTION_WORKERS,
+        help=f"Procesos de transcripción, cada uno con su propio modelo (por defecto: {settings.TRANSCRIPTION_WORKERS})"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default=settings.INFERENCE_ENGINE,
+        help=f"Motor de inferencia; int8 cuantiza las capas lineales para CPU (por defecto: {settings.INFERENCE_ENGINE})"
+    )
+    parser.add_argument(
+        "--batch-size", "-b",
+        type=int,
+        default=settings.INFERENCE_BATCH_SIZE,
+        help=f"Ventanas de 30 s de varios archivos decodificadas en un mismo lote (por defecto: {settings.INFERENCE_BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--chunk-seconds",
+        type=int,
+        default=settings.CHUNK_SECONDS,
+        help="Dividir los audios largos en ventanas de N segundos transcritas en paralelo con --workers (por defecto: sin dividir)"
+    )
+    parser.add_argument(
+        "--chunk-overlap",
+        type=float,
+        default=settings.CHUNK_OVERLAP_SECONDS,
+        help=f"Solapamiento entre ventanas en segundos (por defecto: {settings.CHUNK_OVERLAP_SECONDS})"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Escribir TXT/VTT/SRT a medida que se transcribe cada ventana y reanudar archivos interrumpidos"
+    )
+    parser.add_argument(
+        "--formats",
+        default=",".join(settings.OUTPUT_FORMATS),
+        help=f"Formatos de salida separados por comas: {', '.join(WRITERS)} (por defecto: {','.join(settings.OUTPUT_FORMATS)})"
+    )
+    parser.add_argument(
+        "--compact-json",
+        action="store_true",
+        default=settings.JSON_COMPACT,
+        help="Escribir el JSON sin espacios ni indentación"
+    )
+    parser.add_argument(
+        "--json-tokens",
+        choices=["full", "packed", "drop"],
+        default=settings.JSON_TOKENS,
+        help=f"Tokens de cada segmento en el JSON: lista completa, empaquetados en base64 o eliminados (por defecto: {settings.JSON_TOKENS})"
+    )
+    parser.add_argument(
+        "--cascade-model",
+        choices=MODEL_SIZES,
+        default=settings.CASCADE_MODEL,
+        help="Modelo mayor con el que re-transcribir solo los segmentos con poca confianza del modelo principal "
+             "(no se aplica con --stream)"
+    )
+    parser.add_argument(
+        "--cascade-logprob",
+        type=float,
+        default=settings.CASCADE_LOGPROB_THRESHOLD,
+        help=f"Log-probabilidad media por debajo de la cual un segmento se re-transcribe (por defecto: {settings.CASCADE_LOGPROB_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--vad",
+        action="store_true",
+        default=settings.VAD_ENABLED,
+        help="Transcribir solo los tramos con voz, omitiendo silencios y música (no se aplica con --stream)"
+    )
+    parser.add_argument(
+        "--vad-threshold-db",
+        type=float,
+        default=settings.VAD_THRESHOLD_DB,
+        help=f"dB sobre el ruido de fondo a partir de los que se considera voz (por defecto: {settings.VAD_THRESHOLD_DB})"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="No reutilizar ni guardar transcripciones en la caché"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Procesar también los videos que ya tienen todas sus transcripciones"
+    )
+    parser.add_argument(
+        "--no-index",
+        action="store_false",
+        dest="index",
+        default=settings.SEARCH_INDEX_ON_SAVE,
+        help="No añadir las transcripciones al índice de búsqueda"
+    )
+    parser.add_argument(
+        "--audio-format", "-a",
+        choices=["mp3", "wav", "npy"],
+        default=settings.AUDIO_CODEC,
+        help=f"Formato del audio descargado; wav y npy se extraen a PCM 16 kHz mono y se cargan sin ffmpeg (por defecto: {settings.AUDIO_CODEC})"
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=settings.DOWNLOAD_WORKERS,
+        help=f"Número de descargas simultáneas (por defecto: {settings.DOWNLOAD_WORKERS})"
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=settings.DOWNLOAD_RATE_LIMIT,
+        help=f"Peticiones por segundo a cada host, 0 para no limitar (por defecto: {settings.DOWNLOAD_RATE_LIMIT})"
+    )
+    parser.add_argument(
+        "--pipeline", "-p",
+        action="store_true",
+        help="Solapar la descarga de cada video con la transcripción del anterior (los audios se transcriben de uno en uno)"
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=settings.PIPELINE_QUEUE_SIZE,
+        help=f"Audios descargados en espera en modo pipeline (por defecto: {settings.PIPELINE_QUEUE_SIZE})"
+    )
+    parser.add_argument(
+        "--spool-dir",
+        default=settings.SPOOL_DIR,
+        help=f"Directorio donde se descargan los audios pendientes, p. ej. un tmpfs (por defecto: {settings.SPOOL_DIR or settings.AUDIO_DIR})"
+    )
+    parser.add_argument(
+        "--spool-max-mb",
+        type=float,
+        default=settings.SPOOL_MAX_BYTES / 1e6,
+        help=f"MB de audio pendiente de transcribir como máximo; las descargas esperan al superarlo, 0 sin límite (por defecto: {settings.SPOOL_MAX_BYTES / 1e6:g})"
+    )
+    parser.add_argument(
+        "--spool-max-files",
+        type=int,
+        default=settings.SPOOL_MAX_FILES,
+        help=f"Audios pendientes de transcribir como máximo, 0 sin límite (por defecto: {settings.SPOOL_MAX_FILES})"
+    )
+    parser.add_argument(
+        "--job-db",
+        default=settings.JOB_DB_PATH,
+        help="Base de datos SQLite con el estado de cada URL; varios procesos o equipos "
+             "pueden trabajar sobre la misma y una nueva ejecución continúa donde se quedó"
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=settings.JOB_MAX_ATTEMPTS,
+        help=f"Intentos por URL con --job-db antes de marcarla como fallida (por defecto: {settings.JOB_MAX_ATTEMPTS})"
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Con --job-db, volver a poner en cola las URLs fallidas"
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="cprofile",
+        help=f"Perfilar la descarga, la carga del modelo, la transcripción y la escritura de salidas con "
+             f"los perfiladores indicados, separados por comas ({', '.join(PROFILERS)}; por defecto: cprofile)"
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default=str(settings.PROFILE_DIR),
+        help=f"Directorio de los informes de --profile (por defecto: {settings.PROFILE_DIR})"
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        default=settings.METRICS_DIR,
+        help="Directorio donde exportar las métricas (archivo de Prometheus y resumen JSON por ejecución)"
+    )
+    
+    # Subcomandos del servicio persistente
+    subparsers = parser.add_subparsers(dest="command")
+    
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Arrancar un servicio que mantiene los modelos cargados y atiende trabajos"
+    )
+    serve_parser.add_argument(
+        "--host",
+        default=settings.SERVER_HOST,
+        help=f"Dirección en la que escuchar (por defecto: {settings.SERVER_HOST})"
+    )
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=settings.SERVER_PORT,
+        help=f"Puerto en el que escuchar (por defecto: {settings.SERVER_PORT})"
+    )
+    serve_parser.add_argument(
+        "--socket",
+        help="Escuchar en un socket Unix en lugar de en un puerto TCP"
+    )
+    serve_parser.add_argument(
+        "--max-models",
+        type=int,
+        default=settings.SERVER_MAX_MODELS,
+        help=f"Modelos cargados a la vez como máximo (por defecto: {settings.SERVER_MAX_MODELS})"
+    )
+    
+    submit_parser = subparsers.add_parser(
+        "submit",
+        help="Enviar una URL o un archivo de audio a un servicio en marcha"
+    )
+    submit_parser.add_argument(
+        "source",
+        help="URL de Vimeo o ruta a un archivo de audio local"
+    )
+    submit_parser.add_argument(
+        "--host",
+        default=settings.SERVER_HOST,
+        help=f"Dirección del servicio (por defecto: {settings.SERVER_HOST})"
+    )
+    submit_parser.add_argument(
+        "--port",
+        type=int,
+        default=settings.SERVER_PORT,
+        help=f"Puerto del servicio (por defecto: {settings.SERVER_PORT})"
+    )
+    submit_parser.add_argument(
+        "--socket",
+        help="Socket Unix del servicio"
+    )
+    submit_parser.add_argument(
+        "--no-wait",
+        action="store_true",
+        help="No esperar a que termine el trabajo"
+    )
+    submit_parser.add_argument(
+        "--fetch",
+        metavar="DIR",
+        help="Copiar los archivos de salida a este directorio al terminar"
+    )
     
-    return parser.parse_args()
+    search_parser = subparsers.add_parser(
+        "search",
+        help="Buscar texto en las transcripciones"
+    )
+    search_parser.add_argument(
+        "query",
+        nargs="+",
+        help="Palabras a buscar (todas deben aparecer; un * final busca por prefijo)"
+    )
+    search_parser.add_argument(
+        "--limit", "-n",
+        type=int,
+        default=20,
+        help="Número máximo de resultados (por defecto: 20)"
+    )
+    search_parser.add_argument(
+        "--no-update",
+        action="store_true",
+        help="No sincronizar el índice con el directorio de transcripciones antes de buscar"
+    )
+    
+    args = parser.parse_args()
+    
+    # Los formatos se comprueban ahora y no al guardar, tras descargar y transcribir
+    formats = output_formats(args)
+    if not formats:
+        parser.error("--formats no puede estar vacío")
+    unknown = [fmt for fmt in formats if fmt not in WRITERS]
+    if unknown:
+        parser.error(f"Formatos de salida no soportados: {', '.join(unknown)} (disponibles: {', '.join(WRITERS)})")
+    # La cascada solo tiene sentido con un modelo mayor que el principal
+    if args.cascade_model and MODEL_SIZES.index(args.cascade_model) <= MODEL_SIZES.index(args.model):
+        parser.error(f"--cascade-model ({args.cascade_model}) debe ser mayor que --model ({args.model})")
+    # El pipeline transcribe los audios de uno en uno (--workers solo reparte las ventanas de --chunk-seconds)
+    if args.pipeline and (args.batch_size > 1 or (args.workers > 1 and not args.chunk_seconds)):
+        parser.error("--pipeline transcribe los audios de uno en uno: no se puede combinar con --batch-size "
+                     "ni con --workers sin --chunk-seconds (para solapar descargas y transcripción en "
+                     "paralelo, use --spool-max-files)")
+    return args
 
 def read_urls(file_path):
     """Lee las URLs de un archivo."""
@@ -73,10 +375,118 @@ def read_urls(file_path):
         logger.error(f"Error al leer el archivo de URLs: {str(e)}")
         return []
 
+def output_formats(args):
+    """Formatos de salida pedidos en la línea de comandos."""
+    return [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+
+def pending_urls(urls, args):
+    """
+    Descarta las URLs de videos que ya tienen todas sus salidas en el
+    directorio de salida, sin consultar la red. Las salidas se buscan por el
+    ID del video y, si la caché de metadatos conoce su título, por el nombre
+    que tenían antes de nombrarlas por ID.
+    """
+    if args.force or args.download_only or args.transcribe_only:
+        return urls
+    
+    metadata_cache = MetadataCache()
+    formats = output_formats(args)
+    pending = []
+    for url in urls:
+        video = parse_vimeo_url(url)
+        if video is None:
+            pending.append(url)
+            continue
+        metadata = metadata_cache.get(video.id) or {}
+        names = [video.id]
+        if metadata.get("title"):
+            names.append(get_safe_filename(metadata["title"]))
+        if any(
+            all((Path(args.output_dir) / f"{name}.{fmt}").exists() for fmt in formats)
+            for name in names
+        ):
+            title = metadata.get("title") or video.url
+            logger.info(f"Video ya transcrito, se omite: {title} ({video.id})")
+            continue
+        pending.append(url)
+    return pending
+
+def create_transcriber(args):
+    """Crea el transcriptor con las opciones de la línea de comandos."""
+    cache = None if args.no_cache else TranscriptionCache()
+    transcriber = WhisperTranscriber(
+        model_name=args.model,
+        language=args.language,
+        cache=cache,
+        chunk_seconds=args.chunk_seconds,
+        chunk_overlap=args.chunk_overlap,
+        chunk_workers=args.workers,
+        engine=args.engine
+    )
+    transcriber.output_formats = output_formats(args)
+    transcriber.compact_json = args.compact_json
+    transcriber.json_tokens = args.json_tokens
+    transcriber.stream = args.stream
+    transcriber.vad = args.vad
+    transcriber.vad_threshold_db = args.vad_threshold_db
+    if args.vad and args.stream:
+        logger.warning("El VAD no se aplica en modo --stream")
+    if args.cascade_model:
+        from src.cascade import ModelCascade
+        
+        if args.stream:
+            logger.warning("La cascada de modelos no se aplica en modo --stream")
+        transcriber.cascade = ModelCascade(
+            args.cascade_model,
+            args.language,
+            engine=args.engine,
+            decode_options=transcriber.decode_options,
+            logprob_threshold=args.cascade_logprob
+        )
+    transcriber.search_index = open_search_index(args)
+    if profiler is not None:
+        profiler.instrument(transcriber, "load_model", label=lambda: f"model_{args.model}")
+        profiler.instrument(transcriber, "transcribe", label=lambda audio_file, *a, **k: Path(audio_file).stem)
+        profiler.instrument(transcriber, "save_outputs", label=lambda transcription, base_name, *a, **k: base_name)
+        profiler.instrument(writers, "create_writers", label=lambda base_path, *a, **k: Path(base_path).name)
+        if not args.download_only:
+            # Cargar el modelo aquí para que su coste no se mezcle con el del primer archivo
+            transcriber.load_model()
+    return transcriber
+
+def create_downloader(args, spool=None):
+    """Crea el descargador con las opciones de la línea de comandos."""
+    downloader = VimeoDownloader(
+        workers=args.download_workers,
+        rate_limit=args.rate_limit,
+        audio_format=args.audio_format,
+        spool=spool
+    )
+    if profiler is not None:
+        profiler.instrument(downloader, "download_audio", label=video_label)
+    return downloader
+
+def video_label(url, *args, **kwargs):
+    """Etiqueta del informe de perfilado de una descarga: el ID del video."""
+    video = parse_vimeo_url(url)
+    return video.id if video is not None else url
+
+def open_search_index(args):
+    """Abre el índice de búsqueda si está activado; None si no o si SQLite no lo admite."""
+    if not args.index:
+        return None
+    from src.search import SearchIndex
+    
+    try:
+        return SearchIndex()
+    except RuntimeError as e:
+        logger.warning(f"Índice de búsqueda desactivado: {str(e)}")
+        return None
+
 def process_single_url(url, args):
     """Procesa una única URL de Vimeo."""
-    downloader = VimeoDownloader()
-    transcriber = WhisperTranscriber(model_name=args.model, language=args.language)
+    downloader = create_downloader(args)
+    transcriber = create_transcriber(args)
     
     # Descargar el audio
     audio_file = downloader.download_audio(url)
@@ -90,10 +500,13 @@ def process_single_url(url, args):
         return True
     
     # Transcribir el audio
-    transcription = transcriber.transcribe(
-        audio_file, 
-        output_dir=args.output_dir
-    )
+    try:
+        transcription = transcriber.transcribe(
+            audio_file, 
+            output_dir=args.output_dir
+        )
+    finally:
+        transcriber.close()
     
     # Eliminar el audio si no se debe conservar
     if not args.keep_audio:
@@ -107,69 +520,318 @@ def process_single_url(url, args):
         logger.error("Error en la transcripción")
         return False
 
+def drain_transcriptions(transcriber, audio_files, args):
+    """
+    Transcribe un lote sin conservar los resultados (cada archivo ya queda
+    registrado en el log y en sus archivos de salida).
+    """
+    for _ in transcriber.iter_transcribe(
+        audio_files,
+        output_dir=args.output_dir,
+        keep_audio=args.keep_audio,
+        workers=args.workers,
+        batch_size=args.batch_size
+    ):
+        pass
+
+def create_spool(args):
+    """
+    Crea el spool de audios pendientes si se ha pedido un directorio o un
+    límite de espacio; None si no.
+    """
+    if not (args.spool_dir or args.spool_max_mb or args.spool_max_files):
+        return None
+    if args.download_only:
+        # Sin transcripción nadie liberaría el spool
+        logger.warning("El spool no se usa con --download-only: los audios se guardan en AUDIO_DIR")
+        return None
+    
+    spool = AudioSpool(
+        args.spool_dir,
+        max_bytes=int(args.spool_max_mb * 1e6),
+        max_files=args.spool_max_files
+    )
+    if args.keep_audio and spool.limited and spool.directory.resolve() == Path(settings.AUDIO_DIR).resolve():
+        logger.warning("Con --keep-audio y el spool en AUDIO_DIR, el espacio en disco no queda acotado")
+    logger.info(f"Spool de audios en {spool.directory} ({spool.describe()})")
+    return spool
+
 def process_batch(urls, args):
     """Procesa un lote de URLs de Vimeo."""
-    downloader = VimeoDownloader()
-    transcriber = WhisperTranscriber(model_name=args.model, language=args.language)
-    
-    # Si solo queremos transcribir archivos existentes
-    if args.transcribe_only:
-        audio_files = list(Path(settings.AUDIO_DIR).glob(f"*.{settings.AUDIO_CODEC}"))
-        if not audio_files:
-            logger.error(f"No se encontraron archivos de audio en {settings.AUDIO_DIR}")
+    spool = None if args.transcribe_only else create_spool(args)
+    downloader = create_downloader(args, spool=spool)
+    transcriber = create_transcriber(args)
+    
+    try:
+        # Si solo queremos transcribir archivos existentes
+        if args.transcribe_only:
+            audio_files = sorted(
+                path
+                for extension in settings.AUDIO_EXTENSIONS
+                for path in Path(settings.AUDIO_DIR).glob(f"*.{extension}")
+            )
+            if not audio_files:
+                logger.error(f"No se encontraron archivos de audio en {settings.AUDIO_DIR}")
+                return
+        
+            logger.info(f"Transcribiendo {len(audio_files)} archivos de audio existentes")
+            drain_transcriptions(transcriber, audio_files, args)
             return
         
-        logger.info(f"Transcribiendo {len(audio_files)} archivos de audio existentes")
-        transcriber.transcribe_batch(
-            audio_files,
+        # Descargar y transcribir con las etapas solapadas
+        if args.pipeline and not args.download_only:
+            pipeline = BatchPipeline(downloader, transcriber, queue_size=args.queue_size, spool=spool)
+            pipeline.run(urls, output_dir=args.output_dir, keep_audio=args.keep_audio)
+            return
+        
+        # Descargar en el spool y transcribir los audios a medida que llegan
+        if spool is not None:
+            pipeline = SpoolPipeline(downloader, transcriber, spool)
+            pipeline.run(
+                urls,
+                output_dir=args.output_dir,
+                keep_audio=args.keep_audio,
+                workers=args.workers,
+                batch_size=args.batch_size
+            )
+            return
+        
+        # Descargar todos los audios
+        audio_files = downloader.download_batch(urls)
+        
+        # Si solo queremos descargar, terminamos aquí
+        if args.download_only:
+            logger.info(f"Se descargaron {len(audio_files)} archivos de audio")
+            return
+        
+        # Transcribir todos los audios
+        if audio_files:
+            drain_transcriptions(transcriber, audio_files, args)
+        else:
+            logger.warning("No hay archivos de audio para transcribir")
+    finally:
+        # Liberar los procesos auxiliares del transcriptor
+        transcriber.close()
+
+def watch_audio_dir(args):
+    """
+    Vigila AUDIO_DIR y transcribe los audios nuevos en cuanto terminan de
+    escribirse, manteniendo el modelo cargado entre un audio y el siguiente.
+    Se omiten los audios que ya tienen todas sus salidas.
+    """
+    from src.watcher import FolderWatcher
+    
+    if args.workers > 1:
+        logger.warning("--workers no se usa con --watch: el modelo se mantiene cargado en este proceso")
+    args.workers = 1
+    formats = output_formats(args)
+    transcriber = create_transcriber(args)
+    watcher = FolderWatcher(settings.AUDIO_DIR, settle_seconds=args.watch_settle)
+    try:
+        transcriber.load_model()
+        logger.info(f"Vigilando {settings.AUDIO_DIR} ({watcher.backend}); Ctrl+C para terminar")
+        for audio_files in watcher:
+            pending = []
+            for path in audio_files:
+                if not args.force and all(
+                    (Path(args.output_dir) / f"{path.stem}.{fmt}").exists() for fmt in formats
+                ):
+                    logger.info(f"Audio ya transcrito, se omite: {path.name}")
+                    continue
+                pending.append(path)
+            if pending:
+                logger.info(f"{len(pending)} audios nuevos para transcribir")
+                drain_transcriptions(transcriber, pending, args)
+    except KeyboardInterrupt:
+        logger.info("Vigilancia detenida")
+    finally:
+        watcher.close()
+        transcriber.close()
+
+def process_jobs(urls, args):
+    """
+    Procesa las URLs a través de la cola de trabajos persistente: las añade
+    (si no estaban) y trabaja hasta que no queda ninguna pendiente.
+    """
+    from src.jobstore import JobStore, JobWorker
+    
+    store = JobStore(args.job_db, max_attempts=args.max_attempts)
+    added = store.add(urls)
+    if args.retry_failed:
+        logger.info(f"{store.retry_failed()} URLs fallidas vuelven a la cola")
+    counts = store.counts()
+    logger.info(f"Cola de trabajos {args.job_db}: {added} URLs nuevas, "
+                + ", ".join(f"{state}={count}" for state, count in counts.items()))
+    
+    downloader = create_downloader(args)
+    transcriber = create_transcriber(args)
+    try:
+        worker = JobWorker(
+            store, downloader, transcriber,
             output_dir=args.output_dir,
             keep_audio=args.keep_audio
         )
+        processed = worker.run()
+    finally:
+        transcriber.close()
+    
+    counts = store.counts()
+    logger.info(f"Este trabajador procesó {processed} URLs; "
+                + ", ".join(f"{state}={count}" for state, count in counts.items()))
+    for url, attempts, error in store.failures():
+        logger.warning(f"  - {url} [{attempts} intentos]: {error}")
+
+def run_server(args):
+    """Arranca el servicio de transcripción persistente."""
+    from src.server import serve
+    
+    serve(
+        host=args.host,
+        port=args.port,
+        socket_path=args.socket,
+        preload=[args.model],
+        max_models=args.max_models,
+        cache=None if args.no_cache else TranscriptionCache(),
+        downloader=VimeoDownloader(
+            workers=args.download_workers,
+            rate_limit=args.rate_limit,
+            audio_format=args.audio_format
+        ),
+        output_dir=args.output_dir,
+        metrics_dir=args.metrics_dir,
+        engine=args.engine,
+        search_index=open_search_index(args)
+    )
+
+def submit_job(args):
+    """Envía un trabajo al servicio y, opcionalmente, espera a que termine."""
+    from src.client import TranscriptionClient
+    
+    client = TranscriptionClient(host=args.host, port=args.port, socket_path=args.socket)
+    is_local_file = os.path.exists(args.source)
+    job = client.submit(
+        url=None if is_local_file else args.source,
+        audio_path=args.source if is_local_file else None,
+        model=args.model,
+        language=args.language,
+        keep_audio=args.keep_audio
+    )
+    logger.info(f"Trabajo enviado: {job['id']}")
+    if args.no_wait:
         return
     
-    # Descargar todos los audios
-    audio_files = downloader.download_batch(urls)
+    with Timer("Trabajo"):
+        job = client.wait(job["id"])
+    if job["status"] != "done":
+        logger.error(f"El trabajo {job['id']} falló: {job['error']}")
+        return
     
-    # Si solo queremos descargar, terminamos aquí
-    if args.download_only:
-        logger.info(f"Se descargaron {len(audio_files)} archivos de audio")
+    # Con varios formatos --fetch es siempre un directorio (se crea si no existe)
+    several = len(job["output_files"]) > 1
+    for fmt, path in job["output_files"].items():
+        if args.fetch:
+            path = client.fetch_output(job["id"], fmt, args.fetch, as_directory=several)
+        logger.info(f"  - {fmt}: {path}")
+
+def search_transcriptions(args):
+    """Busca texto en las transcripciones y muestra los segmentos encontrados."""
+    from src.search import SearchIndex
+    from src.writers import format_timestamp
+    
+    with SearchIndex() as index:
+        if not args.no_update:
+            index.update(args.output_dir)
+        hits = index.search(" ".join(args.query), limit=args.limit)
+    
+    if not hits:
+        logger.info("No se encontraron resultados")
         return
     
-    # Transcribir todos los audios
-    if audio_files:
-        transcriber.transcribe_batch(
-            audio_files,
-            output_dir=args.output_dir,
-            keep_audio=args.keep_audio
-        )
-    else:
-        logger.warning("No hay archivos de audio para transcribir")
+    logger.info(f"{len(hits)} resultados:")
+    for hit in hits:
+        if hit["start"] is None:
+            position = "texto completo"
+        else:
+            position = f"{format_timestamp(hit['start'])} --> {format_timestamp(hit['end'])}"
+        logger.info(f"  {hit['video']} [{position}] {hit['snippet']}")
 
 def main():
     """Función principal."""
-    # Configurar el logger
+    # Procesar argumentos (antes de crear nada, para que --help sea inmediato)
+    args = parse_arguments()
+    
+    # Crear los directorios de trabajo y configurar el logger
+    settings.ensure_directories()
     global logger
     logger = setup_logger()
     
-    # Procesar argumentos
-    args = parse_arguments()
+    global profiler
+    if args.profile and args.command is None:
+        try:
+            profiler = Profiler(args.profile_dir, kinds=parse_profilers(args.profile))
+        except ValueError as e:
+            logger.error(str(e))
+            return
+        if args.workers > 1 or args.batch_size > 1:
+            # Los procesos auxiliares y los lotes mezclados no se pueden perfilar por archivo
+            logger.warning("Con --profile los archivos se transcriben uno a uno en este proceso")
+            args.workers = args.batch_size = 1
+        logger.info(f"Perfilando con {', '.join(profiler.kinds)}; informes en {profiler.output_dir}")
     
-    # Iniciar el cronómetro para todo el proceso
-    with Timer("Proceso completo"):
-        if args.url:
-            # Procesar una única URL
-            process_single_url(args.url, args)
-        else:
-            # Procesar URLs desde un archivo
-            urls = read_urls(args.url_file)
-            if not urls:
-                logger.error(f"No se encontraron URLs en {args.url_file}")
-                return
-            
-            logger.info(f"Se procesarán {len(urls)} URLs de Vimeo")
-            process_batch(urls, args)
+    # Subcomandos del servicio persistente
+    if args.command == "serve":
+        run_server(args)
+        return
+    if args.command == "submit":
+        submit_job(args)
+        return
+    if args.command == "search":
+        search_transcriptions(args)
+        return
     
-    logger.info("Proceso completado")
+    try:
+        # Iniciar el cronómetro para todo el proceso
+        with Timer("Proceso completo", stage="total"):
+            if args.watch:
+                # Vigilar AUDIO_DIR hasta que se interrumpa
+                if args.download_only or args.job_db:
+                    logger.error("--watch no se puede combinar con --download-only ni --job-db")
+                    return
+                watch_audio_dir(args)
+            elif args.job_db:
+                # Cola persistente: las URLs son opcionales si ya están en la cola
+                if args.download_only or args.transcribe_only:
+                    logger.error("--job-db no se puede combinar con --download-only ni --transcribe-only")
+                    return
+                urls = [args.url] if args.url else read_urls(args.url_file)
+                process_jobs(pending_urls(dedupe_urls(urls), args), args)
+            elif args.url:
+                # Procesar una única URL
+                if pending_urls([args.url], args):
+                    process_single_url(args.url, args)
+            else:
+                # Procesar URLs desde un archivo
+                urls = dedupe_urls(read_urls(args.url_file))
+                if not urls:
+                    logger.error(f"No se encontraron URLs en {args.url_file}")
+                    return
+                
+                urls = pending_urls(urls, args)
+                if not urls:
+                    logger.info("Todos los videos ya están transcritos")
+                    return
+                
+                logger.info(f"Se procesarán {len(urls)} URLs de Vimeo")
+                process_batch(urls, args)
+        
+        logger.info("Proceso completado")
+    finally:
+        if args.metrics_dir:
+            prom_path, json_path = metrics.export(args.metrics_dir)
+            logger.info(f"Métricas exportadas a: {prom_path} y {json_path}")
+        if profiler is not None:
+            summary_path = profiler.write_summary()
+            logger.info(f"Resumen del perfilado: {summary_path}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
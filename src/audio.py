@@ -0,0 +1,80 @@
+"""
+Lectura directa de audio PCM a 16 kHz sin pasar por ffmpeg.
+"""
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from config import settings
+
+def _wav_layout(path):
+    """
+    Lee la cabecera RIFF de un WAV.
+    
+    Returns:
+        Tupla (formato, canales, frecuencia, bits por muestra, offset de datos, bytes de datos)
+    """
+    with open(path, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"No es un archivo WAV: {path}")
+        
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"WAV sin bloque de datos: {path}")
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", f.read(16))
+                f.seek(size - 16 + (size & 1), 1)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"WAV sin bloque de formato: {path}")
+                audio_format, channels, sample_rate, _, _, bits = fmt
+                return audio_format, channels, sample_rate, bits, f.tell(), size
+            else:
+                f.seek(size + (size & 1), 1)
+
+def is_native_pcm(path):
+    """Indica si el archivo ya está en el formato de entrada de Whisper (16 kHz mono)."""
+    path = Path(path)
+    if path.suffix == ".npy":
+        return True
+    if path.suffix != ".wav":
+        return False
+    try:
+        audio_format, channels, sample_rate, bits, _, _ = _wav_layout(path)
+    except (OSError, ValueError, struct.error):
+        return False
+    return audio_format == 1 and channels == 1 and bits == 16 and sample_rate == settings.AUDIO_SAMPLE_RATE
+
+def load_pcm(path):
+    """
+    Carga un audio PCM a 16 kHz mono como array float32.
+    
+    Los .npy se mapean en memoria sin copia; los .wav de 16 bits se mapean y
+    se convierten a float32 en una sola pasada.
+    
+    Args:
+        path: Ruta a un archivo .npy (float32) o .wav (PCM de 16 bits)
+    
+    Returns:
+        Array float32 con las muestras normalizadas en [-1, 1]
+    """
+    path = Path(path)
+    if path.suffix == ".npy":
+        return np.load(path, mmap_mode="r")
+    
+    _, _, _, _, offset, size = _wav_layout(path)
+    # ffmpeg deja el tamaño a 0xFFFFFFFF si no pudo reescribir la cabecera
+    size = min(size, os.path.getsize(path) - offset)
+    samples = np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(size // 2,))
+    return samples.astype(np.float32) / 32768.0
+
+def wav_to_npy(wav_path, npy_path):
+    """Convierte un WAV PCM de 16 bits a un .npy float32 listo para mapear en memoria."""
+    np.save(npy_path, load_pcm(wav_path))
+    return Path(npy_path)
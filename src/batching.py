@@ -0,0 +1,233 @@
+"""
+Inferencia por lotes entre archivos.
+
+Los audios se cortan en ventanas de hasta 30 segundos (en silencios) y las
+ventanas de varios archivos se decodifican juntas en un solo lote del
+codificador y el decodificador de Whisper. Después se reconstruye la
+transcripción de cada archivo con la misma forma que devuelve
+model.transcribe.
+"""
+import logging
+from dataclasses import fields
+
+from src.chunking import SAMPLE_RATE, find_cut_points
+from src.utils import Timer
+from src.metrics import metrics
+
+logger = logging.getLogger("vimeo_transcriber")
+
+# Duración objetivo de las ventanas y margen para buscar silencios: las
+# ventanas nunca superan los 30 segundos que procesa el modelo
+WINDOW_SECONDS = 24
+SEARCH_SECONDS = 4
+# Resolución de los tokens de tiempo de Whisper
+TIME_PRECISION = 0.02
+# Mismos umbrales que model.transcribe: por encima se repite la ventana con
+# el fallback de temperatura, y con poca confianza y mucho silencio se omite
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+def cut_windows(audio, sample_rate=SAMPLE_RATE):
+    """Devuelve los límites (inicio, fin) en muestras de las ventanas de un audio."""
+    cuts = find_cut_points(audio, WINDOW_SECONDS, SEARCH_SECONDS, sample_rate)
+    return [(start, end) for start, end in zip(cuts[:-1], cuts[1:]) if end > start]
+
+def parse_segments(tokens, timestamp_begin):
+    """
+    Separa los tokens decodificados de una ventana en segmentos.
+    
+    Whisper emite cada segmento como <|t0|> texto <|t1|>; dos tokens de tiempo
+    seguidos cierran un segmento y abren el siguiente.
+    
+    Args:
+        tokens: Tokens generados (sin los tokens iniciales de la secuencia)
+        timestamp_begin: Identificador del token <|0.00|>
+    
+    Returns:
+        Tupla (lista de (inicio, fin, tokens) con tiempos relativos a la
+        ventana, True si la ventana termina en un token de tiempo)
+    """
+    segments = []
+    start = None
+    current = []
+    for token in tokens:
+        if token >= timestamp_begin:
+            time = (token - timestamp_begin) * TIME_PRECISION
+            if start is not None and any(t < timestamp_begin for t in current):
+                current.append(token)
+                segments.append((start, time, current))
+                start, current = None, []
+            else:
+                start = time
+                current = [token]
+        else:
+            if start is None:
+                start, current = 0.0, []
+            current.append(token)
+    
+    complete = not tokens or tokens[-1] >= timestamp_begin
+    if current and any(t < timestamp_begin for t in current):
+        segments.append((start, None, current))
+    return segments, complete
+
+class BatchedInference:
+    """
+    Decodifica ventanas de varios archivos en lotes de `batch_size`.
+    
+    No condiciona cada ventana con el texto de la anterior (las ventanas de un
+    lote se decodifican a la vez), por lo que está pensado para clips cortos.
+    Las ventanas que model.transcribe repetiría con otra temperatura se
+    transcriben de nuevo por separado con model.transcribe.
+    """
+    
+    def __init__(self, model, language, batch_size, decode_options=None, on_batch=None):
+        """
+        Args:
+            model: Modelo de Whisper cargado
+            language: Código de idioma
+            batch_size: Ventanas por lote
+            decode_options: Opciones de decodificación del transcriptor
+            on_batch: Función opcional (muestras, segundos) llamada tras cada lote
+        """
+        import whisper
+        
+        self.model = model
+        self.language = language
+        self.batch_size = max(1, batch_size)
+        self.decode_options = dict(decode_options or {})
+        self.on_batch = on_batch
+        self.tokenizer = whisper.tokenizer.get_tokenizer(
+            model.is_multilingual,
+            num_languages=model.num_languages,
+            language=language,
+            task="transcribe"
+        )
+        
+        # Solo las opciones que entiende DecodingOptions
+        valid = {field.name for field in fields(whisper.DecodingOptions)}
+        options = {k: v for k, v in self.decode_options.items() if k in valid and k != "temperature"}
+        if "initial_prompt" in self.decode_options:
+            options.setdefault("prompt", self.decode_options["initial_prompt"])
+        options.setdefault("fp16", model.device.type == "cuda")
+        self.options = whisper.DecodingOptions(task="transcribe", language=language, **options)
+    
+    def transcribe_files(self, items):
+        """
+        Transcribe varios audios compartiendo lotes entre ellos.
+        
+        Args:
+            items: Iterable de tuplas (clave, array de muestras a 16 kHz)
+        
+        Yields:
+            Tuplas (clave, transcripción, error) en cuanto termina cada archivo
+        """
+        pending = {}
+        queue = []
+        for key, audio in items:
+            windows = cut_windows(audio)
+            if not windows:
+                yield key, self._build_transcription([]), None
+                continue
+            pending[key] = {"audio": audio, "results": [None] * len(windows), "remaining": len(windows), "error": None}
+            queue.extend((key, index, start, end) for index, (start, end) in enumerate(windows))
+            while len(queue) >= self.batch_size:
+                batch, queue = queue[:self.batch_size], queue[self.batch_size:]
+                yield from self._run_batch(batch, pending)
+        
+        while queue:
+            batch, queue = queue[:self.batch_size], queue[self.batch_size:]
+            yield from self._run_batch(batch, pending)
+    
+    def _run_batch(self, batch, pending):
+        """Decodifica un lote y devuelve los archivos que quedan completos."""
+        try:
+            with Timer(stage="batch_inference") as timer:
+                results = self._decode([pending[key]["audio"][start:end] for key, _, start, end in batch])
+                for (key, index, start, end), result in zip(batch, results):
+                    pending[key]["results"][index] = self._window_segments(pending[key]["audio"], start, end, result)
+            if self.on_batch is not None:
+                self.on_batch(sum(end - start for _, _, start, end in batch), timer.elapsed)
+            metrics.inc("batch_windows_total", len(batch))
+        except Exception as e:
+            logger.error(f"Error al transcribir un lote de {len(batch)} ventanas: {str(e)}")
+            for key, _, _, _ in batch:
+                pending[key]["error"] = str(e)
+        
+        for key, _, _, _ in batch:
+            state = pending[key]
+            state["remaining"] -= 1
+            if state["remaining"] == 0:
+                del pending[key]
+                if state["error"] is not None:
+                    yield key, None, state["error"]
+                else:
+                    segments = [segment for window in state["results"] for segment in window]
+                    yield key, self._build_transcription(segments), None
+    
+    def _decode(self, audios):
+        """Calcula los espectrogramas de un lote de ventanas y los decodifica juntos."""
+        import torch
+        import whisper
+        
+        mels = [
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=self.model.dims.n_mels)
+            for audio in audios
+        ]
+        mel = torch.stack(mels).to(self.model.device)
+        return whisper.decode(self.model, mel, self.options)
+    
+    def _window_segments(self, audio, start, end, result):
+        """Convierte el resultado de una ventana en segmentos con tiempos absolutos."""
+        offset = start / SAMPLE_RATE
+        duration = (end - start) / SAMPLE_RATE
+        
+        if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+            return []
+        
+        parsed, complete = parse_segments(result.tokens, self.tokenizer.timestamp_begin)
+        if (not complete or result.compression_ratio > COMPRESSION_RATIO_THRESHOLD
+                or result.avg_logprob < LOGPROB_THRESHOLD):
+            return self._fallback(audio[start:end], offset, duration)
+        
+        segments = []
+        for segment_start, segment_end, tokens in parsed:
+            segment_end = duration if segment_end is None else min(segment_end, duration)
+            text_tokens = [t for t in tokens if t < self.tokenizer.timestamp_begin]
+            segments.append({
+                "seek": int(round(offset * 100)),
+                "start": round(offset + min(segment_start, segment_end), 3),
+                "end": round(offset + segment_end, 3),
+                "text": self.tokenizer.decode(text_tokens),
+                "tokens": tokens,
+                "temperature": result.temperature,
+                "avg_logprob": result.avg_logprob,
+                "compression_ratio": result.compression_ratio,
+                "no_speech_prob": result.no_speech_prob,
+            })
+        return segments
+    
+    def _fallback(self, audio, offset, duration):
+        """Transcribe una ventana por separado con model.transcribe (con fallback de temperatura)."""
+        metrics.inc("batch_fallback_windows_total")
+        result = self.model.transcribe(audio, language=self.language, verbose=None, **self.decode_options)
+        segments = []
+        for segment in result["segments"]:
+            segment = dict(segment)
+            segment["start"] = round(segment["start"] + offset, 3)
+            segment["end"] = round(min(segment["end"], duration) + offset, 3)
+            segment["seek"] = segment.get("seek", 0) + int(round(offset * 100))
+            segments.append(segment)
+        return segments
+    
+    def _build_transcription(self, segments):
+        """Transcripción de un archivo con la forma que devuelve model.transcribe."""
+        segments = [
+            {"id": i, **{k: v for k, v in segment.items() if k != "id"}}
+            for i, segment in enumerate(segments)
+        ]
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": self.language,
+        }
@@ -0,0 +1,134 @@
+"""
+Caché persistente de transcripciones direccionada por contenido.
+"""
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+from config import settings
+from src.metrics import metrics
+
+logger = logging.getLogger("vimeo_transcriber")
+
+class TranscriptionCache:
+    """
+    Guarda en disco el resultado de model.transcribe indexado por el hash del
+    audio, el modelo, el idioma y las opciones de decodificación.
+    
+    Cada entrada es un archivo JSON. La fecha de modificación se actualiza en
+    cada acierto, de modo que al superar el tamaño máximo se eliminan primero
+    las entradas usadas hace más tiempo (LRU).
+    """
+    
+    def __init__(self, cache_dir=None, max_bytes=None):
+        """
+        Inicializa la caché.
+        
+        Args:
+            cache_dir: Directorio donde guardar las entradas
+            max_bytes: Tamaño máximo de la caché en bytes
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else settings.CACHE_DIR
+        self.max_bytes = settings.CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def hash_file(path, chunk_size=1 << 20):
+        """Calcula el SHA-256 del contenido de un archivo."""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def make_key(self, audio_file, model_name, language, options=None):
+        """
+        Construye la clave de caché de una transcripción.
+        
+        Args:
+            audio_file: Ruta al archivo de audio
+            model_name: Nombre del modelo de Whisper
+            language: Código de idioma
+            options: Diccionario con las opciones de decodificación
+        """
+        key_data = {
+            "audio": self.hash_file(audio_file),
+            "model": model_name,
+            "language": language,
+            "options": options or {},
+        }
+        encoded = json.dumps(key_data, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+    
+    def _entry_path(self, key):
+        return self.cache_dir / f"{key}.json"
+    
+    def get(self, key):
+        """Devuelve la transcripción guardada para la clave o None si no existe."""
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                transcription = json.load(f)
+            os.utime(path)  # Marcar la entrada como usada recientemente
+        except FileNotFoundError:
+            self.misses += 1
+            metrics.inc("cache_requests_total", result="miss")
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrada de caché corrupta, se ignora: {path} ({str(e)})")
+            self.misses += 1
+            metrics.inc("cache_requests_total", result="miss")
+            return None
+        
+        self.hits += 1
+        metrics.inc("cache_requests_total", result="hit")
+        logger.info(f"Transcripción encontrada en caché: {key[:12]}")
+        return transcription
+    
+    def put(self, key, transcription):
+        """Guarda una transcripción y aplica la política de expulsión."""
+        path = self._entry_path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(transcription, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+    
+    def evict(self):
+        """Elimina las entradas menos usadas hasta quedar dentro del tamaño máximo."""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.cache_dir.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            
+            if total <= self.max_bytes:
+                return
+            
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                    total -= size
+                    logger.debug(f"Entrada de caché expulsada: {path.name}")
+                except FileNotFoundError:
+                    pass
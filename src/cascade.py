@@ -0,0 +1,203 @@
+"""
+Cascada de modelos: se transcribe con un modelo pequeño y solo los tramos con
+poca confianza se vuelven a transcribir con un modelo grande.
+"""
+import logging
+
+from config import settings
+from src.chunking import SAMPLE_RATE
+from src.utils import Timer
+from src.metrics import metrics
+
+logger = logging.getLogger("vimeo_transcriber")
+
+def is_weak(segment, logprob_threshold, compression_threshold, no_speech_threshold):
+    """
+    Indica si un segmento tiene poca confianza: log-probabilidad media baja,
+    texto repetitivo (razón de compresión alta) o probable ausencia de voz
+    (posible alucinación).
+    """
+    return (
+        segment.get("avg_logprob", 0.0) < logprob_threshold
+        or segment.get("compression_ratio", 0.0) > compression_threshold
+        or segment.get("no_speech_prob", 0.0) > no_speech_threshold
+    )
+
+def weak_spans(segments, merge_gap, **thresholds):
+    """
+    Agrupa los segmentos dudosos en tramos (inicio, fin) en segundos; los
+    tramos separados por menos de `merge_gap` segundos se unen en uno.
+    """
+    spans = []
+    for segment in segments:
+        if not is_weak(segment, **thresholds):
+            continue
+        if spans and segment["start"] - spans[-1][1] <= merge_gap:
+            spans[-1][1] = max(spans[-1][1], segment["end"])
+        else:
+            spans.append([segment["start"], segment["end"]])
+    return [(start, end) for start, end in spans if end > start]
+
+def splice_segments(segments, replacements, spans):
+    """
+    Sustituye los segmentos cuyo punto medio cae en alguno de los tramos por
+    los segmentos re-transcritos, y renumera el resultado sin solapamientos.
+    Los tramos para los que el modelo grande no devuelve ningún segmento
+    conservan los segmentos originales.
+    """
+    def overlaps(segment, start, end):
+        return segment["start"] < end and segment["end"] > start
+    
+    # Solo se sustituyen los tramos con algún segmento nuevo que los solape
+    replaced = [
+        (start, end) for start, end in spans
+        if any(overlaps(segment, start, end) for segment in replacements)
+    ]
+    
+    def in_spans(segment):
+        middle = (segment["start"] + segment["end"]) / 2
+        return any(start <= middle <= end for start, end in replaced)
+    
+    merged = sorted(
+        [segment for segment in segments if not in_spans(segment)] + replacements,
+        key=lambda segment: segment["start"]
+    )
+    result = []
+    for segment in merged:
+        start = max(segment["start"], result[-1]["end"]) if result else segment["start"]
+        if segment["end"] <= start:
+            continue
+        segment = dict(segment, id=len(result), start=round(start, 3))
+        result.append(segment)
+    return result
+
+class ModelCascade:
+    """
+    Re-transcribe con un modelo grande los tramos dudosos de una transcripción.
+    
+    El modelo grande se carga la primera vez que hace falta. Cada tramo se
+    transcribe con un pequeño margen de audio a cada lado y con el texto
+    anterior como contexto; sus segmentos se recortan al tramo y se insertan
+    con los tiempos del audio completo.
+    """
+    
+    def __init__(self, model_name, language, engine=None, decode_options=None,
+                 logprob_threshold=None, compression_threshold=None, no_speech_threshold=None):
+        """
+        Args:
+            model_name: Modelo de Whisper grande
+            language: Código de idioma
+            engine: Motor de inferencia ("fp32" o "int8")
+            decode_options: Opciones adicionales para model.transcribe
+            logprob_threshold: Log-probabilidad media por debajo de la cual se
+                re-transcribe (por defecto settings.CASCADE_LOGPROB_THRESHOLD)
+            compression_threshold: Razón de compresión por encima de la cual se
+                re-transcribe (por defecto settings.CASCADE_COMPRESSION_THRESHOLD)
+            no_speech_threshold: Probabilidad de silencio por encima de la cual se
+                re-transcribe (por defecto settings.CASCADE_NO_SPEECH_THRESHOLD)
+        """
+        self.model_name = model_name
+        self.language = language
+        self.engine = engine or settings.INFERENCE_ENGINE
+        self.decode_options = dict(decode_options or {})
+        self.thresholds = {
+            "logprob_threshold": settings.CASCADE_LOGPROB_THRESHOLD if logprob_threshold is None else logprob_threshold,
+            "compression_threshold": (settings.CASCADE_COMPRESSION_THRESHOLD
+                                      if compression_threshold is None else compression_threshold),
+            "no_speech_threshold": settings.CASCADE_NO_SPEECH_THRESHOLD if no_speech_threshold is None else no_speech_threshold,
+        }
+        self.model = None
+    
+    def cache_options(self):
+        """Opciones de la cascada que forman parte de la clave de caché."""
+        return {"model": self.model_name, **self.thresholds}
+    
+    def load_model(self):
+        if self.model is None:
+            logger.info(f"Cargando modelo de la cascada: {self.model_name} ({self.engine})")
+            from src.engines import load_engine_model
+            with Timer("Carga de modelo") as timer:
+                self.model = load_engine_model(self.model_name, self.engine)
+            metrics.observe("model_load_seconds", timer.elapsed, model=self.model_name, engine=self.engine)
+        return self.model
+    
+    def _transcribe_span(self, audio, start, end, prompt):
+        """Transcribe un tramo y devuelve sus segmentos con tiempos absolutos."""
+        margin = settings.CASCADE_MARGIN_SECONDS
+        offset = max(0.0, start - margin)
+        piece = audio[int(offset * SAMPLE_RATE):int(min(len(audio) / SAMPLE_RATE, end + margin) * SAMPLE_RATE)]
+        options = dict(self.decode_options)
+        if prompt and "initial_prompt" not in options:
+            options["initial_prompt"] = prompt
+        result = self.model.transcribe(piece, language=self.language, verbose=False, **options)
+        
+        segments = []
+        for segment in result["segments"]:
+            segment_start = segment["start"] + offset
+            segment_end = segment["end"] + offset
+            # Solo lo que cae dentro del tramo: el margen pertenece a los segmentos vecinos
+            if not start <= (segment_start + segment_end) / 2 <= end:
+                continue
+            segment = dict(segment)
+            segment["start"] = round(max(segment_start, start), 3)
+            segment["end"] = round(min(segment_end, end), 3)
+            segment["seek"] = segment.get("seek", 0) + int(round(offset * 100))
+            segment["model"] = self.model_name
+            if "words" in segment:
+                segment["words"] = [
+                    dict(word, start=round(word["start"] + offset, 3), end=round(word["end"] + offset, 3))
+                    for word in segment["words"]
+                ]
+            segments.append(segment)
+        return segments
+    
+    def refine(self, audio, transcription):
+        """
+        Re-transcribe los tramos dudosos de una transcripción.
+        
+        Args:
+            audio: Array de muestras a 16 kHz con el que se obtuvo la transcripción
+            transcription: Diccionario devuelto por model.transcribe
+        
+        Returns:
+            Transcripción con los tramos sustituidos y la clave "cascade" con
+            las estadísticas del archivo
+        """
+        segments = transcription["segments"]
+        spans = weak_spans(segments, settings.CASCADE_MERGE_GAP_SECONDS, **self.thresholds)
+        total = len(audio) / SAMPLE_RATE
+        escalated = sum(end - start for start, end in spans)
+        stats = {
+            "model": self.model_name,
+            "spans": len(spans),
+            "weak_segments": sum(is_weak(segment, **self.thresholds) for segment in segments),
+            "escalated_seconds": round(escalated, 3),
+            "audio_seconds": round(total, 3),
+            "escalated_ratio": round(escalated / total, 4) if total else 0.0,
+        }
+        metrics.inc("cascade_audio_seconds_total", total)
+        if not spans:
+            logger.info(f"Cascada: ningún segmento dudoso, no se usa {self.model_name}")
+            return dict(transcription, cascade=stats)
+        
+        self.load_model()
+        replacements = []
+        with Timer(f"Cascada con {self.model_name}", stage="cascade"):
+            for start, end in spans:
+                prompt = "".join(
+                    segment["text"] for segment in segments if segment["end"] <= start
+                )[-200:].strip()
+                replacements.extend(self._transcribe_span(audio, start, end, prompt))
+        metrics.inc("cascade_escalated_seconds_total", escalated, model=self.model_name)
+        
+        spliced = splice_segments(segments, replacements, spans)
+        logger.info(
+            f"Cascada: {escalated:.1f} s de {total:.1f} s ({stats['escalated_ratio']:.1%}) "
+            f"re-transcritos con {self.model_name} en {len(spans)} tramos"
+        )
+        return dict(
+            transcription,
+            text="".join(segment["text"] for segment in spliced),
+            segments=spliced,
+            cascade=stats
+        )
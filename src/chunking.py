@@ -0,0 +1,137 @@
+"""
+Utilidades para dividir audios largos en ventanas solapadas y unir sus
+transcripciones en una sola.
+"""
+import numpy as np
+
+# Frecuencia de muestreo con la que trabaja Whisper
+SAMPLE_RATE = 16000
+# Duración de las tramas usadas para buscar silencios
+FRAME_SECONDS = 0.02
+
+def find_cut_points(audio, chunk_seconds, search_seconds, sample_rate=SAMPLE_RATE):
+    """
+    Busca puntos de corte cada `chunk_seconds` aproximadamente.
+    
+    Cada corte se coloca en la trama de menor energía dentro de
+    ±`search_seconds` del punto ideal, para no partir palabras.
+    
+    Args:
+        audio: Array con las muestras de audio
+        chunk_seconds: Duración objetivo de cada fragmento
+        search_seconds: Margen en el que buscar un silencio
+        sample_rate: Frecuencia de muestreo del audio
+    
+    Returns:
+        Lista de posiciones (en muestras) que empieza en 0 y termina en len(audio)
+    """
+    total = len(audio)
+    chunk = int(chunk_seconds * sample_rate)
+    search = int(search_seconds * sample_rate)
+    frame = max(1, int(FRAME_SECONDS * sample_rate))
+    
+    cuts = [0]
+    # Evitar que el último fragmento quede demasiado corto
+    while total - cuts[-1] > chunk * 1.25:
+        target = cuts[-1] + chunk
+        low = max(cuts[-1] + chunk // 2, target - search)
+        high = min(total, target + search)
+        region = audio[low:high]
+        n_frames = len(region) // frame
+        if n_frames == 0:
+            cuts.append(target)
+            continue
+        
+        frames = region[:n_frames * frame].reshape(n_frames, frame)
+        energy = np.square(frames, dtype=np.float32).mean(axis=1)
+        cuts.append(low + int(np.argmin(energy)) * frame + frame // 2)
+    
+    cuts.append(total)
+    return cuts
+
+def split_windows(audio, chunk_seconds, overlap_seconds, search_seconds=None, sample_rate=SAMPLE_RATE):
+    """
+    Divide un audio en ventanas solapadas cortadas en silencios.
+    
+    Cada ventana se extiende `overlap_seconds / 2` por cada lado más allá de sus
+    cortes, y es "propietaria" solo del tramo entre sus cortes: al unir los
+    resultados se descartan los segmentos que caen en el tramo de otra ventana.
+    
+    Args:
+        audio: Array con las muestras de audio
+        chunk_seconds: Duración objetivo de cada ventana
+        overlap_seconds: Solapamiento total entre ventanas consecutivas
+        search_seconds: Margen en el que buscar silencios (por defecto chunk_seconds / 10)
+        sample_rate: Frecuencia de muestreo del audio
+    
+    Returns:
+        Lista de diccionarios con:
+        - start, end: Límites de la ventana en muestras
+        - own_start, own_end: Tramo propio de la ventana en segundos
+    """
+    if search_seconds is None:
+        search_seconds = chunk_seconds / 10
+    cuts = find_cut_points(audio, chunk_seconds, search_seconds, sample_rate)
+    half_overlap = int(overlap_seconds * sample_rate / 2)
+    total = len(audio)
+    
+    windows = []
+    for i, (cut_start, cut_end) in enumerate(zip(cuts[:-1], cuts[1:])):
+        windows.append({
+            "start": max(0, cut_start - half_overlap),
+            "end": min(total, cut_end + half_overlap),
+            "own_start": cut_start / sample_rate if i > 0 else float("-inf"),
+            "own_end": cut_end / sample_rate if cut_end < total else float("inf"),
+        })
+    return windows
+
+def stitch_windows(results, windows, sample_rate=SAMPLE_RATE):
+    """
+    Une las transcripciones de varias ventanas en una sola.
+    
+    Desplaza los timestamps de cada segmento (y de sus palabras, si las hay)
+    al inicio de su ventana, descarta los duplicados de las zonas solapadas y
+    garantiza que los segmentos resultantes no se solapan entre sí.
+    
+    Args:
+        results: Transcripciones de cada ventana, en orden
+        windows: Ventanas devueltas por split_windows
+        sample_rate: Frecuencia de muestreo del audio
+    
+    Returns:
+        Diccionario con la misma forma que el devuelto por model.transcribe
+    """
+    segments = []
+    for result, window in zip(results, windows):
+        offset = window["start"] / sample_rate
+        for segment in result["segments"]:
+            start = segment["start"] + offset
+            end = segment["end"] + offset
+            
+            # El segmento pertenece a la ventana donde cae su punto medio
+            middle = (start + end) / 2
+            if not window["own_start"] <= middle < window["own_end"]:
+                continue
+            
+            if segments:
+                start = max(start, segments[-1]["end"])
+            if end <= start:
+                continue
+            
+            segment = dict(segment)
+            segment["id"] = len(segments)
+            segment["seek"] = segment.get("seek", 0) + int(round(offset * 100))
+            segment["start"] = round(start, 3)
+            segment["end"] = round(end, 3)
+            if "words" in segment:
+                segment["words"] = [
+                    dict(word, start=round(word["start"] + offset, 3), end=round(word["end"] + offset, 3))
+                    for word in segment["words"]
+                ]
+            segments.append(segment)
+    
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": results[0].get("language") if results else None,
+    }
@@ -0,0 +1,111 @@
+"""
+Cliente ligero para el servicio de transcripción (ver src/server.py).
+"""
+import json
+import time
+import socket
+import http.client
+from pathlib import Path
+
+from config import settings
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """Conexión HTTP sobre un socket Unix."""
+    
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+    
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+class TranscriptionClient:
+    """Envía trabajos al servicio y consulta su estado."""
+    
+    def __init__(self, host=None, port=None, socket_path=None, timeout=30):
+        """
+        Args:
+            host, port: Dirección HTTP del servicio
+            socket_path: Ruta del socket Unix del servicio (sustituye a host/port)
+            timeout: Tiempo máximo de espera de cada petición en segundos
+        """
+        self.host = host or settings.SERVER_HOST
+        self.port = settings.SERVER_PORT if port is None else port
+        self.socket_path = str(socket_path) if socket_path else None
+        self.timeout = timeout
+    
+    def _connection(self):
+        if self.socket_path:
+            return _UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+    
+    def _request(self, method, path, data=None):
+        connection = self._connection()
+        try:
+            body = json.dumps(data).encode("utf-8") if data is not None else None
+            headers = {"Content-Type": "application/json"} if body else {}
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+        finally:
+            connection.close()
+        
+        if response.status >= 400:
+            try:
+                message = json.loads(payload).get("error", "")
+            except ValueError:
+                message = payload.decode("utf-8", "replace")
+            raise RuntimeError(f"Error {response.status} del servicio: {message}")
+        return payload
+    
+    def health(self):
+        return json.loads(self._request("GET", "/health"))
+    
+    def submit(self, url=None, audio_path=None, model=None, language=None,
+               output_dir=None, keep_audio=False):
+        """Encola un trabajo y devuelve su estado inicial."""
+        data = {
+            "url": url,
+            "audio_path": str(Path(audio_path).resolve()) if audio_path else None,
+            "model": model,
+            "language": language,
+            "output_dir": str(Path(output_dir).resolve()) if output_dir else None,
+            "keep_audio": keep_audio,
+        }
+        return json.loads(self._request("POST", "/jobs", data))
+    
+    def status(self, job_id):
+        return json.loads(self._request("GET", f"/jobs/{job_id}"))
+    
+    def wait(self, job_id, poll_interval=0.5, timeout=None):
+        """Espera a que el trabajo termine y devuelve su estado final."""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            job = self.status(job_id)
+            if job["status"] in ("done", "error"):
+                return job
+            if deadline and time.monotonic() > deadline:
+                raise TimeoutError(f"El trabajo {job_id} no terminó a tiempo")
+            time.sleep(poll_interval)
+    
+    def fetch_output(self, job_id, fmt, destination, as_directory=False):
+        """
+        Descarga un archivo de salida del trabajo y devuelve su ruta local.
+        
+        Si `destination` es un directorio (ya existente, sin extensión o con
+        `as_directory`), se crea si hace falta y el archivo se guarda dentro con
+        su nombre en el servicio.
+        """
+        job = self.status(job_id)
+        remote_path = (job.get("output_files") or {}).get(fmt)
+        destination = Path(destination)
+        if as_directory or destination.is_dir() or not destination.suffix:
+            destination.mkdir(parents=True, exist_ok=True)
+            destination = destination / Path(remote_path or f"{job_id}.{fmt}").name
+        
+        content = self._request("GET", f"/jobs/{job_id}/outputs/{fmt}")
+        destination.write_bytes(content)
+        return destination
@@ -2,31 +2,113 @@
 Módulo para descargar audio de videos de Vimeo.
 """
 import os
-import re
-import yt_dlp
+import time
+import shutil
+import tempfile
+import threading
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import urlparse
 
 from config import settings
 from src.utils import get_safe_filename, Timer
+from src.metrics import metrics, BYTES_BUCKETS
+from src.audio import wav_to_npy
+from src.vimeo import parse_vimeo_url, MetadataCache
 
 logger = logging.getLogger("vimeo_transcriber")
 
+class HostRateLimiter:
+    """Limita el número de peticiones por segundo dirigidas a cada host."""
+    
+    def __init__(self, requests_per_second=None):
+        """
+        Args:
+            requests_per_second: Peticiones por segundo permitidas por host
+                (None o 0 desactiva el límite)
+        """
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, url):
+        """Bloquea hasta que se pueda lanzar una petición a la URL indicada."""
+        if not self.interval:
+            return
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+def _youtube_dl(options):
+    """Crea un cliente de yt-dlp; la librería se importa solo al descargar."""
+    import yt_dlp
+    return yt_dlp.YoutubeDL(options)
+
 class VimeoDownloader:
     """Clase para gestionar la descarga de audio de videos de Vimeo."""
     
-    def __init__(self):
+    def __init__(self, workers=None, rate_limit=None, ydl_factory=None, audio_format=None,
+                 metadata_cache=None, spool=None):
+        """
+        Inicializa el descargador.
+        
+        Args:
+            workers: Número de descargas simultáneas
+            rate_limit: Peticiones por segundo permitidas por host
+            ydl_factory: Clase o función que crea el cliente de descarga
+                (por defecto yt_dlp.YoutubeDL; permite sustituirlo en pruebas)
+            audio_format: "mp3", "wav" (PCM 16 kHz mono) o "npy" (float32 16 kHz mono)
+            metadata_cache: Caché de metadatos de los videos (por defecto MetadataCache())
+            spool: AudioSpool que limita el espacio de los audios en espera (opcional);
+                los audios se descargan en su directorio
+        """
+        self.audio_format = audio_format or settings.AUDIO_CODEC
+        self.workers = max(1, workers or settings.DOWNLOAD_WORKERS)
+        self.rate_limiter = HostRateLimiter(
+            settings.DOWNLOAD_RATE_LIMIT if rate_limit is None else rate_limit
+        )
+        self.ydl_factory = ydl_factory or _youtube_dl
+        self.metadata_cache = metadata_cache or MetadataCache()
+        self.spool = spool
+        self._reserved_paths = set()
+        self._paths_lock = threading.Lock()
+        self._hook_state = threading.local()
         self.download_options = {
             "format": settings.AUDIO_FORMAT,
-            "postprocessors": [{
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": settings.AUDIO_CODEC,
-                "preferredquality": settings.AUDIO_QUALITY
-            }],
             "quiet": False,
             "no_warnings": False,
             "progress_hooks": [self._progress_hook],
+            "postprocessor_hooks": [self._postprocessor_hook],
         }
+        
+        if self.audio_format == "mp3":
+            self.extract_codec = "mp3"
+            self.download_options["postprocessors"] = [{
+                "key": "FFmpegExtractAudio",
+                "preferredcodec": "mp3",
+                "preferredquality": settings.AUDIO_QUALITY
+            }]
+        else:
+            # Extraer directamente el formato de entrada de Whisper (PCM 16 kHz mono)
+            self.extract_codec = "wav"
+            self.download_options["postprocessors"] = [{
+                "key": "FFmpegExtractAudio",
+                "preferredcodec": "wav",
+            }]
+            self.download_options["postprocessor_args"] = {
+                "extractaudio": [
+                    "-ar", str(settings.AUDIO_SAMPLE_RATE),
+                    "-ac", "1",
+                    "-c:a", "pcm_s16le"
+                ]
+            }
     
     def _progress_hook(self, d):
         """Hook para informar sobre el progreso de la descarga."""
@@ -38,16 +120,103 @@ class VimeoDownloader:
         elif d['status'] == 'error':
             logger.error(f"Error en la descarga: {d.get('error')}")
     
+    def _postprocessor_hook(self, d):
+        """Hook para medir el tiempo de extracción de audio con ffmpeg."""
+        if d.get('postprocessor') != 'ExtractAudio':
+            return
+        if d['status'] == 'started':
+            self._hook_state.started = time.monotonic()
+        elif d['status'] == 'finished' and getattr(self._hook_state, 'started', None):
+            elapsed = time.monotonic() - self._hook_state.started
+            self._hook_state.started = None
+            logger.info(f"Extracción de audio ({self.audio_format}) completada en {elapsed:.2f} segundos")
+    
     def validate_vimeo_url(self, url):
-        """Valida que la URL sea de Vimeo y tenga el formato correcto."""
-        # Patrón para URLs de Vimeo
-        pattern = r'^https?://(www\.)?vimeo\.com/(?:\d+)(?:/[a-zA-Z0-9]+)?$'
-        return bool(re.match(pattern, url))
+        """Valida que la URL sea de un video de Vimeo."""
+        return parse_vimeo_url(url) is not None
+    
+    @property
+    def audio_dir(self):
+        """Directorio de los audios descargados (el del spool si hay uno)."""
+        return self.spool.directory if self.spool is not None else settings.AUDIO_DIR
+    
+    def audio_path(self, video_id):
+        """
+        Ruta del audio ya descargado de un video con su nombre por defecto (su
+        ID), en el spool o en AUDIO_DIR; si no existe, la ruta en el spool.
+        """
+        name = f"{video_id}.{self.audio_format}"
+        for directory in (self.audio_dir, settings.AUDIO_DIR):
+            if (directory / name).exists():
+                return directory / name
+        return self.audio_dir / name
+    
+    def existing_audio(self, video_id):
+        """
+        Audio ya descargado de un video, sin consultar la red, o None.
+        
+        Se busca por el ID del video y, si la caché de metadatos conoce su
+        título, por el nombre que se daba a los audios antes de nombrarlos
+        por ID.
+        """
+        path = self.audio_path(video_id)
+        if path.exists():
+            return path
+        title = (self.metadata_cache.get(video_id) or {}).get("title")
+        if title:
+            name = f"{get_safe_filename(title)}.{self.audio_format}"
+            for directory in (self.audio_dir, settings.AUDIO_DIR):
+                if (directory / name).exists():
+                    return directory / name
+        return None
+    
+    def _reserve_destination(self, stem, video_id=None):
+        """
+        Reserva una ruta final libre en el directorio de audios para el audio descargado.
+        
+        Si ya existe un archivo (o una descarga en curso) con el mismo nombre,
+        se añade el identificador del video o un contador para evitar colisiones.
+        """
+        candidates = [stem]
+        if video_id:
+            candidates.append(f"{stem} [{video_id}]")
+        
+        with self._paths_lock:
+            counter = 1
+            while True:
+                for candidate in candidates:
+                    path = self.audio_dir / f"{candidate}.{self.audio_format}"
+                    if path not in self._reserved_paths and not path.exists():
+                        self._reserved_paths.add(path)
+                        return path
+                candidates = [f"{stem} ({counter})"]
+                counter += 1
+    
+    def _release_destination(self, path):
+        """Libera la reserva de una ruta final."""
+        with self._paths_lock:
+            self._reserved_paths.discard(path)
+    
+    def _find_downloaded_file(self, info, staging_dir):
+        """Localiza el audio final dentro del directorio temporal de la descarga."""
+        for download in info.get("requested_downloads") or []:
+            filepath = download.get("filepath")
+            if filepath and os.path.exists(filepath):
+                return Path(filepath)
+        
+        # El directorio temporal es exclusivo de esta descarga: no hay carreras
+        audio_files = list(staging_dir.glob(f"*.{self.extract_codec}"))
+        return audio_files[0] if audio_files else None
     
     def download_audio(self, url, custom_filename=None):
         """
         Descarga el audio de un video de Vimeo.
         
+        Cada descarga se realiza en un directorio temporal propio dentro de
+        el directorio de audios y después se mueve a su ruta final, por lo que
+        es seguro lanzar varias descargas a la vez. Con un spool, la descarga
+        espera a que haya espacio antes de empezar.
+        
         Args:
             url: URL del video de Vimeo
             custom_filename: Nombre de archivo personalizado (opcional)
@@ -55,69 +224,165 @@ class VimeoDownloader:
         Returns:
             Ruta al archivo de audio descargado o None si hay un error
         """
+        video = parse_vimeo_url(url)
+        if video is not None:
+            url = video.url
+            # Un audio ya descargado se reutiliza sin consultar la red
+            existing = self.existing_audio(video.id) if not custom_filename else None
+            if existing is not None:
+                if self.spool is not None:
+                    # Cuenta en el spool como una descarga más hasta que se transcriba
+                    self.spool.reserve()
+                    try:
+                        self.spool.add(existing)
+                    except OSError as e:
+                        self.spool.cancel()
+                        logger.error(f"Error al reutilizar el audio {existing}: {str(e)}")
+                        metrics.inc("downloads_total", result="error")
+                        return None
+                logger.info(f"Audio ya descargado, se reutiliza: {existing}")
+                metrics.inc("downloads_total", result="cached")
+                return existing
+        
+        if self.spool is not None:
+            self.spool.reserve()
+        spooled = False
+        staging_dir = None
         try:
+            os.makedirs(self.audio_dir, exist_ok=True)
+            staging_dir = Path(tempfile.mkdtemp(prefix=".descarga_", dir=self.audio_dir))
+            
             # Preparar opciones de descarga
             options = self.download_options.copy()
             
             if custom_filename:
-                safe_filename = get_safe_filename(custom_filename)
-                output_path = settings.AUDIO_DIR / f"{safe_filename}.%(ext)s"
+                output_path = staging_dir / f"{get_safe_filename(custom_filename)}.%(ext)s"
             else:
-                output_path = settings.AUDIO_DIR / "%(title)s.%(ext)s"
+                output_path = staging_dir / "%(id)s.%(ext)s"
             
             options["outtmpl"] = str(output_path)
             
             # Iniciar la descarga
+            self.rate_limiter.wait(url)
             logger.info(f"Iniciando descarga de: {url}")
-            with Timer("Descarga"):
-                with yt_dlp.YoutubeDL(options) as ydl:
+            with Timer("Descarga", stage="download"):
+                with self.ydl_factory(options) as ydl:
                     info = ydl.extract_info(url, download=True)
-                    
-                    # Obtener la ruta del archivo descargado
-                    if custom_filename:
-                        filename = f"{safe_filename}.{settings.AUDIO_CODEC}"
-                    else:
-                        title = info.get('title', 'unknown_title')
-                        safe_title = get_safe_filename(title)
-                        filename = f"{safe_title}.{settings.AUDIO_CODEC}"
-                    
-                    downloaded_file = settings.AUDIO_DIR / filename
-                    
-                    # Verificar si el archivo existe
-                    if not os.path.exists(downloaded_file):
-                        # Buscar el archivo en el directorio
-                        audio_files = list(settings.AUDIO_DIR.glob(f"*.{settings.AUDIO_CODEC}"))
-                        if audio_files:
-                            # Usar el archivo más reciente
-                            downloaded_file = max(audio_files, key=os.path.getctime)
-                        else:
-                            logger.error("No se encontró el archivo descargado")
-                            return None
-                    
-                    logger.info(f"Audio descargado: {downloaded_file}")
-                    return downloaded_file
+            
+            downloaded_file = self._find_downloaded_file(info, staging_dir)
+            if downloaded_file is None:
+                logger.error("No se encontró el archivo descargado")
+                metrics.inc("downloads_total", result="error")
+                return None
+            
+            if self.audio_format == "npy":
+                with Timer("Conversión a npy", stage="convert_npy"):
+                    downloaded_file = wav_to_npy(downloaded_file, downloaded_file.with_suffix(".npy"))
+            
+            video_id = info.get('id') or (video.id if video else None)
+            if video_id:
+                self.metadata_cache.put(video_id, info)
+            
+            # Mover el audio a su ruta final sin pisar otros archivos: por
+            # defecto se nombra con el ID del video, que no cambia aunque
+            # cambie el título
+            if custom_filename:
+                stem = get_safe_filename(custom_filename)
+            elif video_id:
+                stem = get_safe_filename(str(video_id))
+            else:
+                stem = get_safe_filename(info.get('title', 'unknown_title'))
+            destination = self._reserve_destination(stem, video_id if custom_filename else None)
+            try:
+                os.replace(downloaded_file, destination)
+            finally:
+                self._release_destination(destination)
+            
+            self._log_audio_size(destination, info.get('duration'))
+            if self.spool is not None:
+                self.spool.add(destination)
+                spooled = True
+            return destination
                     
         except Exception as e:
-            logger.error(f"Error al descargar audio: {str(e)}")
+            logger.error(f"Error al descargar audio de {url}: {str(e)}")
+            metrics.inc("downloads_total", result="error")
             return None
+        finally:
+            if staging_dir is not None:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+            if self.spool is not None and not spooled:
+                self.spool.cancel()
+    
+    def _log_audio_size(self, path, duration):
+        """Registra el tamaño del audio descargado y los bytes por hora de audio."""
+        size = os.path.getsize(path)
+        metrics.inc("downloads_total", result="ok")
+        metrics.inc("download_bytes_total", size, format=self.audio_format)
+        metrics.observe("download_bytes", size, buckets=BYTES_BUCKETS, format=self.audio_format)
+        if duration:
+            metrics.inc("downloaded_audio_seconds_total", duration)
+        message = f"Audio descargado: {path} ({size / 1e6:.1f} MB"
+        if duration:
+            message += f", {size / duration * 3600 / 1e6:.1f} MB por hora de audio"
+        logger.info(message + ")")
+    
+    def iter_download(self, urls, workers=None):
+        """
+        Descarga múltiples videos de forma concurrente.
+        
+        Como mucho hay `workers` descargas en curso a la vez, y los resultados
+        se devuelven en el mismo orden que las URLs de entrada.
+        
+        Args:
+            urls: Lista de URLs de Vimeo
+            workers: Número de descargas simultáneas (por defecto self.workers)
             
-    def download_batch(self, urls):
+        Yields:
+            Tuplas (url, ruta al audio o None si la descarga falló)
+        """
+        workers = max(1, workers or self.workers)
+        total = len(urls)
+        
+        if workers == 1:
+            for i, url in enumerate(urls, 1):
+                logger.info(f"Procesando URL {i}/{total}: {url}")
+                yield url, self.download_audio(url)
+            return
+        
+        pending = deque()
+        url_iter = iter(enumerate(urls, 1))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="descarga") as executor:
+            def submit_next():
+                for i, url in url_iter:
+                    logger.info(f"Procesando URL {i}/{total}: {url}")
+                    pending.append((url, executor.submit(self.download_audio, url)))
+                    return
+            
+            for _ in range(workers):
+                submit_next()
+            
+            while pending:
+                url, future = pending.popleft()
+                audio_file = future.result()
+                submit_next()
+                yield url, audio_file
+            
+    def download_batch(self, urls, workers=None):
         """
         Descarga múltiples videos de Vimeo.
         
         Args:
             urls: Lista de URLs de Vimeo
+            workers: Número de descargas simultáneas (por defecto self.workers)
             
         Returns:
-            Lista de rutas a los archivos descargados
+            Lista de rutas a los archivos descargados, en el orden de las URLs
         """
         downloaded_files = []
         failed_urls = []
         
-        for i, url in enumerate(urls, 1):
-            logger.info(f"Procesando URL {i}/{len(urls)}: {url}")
-            audio_file = self.download_audio(url)
-            
+        for url, audio_file in self.iter_download(urls, workers):
             if audio_file:
                 downloaded_files.append(audio_file)
             else:
@@ -130,4 +395,4 @@ class VimeoDownloader:
                 logger.warning(f"  - {url}")
         
         logger.info(f"Descargados {len(downloaded_files)} de {len(urls)} videos")
-        return downloaded_files
\ No newline at end of file
+        return downloaded_files
@@ -0,0 +1,133 @@
+"""
+Motores de inferencia para los modelos de Whisper.
+
+- fp32: el modelo tal como lo carga whisper.load_model.
+- int8: cuantización dinámica a int8 de las capas lineales (solo CPU). Los
+  pesos cuantizados se guardan en disco para que las siguientes cargas no
+  tengan que leer ni cuantizar el modelo fp32.
+"""
+import os
+import re
+import logging
+import tempfile
+from dataclasses import asdict
+from pathlib import Path
+
+from config import settings
+
+logger = logging.getLogger("vimeo_transcriber")
+
+ENGINES = ("fp32", "int8")
+
+def load_engine_model(model_name, engine=None, cache_dir=None):
+    """
+    Carga un modelo de Whisper con el motor indicado.
+    
+    Args:
+        model_name: Nombre del modelo de Whisper
+        engine: "fp32" o "int8" (por defecto settings.INFERENCE_ENGINE)
+        cache_dir: Directorio de los modelos cuantizados (por defecto settings.QUANTIZED_MODEL_DIR)
+    """
+    import whisper
+    
+    engine = engine or settings.INFERENCE_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Motor de inferencia no soportado: {engine}")
+    if engine == "fp32":
+        return whisper.load_model(model_name)
+    
+    path = quantized_model_path(model_name, cache_dir)
+    if path.exists():
+        try:
+            return _load_quantized(model_name, path)
+        except Exception as e:
+            logger.warning(f"No se pudo cargar el modelo cuantizado {path}, se regenera: {str(e)}")
+    
+    model = quantize_model(whisper.load_model(model_name, device="cpu"))
+    _save_quantized(model, path)
+    return model
+
+def quantized_model_path(model_name, cache_dir=None):
+    cache_dir = Path(cache_dir) if cache_dir else settings.QUANTIZED_MODEL_DIR
+    return cache_dir / f"{model_name}-int8.pt"
+
+def quantize_model(model):
+    """
+    Aplica cuantización dinámica int8 a las capas lineales de un modelo fp32.
+    
+    whisper.model.Linear es una subclase de nn.Linear que quantize_dynamic no
+    reconoce, así que antes se convierten a nn.Linear (comparten los mismos
+    parámetros; la subclase solo adapta el tipo de dato en forward).
+    """
+    import torch
+    import whisper.model
+    
+    model = model.cpu().float().eval()
+    for module in model.modules():
+        if isinstance(module, whisper.model.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def _save_quantized(model, path):
+    """Guarda las dimensiones y los pesos cuantizados de forma atómica."""
+    import torch
+    
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        torch.save({
+            "dims": asdict(model.dims),
+            "torch_version": torch.__version__,
+            "model_state_dict": model.state_dict(),
+        }, tmp_path)
+        os.replace(tmp_path, path)
+        logger.info(f"Modelo cuantizado guardado en: {path}")
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _load_quantized(model_name, path):
+    """Reconstruye un modelo cuantizado a partir de los pesos guardados."""
+    import torch
+    import whisper
+    from whisper.model import ModelDimensions, Whisper
+    
+    checkpoint = torch.load(path, map_location="cpu", weights_only=False)
+    if checkpoint.get("torch_version") != torch.__version__:
+        raise RuntimeError(f"guardado con torch {checkpoint.get('torch_version')}")
+    
+    # La estructura debe coincidir con la del modelo cuantizado para cargar sus pesos
+    model = quantize_model(Whisper(ModelDimensions(**checkpoint["dims"])))
+    model.load_state_dict(checkpoint["model_state_dict"])
+    alignment_heads = whisper._ALIGNMENT_HEADS.get(model_name)
+    if alignment_heads is not None:
+        model.set_alignment_heads(alignment_heads)
+    return model
+
+def _words(text):
+    return re.findall(r"\w+", text.lower())
+
+def word_error_rate(reference, hypothesis):
+    """
+    Tasa de error por palabras de `hypothesis` respecto a `reference`
+    (distancia de edición entre palabras dividida por las palabras de la
+    referencia), sin distinguir mayúsculas ni signos de puntuación.
+    """
+    ref = _words(reference)
+    hyp = _words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word)
+            )
+        previous = current
+    return previous[-1] / len(ref)
@@ -0,0 +1,389 @@
+"""
+Cola de trabajos persistente (SQLite) compartida por varios procesos o equipos.
+
+Cada URL avanza por los estados pending -> downloaded -> transcribed -> done
+(o failed tras agotar sus intentos). Un proceso trabajador reclama una URL
+con una concesión (lease) con caducidad que renueva mientras la procesa; si el
+proceso muere, la concesión caduca y otro trabajador continúa la URL desde su
+último estado.
+"""
+import os
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+from config import settings
+
+logger = logging.getLogger("vimeo_transcriber")
+
+STATES = ("pending", "downloaded", "transcribed", "done", "failed")
+# Estados de las URLs que aún tienen trabajo por hacer
+ACTIVE_STATES = ("pending", "downloaded", "transcribed")
+
+Job = namedtuple("Job", ["url", "state", "attempts", "audio_file"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    url TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    audio_file TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state, lease_expires);
+"""
+
+def worker_id():
+    """Identificador de este proceso trabajador (equipo y PID)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class JobStore:
+    """
+    Estado persistente de un lote de URLs.
+    
+    Cada operación abre su propia conexión, por lo que se puede usar desde
+    varios hilos; las reclamaciones se hacen en una transacción exclusiva
+    para que dos trabajadores nunca reciban la misma URL. No usa el modo WAL,
+    que no funciona sobre sistemas de archivos de red.
+    """
+    
+    def __init__(self, db_path=None, lease_seconds=None, max_attempts=None, retry_seconds=None):
+        """
+        Args:
+            db_path: Ruta de la base de datos (por defecto settings.JOB_DB_PATH)
+            lease_seconds: Duración de una concesión (por defecto settings.JOB_LEASE_SECONDS)
+            max_attempts: Intentos por URL antes de marcarla como fallida
+                (por defecto settings.JOB_MAX_ATTEMPTS)
+            retry_seconds: Espera antes del primer reintento de una URL fallida
+                (por defecto settings.JOB_RETRY_SECONDS)
+        """
+        self.db_path = Path(db_path or settings.JOB_DB_PATH)
+        self.lease_seconds = lease_seconds or settings.JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        self.retry_seconds = settings.JOB_RETRY_SECONDS if retry_seconds is None else retry_seconds
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+    
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=60, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout = 60000")
+        return _Connection(conn)
+    
+    def add(self, urls):
+        """
+        Añade URLs en estado pending; las que ya existen no se modifican.
+        
+        Returns:
+            Número de URLs nuevas
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (url, created, updated) VALUES (?, ?, ?)",
+                [(url, now, now) for url in urls]
+            )
+            after = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            conn.execute("COMMIT")
+        return after - before
+    
+    def claim(self, owner):
+        """
+        Reclama la siguiente URL con trabajo pendiente y sin concesión vigente.
+        
+        Cada reclamación cuenta como un intento; las URLs que ya han agotado
+        sus intentos se marcan como fallidas.
+        
+        Returns:
+            Job o None si no hay ninguna URL disponible
+        """
+        now = time.time()
+        placeholders = ",".join("?" * len(ACTIVE_STATES))
+        available = f"state IN ({placeholders}) AND (lease_expires IS NULL OR lease_expires < ?)"
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                f"UPDATE jobs SET state = 'failed', lease_owner = NULL, lease_expires = NULL, updated = ?, "
+                f"error = COALESCE(error, 'Intentos agotados') WHERE {available} AND attempts >= ?",
+                (now, *ACTIVE_STATES, now, self.max_attempts)
+            )
+            row = conn.execute(
+                f"SELECT url, state, attempts, audio_file FROM jobs WHERE {available} "
+                "ORDER BY created, rowid LIMIT 1",
+                (*ACTIVE_STATES, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated = ? "
+                    "WHERE url = ?",
+                    (owner, now + self.lease_seconds, now, row[0])
+                )
+            conn.execute("COMMIT")
+        if row is None:
+            return None
+        return Job(row[0], row[1], row[2] + 1, row[3])
+    
+    def renew(self, url, owner):
+        """Prolonga la concesión de una URL. Devuelve False si ya no es de `owner`."""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated = ? WHERE url = ? AND lease_owner = ?",
+                (now + self.lease_seconds, now, url, owner)
+            )
+        return cursor.rowcount > 0
+    
+    def advance(self, url, owner, state, audio_file=None):
+        """
+        Registra que una URL ha llegado a `state`. Al llegar a done se libera
+        la concesión. Devuelve False si la concesión ya no es de `owner`.
+        """
+        if state not in STATES:
+            raise ValueError(f"Estado no válido: {state}")
+        now = time.time()
+        release = state == "done"
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = ?, audio_file = COALESCE(?, audio_file), error = NULL, updated = ?, "
+                "lease_owner = CASE WHEN ? THEN NULL ELSE lease_owner END, "
+                "lease_expires = CASE WHEN ? THEN NULL ELSE lease_expires END "
+                "WHERE url = ? AND lease_owner = ?",
+                (state, str(audio_file) if audio_file else None, now, release, release, url, owner)
+            )
+        return cursor.rowcount > 0
+    
+    def fail(self, url, owner, error):
+        """
+        Registra un error y libera la concesión. La URL se reintentará desde
+        su estado actual mientras le queden intentos, tras una espera que se
+        duplica en cada intento; si no le quedan, queda como failed.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET error = ?, lease_owner = NULL, updated = ?, "
+                "lease_expires = ? * (1 << MAX(attempts - 1, 0)) + ?, "
+                "state = CASE WHEN attempts >= ? THEN 'failed' ELSE state END "
+                "WHERE url = ? AND lease_owner = ?",
+                (str(error), now, self.retry_seconds, now, self.max_attempts, url, owner)
+            )
+    
+    def retry_failed(self):
+        """Vuelve a poner en cola las URLs fallidas con los intentos a cero."""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = CASE WHEN audio_file IS NULL THEN 'pending' ELSE 'downloaded' END, "
+                "attempts = 0, lease_expires = NULL, error = NULL, updated = ? WHERE state = 'failed'",
+                (now,)
+            )
+        return cursor.rowcount
+    
+    def get(self, url):
+        """Estado actual de una URL (Job) o None si no está en la cola."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT url, state, attempts, audio_file FROM jobs WHERE url = ?", (url,)
+            ).fetchone()
+        return Job(*row) if row is not None else None
+    
+    def counts(self):
+        """Número de URLs en cada estado."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(rows)
+        return counts
+    
+    def failures(self):
+        """Lista de (url, intentos, error) de las URLs fallidas."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT url, attempts, error FROM jobs WHERE state = 'failed' ORDER BY created, rowid"
+            ).fetchall()
+    
+    def unfinished(self):
+        """Número de URLs que aún tienen trabajo por hacer (con o sin concesión)."""
+        placeholders = ",".join("?" * len(ACTIVE_STATES))
+        with self._connect() as conn:
+            return conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE state IN ({placeholders})", ACTIVE_STATES
+            ).fetchone()[0]
+
+class _Connection:
+    """Conexión que se cierra al salir del bloque with (sqlite3 solo confirma)."""
+    
+    def __init__(self, conn):
+        self.conn = conn
+    
+    def __enter__(self):
+        return self.conn
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None and self.conn.in_transaction:
+            self.conn.execute("ROLLBACK")
+        self.conn.close()
+        return False
+
+class _LeaseKeeper:
+    """Renueva en segundo plano la concesión de una URL mientras se procesa."""
+    
+    def __init__(self, store, url, owner):
+        self.store = store
+        self.url = url
+        self.owner = owner
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease", daemon=True)
+    
+    def _run(self):
+        interval = max(1.0, self.store.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            try:
+                if not self.store.renew(self.url, self.owner):
+                    logger.warning(f"Se ha perdido la concesión de {self.url}")
+                    return
+            except sqlite3.Error as e:
+                logger.warning(f"No se pudo renovar la concesión de {self.url}: {str(e)}")
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+class JobWorker:
+    """
+    Procesa las URLs de un JobStore hasta que no queda trabajo.
+    
+    Cada URL se retoma desde su último estado: si el audio descargado ya no
+    existe (por ejemplo, porque lo descargó otro equipo) se vuelve a
+    descargar.
+    """
+    
+    def __init__(self, store, downloader, transcriber, output_dir=None, keep_audio=False, poll_seconds=None):
+        """
+        Args:
+            store: Instancia de JobStore
+            downloader: Instancia de VimeoDownloader
+            transcriber: Instancia de WhisperTranscriber
+            output_dir: Directorio donde guardar las transcripciones
+            keep_audio: Si es False, elimina los audios después de transcribirlos
+            poll_seconds: Espera entre comprobaciones cuando las URLs restantes
+                están concedidas a otros trabajadores (por defecto settings.JOB_POLL_SECONDS)
+        """
+        self.store = store
+        self.downloader = downloader
+        self.transcriber = transcriber
+        self.output_dir = output_dir
+        self.keep_audio = keep_audio
+        self.poll_seconds = settings.JOB_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self.owner = worker_id()
+    
+    def run(self):
+        """
+        Procesa URLs hasta que todas están terminadas o fallidas. Mientras
+        otros trabajadores tengan URLs concedidas se sigue esperando, por si
+        alguno muere y su concesión caduca.
+        
+        Returns:
+            Número de URLs procesadas por este trabajador
+        """
+        processed = 0
+        while True:
+            job = self.store.claim(self.owner)
+            if job is None:
+                if not self.store.unfinished():
+                    break
+                time.sleep(self.poll_seconds)
+                continue
+            
+            logger.info(f"Trabajo reclamado: {job.url} [{job.state}, intento {job.attempts}]")
+            with _LeaseKeeper(self.store, job.url, self.owner):
+                try:
+                    if self.process(job):
+                        processed += 1
+                except Exception as e:
+                    logger.error(f"Error al procesar {job.url}: {str(e)}")
+                    self.store.fail(job.url, self.owner, e)
+        return processed
+    
+    def process(self, job):
+        """
+        Lleva una URL desde su estado actual hasta done.
+        
+        Returns:
+            False si se pierde la concesión por el camino (la URL ya es de otro
+            trabajador y se abandona sin marcarla como fallida), True si no
+        """
+        state = job.state
+        audio_file = Path(job.audio_file) if job.audio_file else None
+        
+        if state == "downloaded" and (audio_file is None or not audio_file.exists()):
+            logger.info(f"El audio de {job.url} no está en este equipo, se descarga de nuevo")
+            state = "pending"
+        
+        if state == "pending":
+            audio_file = self.downloader.download_audio(job.url)
+            if not audio_file:
+                raise RuntimeError("No se pudo descargar el audio")
+            if not self._advance(job, "downloaded", audio_file):
+                return self._abandon(job, audio_file)
+            state = "downloaded"
+        
+        if state == "downloaded":
+            # La transcripción es la etapa larga: no se empieza sin la concesión
+            if not self.store.renew(job.url, self.owner):
+                logger.warning(f"Se ha perdido la concesión de {job.url} antes de transcribir, se abandona")
+                return self._abandon(job, audio_file)
+            transcription = self.transcriber.transcribe(audio_file, self.output_dir)
+            if not transcription:
+                raise RuntimeError("La transcripción no devolvió resultados")
+            if not self._advance(job, "transcribed"):
+                return self._abandon(job, audio_file)
+            state = "transcribed"
+        
+        if state == "transcribed":
+            if not self.keep_audio and audio_file is not None and audio_file.exists():
+                os.remove(audio_file)
+                logger.info(f"Archivo de audio eliminado: {audio_file}")
+            if not self._advance(job, "done"):
+                return False
+        return True
+    
+    def _advance(self, job, state, audio_file=None):
+        """Registra el avance de una URL; False si ya no es de este trabajador."""
+        if self.store.advance(job.url, self.owner, state, audio_file):
+            return True
+        logger.warning(f"Se ha perdido la concesión de {job.url} antes de llegar a {state}, se abandona")
+        return False
+    
+    def _abandon(self, job, audio_file):
+        """
+        Abandona una URL cuya concesión se ha perdido. Su audio se elimina
+        (salvo con keep_audio) si la URL no lo tiene registrado, porque en ese
+        caso el nuevo trabajador no lo va a usar.
+        
+        Returns:
+            False, para devolverlo desde process
+        """
+        if self.keep_audio or audio_file is None or not audio_file.exists():
+            return False
+        current = self.store.get(job.url)
+        if current is not None and current.audio_file and Path(current.audio_file) == Path(audio_file):
+            return False
+        os.remove(audio_file)
+        logger.info(f"Archivo de audio eliminado: {audio_file}")
+        return False
@@ -0,0 +1,250 @@
+"""
+Métricas de rendimiento del proceso: contadores e histogramas con etiquetas,
+exportables como archivo de texto de Prometheus y como resumen JSON.
+"""
+import os
+import json
+import math
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+# Límites superiores de los histogramas
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+RATIO_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5)
+BYTES_BUCKETS = (1e5, 1e6, 1e7, 5e7, 1e8, 5e8, 1e9)
+
+# Descripción de las métricas conocidas (línea HELP de Prometheus)
+DESCRIPTIONS = {
+    "stage_seconds": "Duración de cada etapa del proceso en segundos",
+    "download_bytes_total": "Bytes de audio descargados",
+    "download_bytes": "Tamaño de cada audio descargado en bytes",
+    "downloads_total": "Descargas terminadas por resultado (ok, cached o error)",
+    "downloaded_audio_seconds_total": "Segundos de audio descargados",
+    "audio_seconds_total": "Segundos de audio transcritos",
+    "realtime_factor": "Tiempo de inferencia dividido por la duración del audio",
+    "model_load_seconds": "Tiempo de carga de cada modelo en segundos",
+    "cache_requests_total": "Consultas a la caché de transcripciones por resultado",
+    "metadata_requests_total": "Consultas a la caché de metadatos de videos por resultado",
+    "batch_windows_total": "Ventanas de 30 s decodificadas en lotes",
+    "batch_fallback_windows_total": "Ventanas de un lote repetidas con model.transcribe",
+    "jobs_total": "Trabajos del servicio terminados por estado",
+    "vad_speech_seconds_total": "Segundos de audio con voz que se transcriben con el VAD activado",
+    "vad_skipped_seconds_total": "Segundos de silencio o música que el VAD evita transcribir",
+    "cascade_audio_seconds_total": "Segundos de audio revisados por la cascada de modelos",
+    "cascade_escalated_seconds_total": "Segundos de audio re-transcritos con el modelo mayor de la cascada",
+    "watch_files_total": "Audios nuevos detectados en el directorio vigilado",
+    "spool_bytes": "Bytes de audio en el spool tras cada descarga",
+    "spool_wait_seconds": "Tiempo que una descarga espera a que haya espacio en el spool",
+    "transcriptions_total": "Archivos transcritos por origen (modelo, caché o error)",
+}
+
+class Histogram:
+    """Histograma acumulado con suma, número de observaciones, mínimo y máximo."""
+    
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+    
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+    
+    def cumulative_counts(self):
+        """Observaciones menores o iguales que cada límite (formato de Prometheus)."""
+        total = 0
+        cumulative = []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+    
+    def quantile(self, q):
+        """Estimación de un cuantil por interpolación lineal dentro del bucket."""
+        if not self.count:
+            return None
+        target = q * self.count
+        lower = 0.0
+        for bound, count, cumulative in zip(self.buckets, self.counts, self.cumulative_counts()):
+            if cumulative >= target and count:
+                fraction = (target - (cumulative - count)) / count
+                return min(self.max, max(self.min, lower + (bound - lower) * fraction))
+            lower = bound
+        return self.max
+    
+    def summary(self):
+        if not self.count:
+            return {"count": 0, "sum": 0.0}
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+class MetricsRegistry:
+    """
+    Registro de métricas del proceso.
+    
+    Cada métrica se identifica por su nombre y un conjunto de etiquetas
+    (por ejemplo stage="download"). Es seguro usarlo desde varios hilos.
+    """
+    
+    def __init__(self, prefix="vimeo_transcriber"):
+        self.prefix = prefix
+        self.started = datetime.now()
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+    
+    def inc(self, name, value=1, **labels):
+        """Incrementa un contador."""
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+    
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        """Añade una observación a un histograma."""
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+    
+    def value(self, name, **labels):
+        """Valor actual de un contador (0 si no existe)."""
+        with self._lock:
+            return self._counters.get(name, {}).get(self._key(labels), 0)
+    
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started = datetime.now()
+    
+    def _format_labels(self, key, extra=None):
+        pairs = list(key) + (extra or [])
+        if not pairs:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+    
+    def to_prometheus(self):
+        """Devuelve las métricas en el formato de texto de Prometheus."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full_name = f"{self.prefix}_{name}"
+                if name in DESCRIPTIONS:
+                    lines.append(f"# HELP {full_name} {DESCRIPTIONS[name]}")
+                lines.append(f"# TYPE {full_name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full_name}{self._format_labels(key)} {value}")
+            
+            for name, series in sorted(self._histograms.items()):
+                full_name = f"{self.prefix}_{name}"
+                if name in DESCRIPTIONS:
+                    lines.append(f"# HELP {full_name} {DESCRIPTIONS[name]}")
+                lines.append(f"# TYPE {full_name} histogram")
+                for key, histogram in sorted(series.items()):
+                    for bound, cumulative in zip(histogram.buckets, histogram.cumulative_counts()):
+                        labels = self._format_labels(key, [("le", f"{bound:g}")])
+                        lines.append(f"{full_name}_bucket{labels} {cumulative}")
+                    labels = self._format_labels(key, [("le", "+Inf")])
+                    lines.append(f"{full_name}_bucket{labels} {histogram.count}")
+                    lines.append(f"{full_name}_sum{self._format_labels(key)} {histogram.sum}")
+                    lines.append(f"{full_name}_count{self._format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+    
+    def summary(self):
+        """Resumen de la ejecución como diccionario serializable a JSON."""
+        def label_text(key):
+            return ",".join(f"{name}={value}" for name, value in key) or "total"
+        
+        with self._lock:
+            counters = {
+                name: {label_text(key): value for key, value in sorted(series.items())}
+                for name, series in sorted(self._counters.items())
+            }
+            histograms = {
+                name: {label_text(key): histogram.summary() for key, histogram in sorted(series.items())}
+                for name, series in sorted(self._histograms.items())
+            }
+        
+        summary = {
+            "started": self.started.isoformat(timespec="seconds"),
+            "finished": datetime.now().isoformat(timespec="seconds"),
+            "counters": counters,
+            "histograms": histograms,
+        }
+        
+        # Tasa de aciertos de la caché
+        cache = counters.get("cache_requests_total", {})
+        hits = cache.get("result=hit", 0)
+        lookups = hits + cache.get("result=miss", 0)
+        if lookups:
+            summary["cache_hit_rate"] = hits / lookups
+        return summary
+    
+    def write_prometheus(self, path):
+        """
+        Escribe las métricas en un archivo de texto para el textfile collector
+        de node_exporter. La escritura es atómica para que nunca se lea a medias.
+        """
+        _atomic_write(path, self.to_prometheus())
+    
+    def write_json(self, path):
+        _atomic_write(path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+    
+    def export(self, directory):
+        """
+        Exporta las métricas a un directorio: `vimeo_transcriber.prom` (se
+        sobrescribe en cada exportación) y `run_<fecha>.json` con el resumen
+        de esta ejecución.
+        
+        Returns:
+            Tupla (ruta del archivo de Prometheus, ruta del resumen JSON)
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        prom_path = directory / f"{self.prefix}.prom"
+        json_path = directory / f"run_{self.started.strftime('%Y%m%d_%H%M%S')}.json"
+        self.write_prometheus(prom_path)
+        self.write_json(json_path)
+        return prom_path, json_path
+
+def _atomic_write(path, text):
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+# Registro compartido por todo el proceso
+metrics = MetricsRegistry()
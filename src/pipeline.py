@@ -0,0 +1,258 @@
+"""
+Módulo para encadenar la descarga y la transcripción en etapas solapadas.
+"""
+import os
+import queue
+import threading
+import logging
+
+from config import settings
+
+logger = logging.getLogger("vimeo_transcriber")
+
+# Marca de fin de la etapa de descarga
+_FIN = object()
+
+class BatchPipeline:
+    """
+    Ejecuta un lote como dos etapas conectadas por una cola acotada.
+    
+    Un hilo descarga los audios y los deja en la cola mientras el hilo
+    principal los transcribe, de modo que la transcripción del video N se
+    solapa con la descarga del video N+1.
+    """
+    
+    def __init__(self, downloader, transcriber, queue_size=None, spool=None):
+        """
+        Inicializa el pipeline.
+        
+        Args:
+            downloader: Instancia de VimeoDownloader
+            transcriber: Instancia de WhisperTranscriber
+            queue_size: Número máximo de audios descargados en espera
+            spool: AudioSpool del descargador (opcional), que se libera a medida
+                que se transcriben los audios
+        """
+        self.downloader = downloader
+        self.transcriber = transcriber
+        self.spool = spool
+        self.queue_size = queue_size or settings.PIPELINE_QUEUE_SIZE
+        self._queue = None
+        self._stop = threading.Event()
+    
+    def _put(self, item):
+        """Encola un elemento sin bloquearse indefinidamente si se detiene el pipeline."""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _download_stage(self, urls, results):
+        """Etapa de descarga: produce (índice, ruta de audio) en la cola."""
+        downloads = self.downloader.iter_download(urls)
+        try:
+            for i, (url, audio_file) in enumerate(downloads):
+                if not audio_file:
+                    results[i]["status"] = "download_error"
+                    results[i]["error"] = "No se pudo descargar el audio"
+                    continue
+                
+                results[i]["audio_file"] = audio_file
+                if self._stop.is_set() or not self._put((i, audio_file)):
+                    break
+        except Exception as e:
+            logger.error(f"Error inesperado en la etapa de descarga: {str(e)}")
+        finally:
+            downloads.close()
+            self._put(_FIN)
+    
+    def _transcribe_stage(self, results, output_dir, keep_audio):
+        """Etapa de transcripción: consume la cola hasta recibir la marca de fin."""
+        while True:
+            item = self._queue.get()
+            if item is _FIN:
+                break
+            
+            i, audio_file = item
+            try:
+                transcription = self.transcriber.transcribe(audio_file, output_dir)
+                if transcription:
+                    results[i]["status"] = "ok"
+                    if not keep_audio:
+                        os.remove(audio_file)
+                        logger.info(f"Archivo de audio eliminado: {audio_file}")
+                else:
+                    results[i]["status"] = "transcription_error"
+                    results[i]["error"] = "La transcripción no devolvió resultados"
+            except Exception as e:
+                logger.error(f"Error al transcribir {audio_file}: {str(e)}")
+                results[i]["status"] = "transcription_error"
+                results[i]["error"] = str(e)
+            finally:
+                if self.spool is not None:
+                    self.spool.release(audio_file, keep_dir=settings.AUDIO_DIR)
+    
+    def _shutdown(self, producer):
+        """Detiene la etapa de descarga y vacía la cola."""
+        self._stop.set()
+        while producer.is_alive():
+            try:
+                self._queue.get(timeout=0.5)
+            except queue.Empty:
+                pass
+        producer.join()
+    
+    def run(self, urls, output_dir=None, keep_audio=False):
+        """
+        Descarga y transcribe un lote de URLs con las etapas solapadas.
+        
+        Args:
+            urls: Lista de URLs de Vimeo
+            output_dir: Directorio donde guardar las transcripciones
+            keep_audio: Si es False, elimina los audios después de transcribirlos
+        
+        Returns:
+            Lista de diccionarios, uno por URL y en el mismo orden, con:
+            - url: La URL procesada
+            - audio_file: Ruta al audio descargado (o None)
+            - status: "ok", "download_error", "transcription_error" o "pending"
+            - error: Descripción del error (o None)
+        """
+        results = [
+            {"url": url, "audio_file": None, "status": "pending", "error": None}
+            for url in urls
+        ]
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._stop.clear()
+        
+        producer = threading.Thread(
+            target=self._download_stage,
+            args=(urls, results),
+            name="pipeline-download",
+            daemon=True
+        )
+        producer.start()
+        
+        try:
+            self._transcribe_stage(results, output_dir, keep_audio)
+            producer.join()
+        except BaseException as e:
+            if isinstance(e, KeyboardInterrupt):
+                logger.warning("Interrupción recibida, deteniendo el pipeline...")
+            # Sin consumidor, el hilo de descarga se quedaría esperando en la cola
+            self._shutdown(producer)
+            raise
+        finally:
+            self._report(results)
+        
+        return results
+    
+    def _report(self, results):
+        """Registra el resultado de cada elemento del lote."""
+        failed = [r for r in results if r["status"] != "ok"]
+        if failed:
+            logger.warning(f"No se pudieron procesar {len(failed)} videos")
+            for r in failed:
+                logger.warning(f"  - {r['url']} [{r['status']}]: {r['error']}")
+        
+        done = len(results) - len(failed)
+        logger.info(f"Procesados {done} de {len(results)} videos")
+
+class SpoolPipeline:
+    """
+    Descarga un lote en un AudioSpool mientras se transcriben, en grupos, los
+    audios que ya están descargados.
+    
+    Cada grupo se transcribe con iter_transcribe (con sus procesos o lotes de
+    inferencia). Las descargas se detienen cuando el spool está lleno y
+    continúan a medida que se transcriben y eliminan los audios, de modo que
+    el lote ocupa un espacio en disco acotado.
+    """
+    
+    def __init__(self, downloader, transcriber, spool):
+        """
+        Args:
+            downloader: VimeoDownloader creado con el mismo spool
+            transcriber: Instancia de WhisperTranscriber
+            spool: AudioSpool donde se descargan los audios
+        """
+        self.downloader = downloader
+        self.transcriber = transcriber
+        self.spool = spool
+    
+    def _download_stage(self, urls, ready):
+        """Descarga las URLs y deja en `ready` las rutas de los audios."""
+        failed = 0
+        try:
+            for url, audio_file in self.downloader.iter_download(urls):
+                if audio_file:
+                    ready.put(audio_file)
+                else:
+                    failed += 1
+        except Exception as e:
+            logger.error(f"Error inesperado en la etapa de descarga: {str(e)}")
+        finally:
+            if failed:
+                logger.warning(f"No se pudieron descargar {failed} videos")
+            ready.put(_FIN)
+    
+    def run(self, urls, output_dir=None, keep_audio=False, workers=None, batch_size=None):
+        """
+        Descarga y transcribe un lote de URLs.
+        
+        Args:
+            urls: Lista de URLs de Vimeo
+            output_dir: Directorio donde guardar las transcripciones
+            keep_audio: Si es False, elimina los audios después de transcribirlos;
+                si es True, se mueven a AUDIO_DIR cuando el spool está en otro directorio
+            workers: Procesos de transcripción (ver iter_transcribe)
+            batch_size: Ventanas por lote de inferencia (ver iter_transcribe)
+        
+        Returns:
+            Número de audios transcritos correctamente
+        """
+        ready = queue.Queue()
+        producer = threading.Thread(
+            target=self._download_stage,
+            args=(urls, ready),
+            name="spool-download",
+            daemon=True
+        )
+        producer.start()
+        
+        transcribed = 0
+        finished = False
+        while not finished:
+            # Se espera al primer audio y se añaden los que ya estén listos
+            group = [ready.get()]
+            while True:
+                try:
+                    group.append(ready.get_nowait())
+                except queue.Empty:
+                    break
+            if group[-1] is _FIN:
+                finished = True
+                group.pop()
+            if not group:
+                continue
+            
+            logger.info(f"Transcribiendo {len(group)} audios del spool ({self.spool.describe()})")
+            try:
+                for result in self.transcriber.iter_transcribe(
+                    group,
+                    output_dir=output_dir,
+                    keep_audio=keep_audio,
+                    workers=workers,
+                    batch_size=batch_size
+                ):
+                    transcribed += result.ok
+            finally:
+                for audio_file in group:
+                    self.spool.release(audio_file, keep_dir=settings.AUDIO_DIR)
+        
+        producer.join()
+        logger.info(f"Transcritos {transcribed} de {len(urls)} videos")
+        return transcribed
@@ -0,0 +1,243 @@
+"""
+Pool de procesos de transcripción con un modelo residente por proceso.
+"""
+import os
+import logging
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+
+from config import settings
+
+logger = logging.getLogger("vimeo_transcriber")
+
+def threads_per_worker(workers, cpu_count=None):
+    """Reparte los núcleos disponibles entre los procesos del pool."""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return max(1, cpu_count // max(1, workers))
+
+def _worker_main(worker_id, model_name, language, decode_options, num_threads, engine, vad, tasks, results):
+    """
+    Proceso del pool: carga el modelo una sola vez y atiende tareas con él
+    (ver serve_tasks).
+    """
+    import torch
+    from src.transcriber import WhisperTranscriber
+    
+    torch.set_num_threads(num_threads)
+    transcriber = WhisperTranscriber(model_name=model_name, language=language, engine=engine)
+    transcriber.decode_options = dict(decode_options)
+    transcriber.vad = vad is not None
+    if vad is not None:
+        transcriber.vad_threshold_db = vad
+    
+    try:
+        transcriber.load_model()
+    except Exception as e:
+        results.send(("fatal", worker_id, None, str(e)))
+        return
+    
+    def transcribe(audio):
+        if isinstance(audio, str):
+            audio = transcriber.load_audio(audio)
+        return transcriber.run_speech(audio)
+    
+    serve_tasks(worker_id, transcribe, tasks, results)
+
+def serve_tasks(worker_id, transcribe, tasks, results):
+    """
+    Bucle de un proceso del pool.
+    
+    El proceso avisa de que está libre y recibe por su tubería de tareas una
+    tarea cada vez, hasta recibir None. Los resultados se envían al proceso
+    padre por una tubería propia (el envío es síncrono, así que no se pierden
+    resultados si el proceso muere después). Como es el padre quien asigna
+    cada tarea a un proceso concreto, siempre sabe cuál se perdió si el
+    proceso muere.
+    """
+    results.send(("ready", worker_id, None, None))
+    while True:
+        try:
+            task = tasks.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        
+        task_index, audio = task
+        try:
+            results.send(("done", worker_id, task_index, transcribe(audio)))
+        except Exception as e:
+            results.send(("error", worker_id, task_index, str(e)))
+
+class TranscriptionPool:
+    """
+    Conjunto de procesos que transcriben audios en paralelo.
+    
+    Cada proceso carga su propio modelo de Whisper y limita los hilos de
+    PyTorch a su parte de los núcleos para no sobresuscribir la máquina.
+    """
+    
+    def __init__(self, model_name, language, workers=None, decode_options=None, num_threads=None, engine=None,
+                 vad_threshold_db=None, worker_main=None):
+        """
+        Inicializa el pool.
+        
+        Args:
+            model_name: Nombre del modelo de Whisper
+            language: Código de idioma para la transcripción
+            workers: Número de procesos
+            decode_options: Opciones adicionales para model.transcribe
+            num_threads: Hilos de PyTorch por proceso (por defecto se reparten los núcleos)
+            engine: Motor de inferencia de cada proceso (por defecto settings.INFERENCE_ENGINE)
+            vad_threshold_db: Umbral del VAD que se aplica a cada audio antes de
+                transcribirlo (None para no aplicarlo)
+            worker_main: Función que ejecuta cada proceso, con los argumentos de
+                _worker_main (por defecto _worker_main; útil en pruebas)
+        """
+        self.model_name = model_name
+        self.language = language
+        self.workers = max(1, workers or settings.TRANSCRIPTION_WORKERS)
+        self.decode_options = decode_options or {}
+        self.num_threads = num_threads or threads_per_worker(self.workers)
+        self.engine = engine or settings.INFERENCE_ENGINE
+        self.vad_threshold_db = vad_threshold_db
+        self.worker_main = worker_main or _worker_main
+        self._context = multiprocessing.get_context("spawn")
+        # Por proceso: tubería de tareas (escritura) y de resultados (lectura)
+        self._tasks = []
+        self._connections = []
+        self._processes = []
+        # Conexiones de resultados que siguen abiertas
+        self._open = []
+        # Procesos libres y tarea asignada a cada proceso ocupado
+        self._idle = deque()
+        self._assigned = {}
+        # Contador de tareas, para no confundir resultados de llamadas anteriores
+        self._sequence = 0
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(terminate=exc_type is not None)
+        return False
+    
+    def start(self):
+        """Lanza los procesos del pool."""
+        logger.info(
+            f"Iniciando {self.workers} procesos de transcripción "
+            f"({self.num_threads} hilos cada uno, modelo {self.model_name})"
+        )
+        for worker_id in range(self.workers):
+            task_reader, task_writer = self._context.Pipe(duplex=False)
+            reader, writer = self._context.Pipe(duplex=False)
+            process = self._context.Process(
+                target=self.worker_main,
+                args=(worker_id, self.model_name, self.language, self.decode_options,
+                      self.num_threads, self.engine, self.vad_threshold_db, task_reader, writer),
+                name=f"transcriptor-{worker_id}",
+                daemon=True
+            )
+            process.start()
+            task_reader.close()
+            writer.close()
+            self._processes.append(process)
+            self._tasks.append(task_writer)
+            self._connections.append(reader)
+        self._open = list(self._connections)
+    
+    def close(self, terminate=False):
+        """Detiene los procesos del pool."""
+        if terminate:
+            for process in self._processes:
+                process.terminate()
+        else:
+            for connection in self._tasks:
+                try:
+                    connection.send(None)
+                except OSError:
+                    # El proceso ya ha terminado
+                    pass
+        for process in self._processes:
+            process.join()
+        for connection in self._tasks + self._connections:
+            connection.close()
+        self._processes = []
+        self._tasks = []
+        self._connections = []
+        self._open = []
+        self._idle.clear()
+        self._assigned.clear()
+    
+    def imap_unordered(self, items):
+        """
+        Transcribe una serie de audios en el pool.
+        
+        Args:
+            items: Iterable de tuplas (id de tarea, ruta o array de audio)
+        
+        Yields:
+            Tuplas (id de tarea, transcripción o None, error o None) en el orden
+            en que terminan
+        """
+        queue = deque()
+        task_ids = {}
+        for task_id, audio in items:
+            task_ids[self._sequence] = task_id
+            queue.append((self._sequence, audio))
+            self._sequence += 1
+        pending = set(task_ids)
+        
+        while pending:
+            self._dispatch(queue)
+            if not self._open:
+                # Todos los procesos han cerrado su conexión: ya no puede llegar
+                # ningún resultado
+                for task_index in sorted(pending):
+                    yield task_ids[task_index], None, "No quedan procesos de transcripción activos"
+                return
+            
+            for connection in wait(self._open):
+                worker_id = self._connections.index(connection)
+                try:
+                    kind, _, task_index, payload = connection.recv()
+                except EOFError:
+                    # El proceso ha terminado: si tenía una tarea, se ha perdido
+                    self._open.remove(connection)
+                    task_index = self._assigned.pop(worker_id, None)
+                    if task_index in pending:
+                        pending.discard(task_index)
+                        process = self._processes[worker_id]
+                        process.join(timeout=1.0)
+                        yield task_ids[task_index], None, f"El proceso {process.name} terminó inesperadamente ({process.exitcode})"
+                    continue
+                
+                if kind == "fatal":
+                    logger.error(f"El proceso {worker_id} no pudo cargar el modelo: {payload}")
+                    continue
+                
+                self._assigned.pop(worker_id, None)
+                self._idle.append(worker_id)
+                if task_index not in pending:
+                    # Aviso de proceso libre, o resultado de una llamada abandonada
+                    continue
+                pending.discard(task_index)
+                if kind == "done":
+                    yield task_ids[task_index], payload, None
+                else:
+                    yield task_ids[task_index], None, payload
+    
+    def _dispatch(self, queue):
+        """Envía una tarea a cada proceso libre."""
+        while queue and self._idle:
+            worker_id = self._idle.popleft()
+            task_index, audio = queue.popleft()
+            try:
+                self._tasks[worker_id].send((task_index, audio))
+            except OSError:
+                # El proceso ha muerto sin llegar a recibirla: la tarea sigue en cola
+                queue.appendleft((task_index, audio))
+                continue
+            self._assigned[worker_id] = task_index
@@ -0,0 +1,346 @@
+"""
+Perfilado de las etapas del proceso (main.py --profile).
+
+Las funciones instrumentadas (descarga, carga del modelo, transcripción y
+escritura de salidas) se ejecutan bajo los perfiladores elegidos:
+
+- cprofile: estadísticas de cProfile por función
+- torch: trazas de torch.profiler de la inferencia (se abren en
+  chrome://tracing o Perfetto)
+- tracemalloc: pico de memoria y líneas que más memoria reservan
+
+Por cada archivo se escribe un informe de texto (y los .prof/.trace.json
+correspondientes) y, al final, un resumen con los puntos calientes de toda la
+ejecución.
+"""
+import io
+import json
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import functools
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from config import settings
+
+logger = logging.getLogger("vimeo_transcriber")
+
+PROFILERS = ("cprofile", "torch", "tracemalloc")
+# Etapas en las que se usa torch.profiler (las demás no ejecutan el modelo)
+TORCH_STAGES = ("transcribe",)
+
+def parse_profilers(value):
+    """Convierte "cprofile,tracemalloc" en una tupla de perfiladores válidos."""
+    kinds = tuple(kind.strip().lower() for kind in value.split(",") if kind.strip())
+    unknown = [kind for kind in kinds if kind not in PROFILERS]
+    if unknown:
+        raise ValueError(f"Perfiladores desconocidos: {', '.join(unknown)} (disponibles: {', '.join(PROFILERS)})")
+    return kinds
+
+def _safe_label(label):
+    """Nombre de archivo seguro para un informe."""
+    label = "".join(c if c.isalnum() or c in "-_." else "_" for c in str(label))
+    return label[:100] or "sin_nombre"
+
+class Profiler:
+    """
+    Perfila bloques de código etiquetados por etapa y archivo.
+    
+    Los perfiladores no se pueden usar a la vez desde varios hilos, así que
+    solo perfila el hilo que abre el primer bloque; los bloques simultáneos
+    en otros hilos (descargas solapadas) solo se cronometran. Los bloques
+    anidados en el hilo que perfila (p. ej. la escritura de salidas dentro de
+    la transcripción) tienen su propio perfil, y el bloque que los contiene
+    deja de perfilar mientras tanto. torch.profiler solo se usa en el bloque
+    más externo.
+    """
+    
+    def __init__(self, output_dir=None, kinds=("cprofile",), top=None):
+        """
+        Args:
+            output_dir: Directorio base de los informes (se crea un subdirectorio
+                por ejecución)
+            kinds: Perfiladores a usar (ver PROFILERS)
+            top: Funciones o líneas que se muestran en cada informe
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.output_dir = Path(output_dir or settings.PROFILE_DIR) / f"profile_{timestamp}"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.kinds = tuple(kinds)
+        self.top = top or settings.PROFILE_TOP
+        self._torch = None
+        if "torch" in self.kinds:
+            try:
+                import torch.profiler
+                self._torch = torch
+            except ImportError:
+                logger.warning("torch no está instalado: no se generarán trazas de torch.profiler")
+        
+        self._owner = None
+        # Bloques perfilados en curso en el hilo que perfila, del más externo al más interno
+        self._stack = []
+        self._state_lock = threading.Lock()
+        self._stats = None
+        # Un registro por bloque: etapa, etiqueta, segundos, perfilado, pico de memoria
+        self._records = []
+    
+    def instrument(self, obj, method, stage=None, label=None):
+        """
+        Sustituye el método `method` de la instancia `obj` por uno perfilado.
+        
+        Args:
+            obj: Instancia cuyo método se envuelve
+            method: Nombre del método
+            stage: Nombre de la etapa (por defecto, el del método)
+            label: Función que recibe los argumentos de la llamada y devuelve
+                la etiqueta del informe (por defecto, la etapa)
+        """
+        original = getattr(obj, method)
+        stage = stage or method
+        
+        @functools.wraps(original)
+        def profiled(*args, **kwargs):
+            name = label(*args, **kwargs) if label else stage
+            with self.profile(stage, name):
+                return original(*args, **kwargs)
+        
+        setattr(obj, method, profiled)
+    
+    def profile(self, stage, label):
+        """Context manager que perfila un bloque."""
+        return _ProfiledBlock(self, stage, label)
+    
+    def _acquire(self, block):
+        """Indica si el bloque se perfila (ningún otro hilo está perfilando)."""
+        with self._state_lock:
+            if self._owner not in (None, threading.get_ident()):
+                return False
+            self._owner = threading.get_ident()
+            self._stack.append(block)
+            return True
+    
+    def _parent(self, block):
+        """Bloque perfilado que contiene a `block`, o None."""
+        with self._state_lock:
+            index = self._stack.index(block)
+            return self._stack[index - 1] if index else None
+    
+    def _release(self, block):
+        with self._state_lock:
+            self._stack.remove(block)
+            if not self._stack:
+                self._owner = None
+    
+    def _report_path(self, label, suffix):
+        return self.output_dir / f"{_safe_label(label)}{suffix}"
+    
+    def _record(self, block, seconds):
+        record = {
+            "stage": block.stage,
+            "label": str(block.label),
+            "seconds": round(seconds, 4),
+            "profiled": block.owner,
+        }
+        sections = []
+        if block.cprofile is not None:
+            prof_path = self._report_path(block.label, f".{block.stage}.prof")
+            block.cprofile.dump_stats(str(prof_path))
+            stream = io.StringIO()
+            stats = pstats.Stats(block.cprofile, stream=stream)
+            stats.sort_stats("cumulative").print_stats(self.top)
+            sections.append(("cProfile (acumulado)", stream.getvalue().strip()))
+            with self._state_lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(block.cprofile)
+                else:
+                    self._stats.add(block.cprofile)
+        if block.torch_profile is not None:
+            trace_path = self._report_path(block.label, f".{block.stage}.trace.json")
+            block.torch_profile.export_chrome_trace(str(trace_path))
+            table = block.torch_profile.key_averages().table(sort_by="self_cpu_time_total", row_limit=self.top)
+            sections.append(("torch.profiler (operadores)", table.strip()))
+            record["torch_trace"] = trace_path.name
+        if block.memory is not None:
+            peak, snapshot = block.memory
+            record["peak_bytes"] = peak
+            lines = [f"Pico de memoria: {peak / 1e6:.1f} MB"]
+            # Los bloques anidados solo miden su pico (la instantánea es del bloque externo)
+            if snapshot is not None:
+                lines.append("Memoria reservada en el bloque y retenida al terminar, por línea:")
+                for stat in snapshot.statistics("lineno")[:self.top]:
+                    lines.append(f"  {stat.size / 1e6:8.2f} MB  {stat.count:7d} bloques  {stat.traceback}")
+            sections.append(("tracemalloc", "\n".join(lines)))
+        
+        with self._state_lock:
+            self._records.append(record)
+            # Informe del archivo: se añade una sección por etapa
+            with open(self._report_path(block.label, ".txt"), "a", encoding="utf-8") as f:
+                mode = "perfilado" if block.owner else "solo cronometrado"
+                f.write(f"=== {block.stage}: {block.label} ({seconds:.3f} s, {mode}) ===\n")
+                for title, body in sections:
+                    f.write(f"\n--- {title} ---\n{body}\n")
+                f.write("\n")
+    
+    def write_summary(self):
+        """
+        Escribe el resumen de la ejecución: tiempo por etapa, picos de memoria
+        y funciones más costosas del total de bloques perfilados.
+        
+        Returns:
+            Ruta del resumen en texto
+        """
+        with self._state_lock:
+            records = list(self._records)
+            stats = self._stats
+        
+        stages = {}
+        for record in records:
+            stage = stages.setdefault(record["stage"], {"calls": 0, "seconds": 0.0, "peak_bytes": 0})
+            stage["calls"] += 1
+            stage["seconds"] += record["seconds"]
+            stage["peak_bytes"] = max(stage["peak_bytes"], record.get("peak_bytes", 0))
+        
+        lines = [f"Perfiladores: {', '.join(self.kinds)}", "", "Tiempo por etapa:"]
+        for name, stage in sorted(stages.items(), key=lambda item: -item[1]["seconds"]):
+            line = f"  {name:<16} {stage['seconds']:10.3f} s en {stage['calls']} llamadas"
+            if stage["peak_bytes"]:
+                line += f", pico {stage['peak_bytes'] / 1e6:.1f} MB"
+            lines.append(line)
+        
+        slowest = sorted(records, key=lambda record: -record["seconds"])[:self.top]
+        lines += ["", "Bloques más lentos:"]
+        lines += [f"  {record['seconds']:10.3f} s  {record['stage']}: {record['label']}" for record in slowest]
+        
+        if stats is not None:
+            stats.dump_stats(str(self.output_dir / "summary.prof"))
+            for sort, title in (("tottime", "tiempo propio"), ("cumulative", "tiempo acumulado")):
+                stream = io.StringIO()
+                stats.stream = stream
+                stats.sort_stats(sort).print_stats(self.top)
+                lines += ["", f"Funciones con más {title} (todos los archivos):", stream.getvalue().strip()]
+        
+        summary_path = self.output_dir / "summary.txt"
+        summary_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        with open(self.output_dir / "summary.json", "w", encoding="utf-8") as f:
+            json.dump({"profilers": list(self.kinds), "stages": stages, "blocks": records}, f, indent=2, ensure_ascii=False)
+        return summary_path
+
+def _take_snapshot():
+    """Instantánea de tracemalloc sin las reservas del propio perfilado."""
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+    ])
+
+class _ProfiledBlock:
+    """Bloque en curso de Profiler.profile."""
+    
+    def __init__(self, profiler, stage, label):
+        self.profiler = profiler
+        self.stage = stage
+        self.label = label
+        self.owner = False
+        self.parent = None
+        self.cprofile = None
+        self.torch_profile = None
+        self._tracing = False
+        self._measuring = False
+        self._peak = 0
+        self.memory = None
+        self._started = None
+    
+    def __enter__(self):
+        profiler = self.profiler
+        self.owner = profiler._acquire(self)
+        if self.owner:
+            self.parent = profiler._parent(self)
+            if self.parent is not None:
+                self.parent._pause()
+            try:
+                self._start_profilers()
+            except Exception as e:
+                # Sin perfiladores el bloque solo se cronometra, y otro puede perfilar
+                logger.warning(f"No se pudo perfilar {self.stage} ({self.label}): {str(e)}")
+                self._stop_profilers()
+                self.owner = False
+                profiler._release(self)
+                if self.parent is not None:
+                    self.parent._resume()
+        self._started = time.perf_counter()
+        return self
+    
+    def _start_profilers(self):
+        profiler = self.profiler
+        # torch.profiler no se puede anidar: solo en el bloque más externo
+        if profiler._torch is not None and self.stage in TORCH_STAGES and self.parent is None:
+            torch_profile = profiler._torch.profiler.profile(record_shapes=True)
+            torch_profile.__enter__()
+            self.torch_profile = torch_profile
+        if "tracemalloc" in profiler.kinds:
+            if self.parent is not None:
+                # Dentro de otro bloque solo se mide el pico propio
+                if self.parent._measuring:
+                    tracemalloc.reset_peak()
+                    self._measuring = True
+            elif not tracemalloc.is_tracing():
+                # tracemalloc solo se activa durante el bloque: fuera de él (p. ej.
+                # al procesar los eventos de torch) ralentizaría mucho el proceso
+                tracemalloc.start()
+                self._tracing = self._measuring = True
+        if "cprofile" in profiler.kinds:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+    
+    def _stop_profilers(self):
+        """Deshace un arranque a medias de los perfiladores."""
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+        self._measuring = False
+        if self.torch_profile is not None:
+            try:
+                self.torch_profile.__exit__(None, None, None)
+            except Exception:
+                pass
+            self.torch_profile = None
+        self.cprofile = None
+    
+    def _pause(self):
+        """Deja de perfilar mientras se perfila un bloque anidado."""
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if self._measuring:
+            # El bloque anidado pone a cero el pico: se guarda el alcanzado hasta ahora
+            self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+    
+    def _resume(self):
+        if self.cprofile is not None:
+            self.cprofile.enable()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        seconds = time.perf_counter() - self._started
+        if self.owner:
+            if self.cprofile is not None:
+                self.cprofile.disable()
+            if self._measuring:
+                peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+                self.memory = (peak, _take_snapshot() if self._tracing else None)
+                if self.parent is not None:
+                    self.parent._peak = max(self.parent._peak, peak)
+            if self._tracing:
+                tracemalloc.stop()
+            if self.torch_profile is not None:
+                self.torch_profile.__exit__(None, None, None)
+            self.profiler._release(self)
+            if self.parent is not None:
+                self.parent._resume()
+        try:
+            self.profiler._record(self, seconds)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el perfil de {self.stage} ({self.label}): {str(e)}")
+        return False
@@ -0,0 +1,122 @@
+"""
+Resultados ligeros de la transcripción de un lote.
+
+En lotes grandes no se conservan las transcripciones completas (con sus
+segmentos y tokens): de cada archivo se guarda solo un TranscriptionResult y,
+si se pide, sus segmentos en columnas compactas (SegmentTable).
+"""
+from array import array
+
+class SegmentTable:
+    """
+    Segmentos de una transcripción en columnas: tiempos en arrays de double y
+    textos concatenados en una sola cadena con sus desplazamientos, en lugar
+    de un diccionario por segmento.
+    """
+    
+    __slots__ = ("starts", "ends", "_text", "_offsets")
+    
+    def __init__(self, segments=()):
+        """
+        Args:
+            segments: Segmentos con la forma de model.transcribe (diccionarios
+                con start, end y text)
+        """
+        self.starts = array("d")
+        self.ends = array("d")
+        self._offsets = array("L", [0])
+        texts = []
+        for segment in segments:
+            text = segment["text"]
+            self.starts.append(segment["start"])
+            self.ends.append(segment["end"])
+            texts.append(text)
+            self._offsets.append(self._offsets[-1] + len(text))
+        self._text = "".join(texts)
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    def text(self, index):
+        return self._text[self._offsets[index]:self._offsets[index + 1]]
+    
+    def __getitem__(self, index):
+        """Segmento `index` como tupla (inicio, fin, texto)."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("índice de segmento fuera de rango")
+        return self.starts[index], self.ends[index], self.text(index)
+    
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.starts[index], self.ends[index], self.text(index)
+    
+    @property
+    def full_text(self):
+        return self._text
+    
+    def to_dicts(self):
+        """Segmentos como diccionarios (id, start, end, text)."""
+        return [
+            {"id": index, "start": start, "end": end, "text": text}
+            for index, (start, end, text) in enumerate(self)
+        ]
+
+class TranscriptionResult:
+    """Resultado de un archivo de un lote, sin la transcripción completa."""
+    
+    __slots__ = ("audio_file", "status", "duration", "characters", "output_files", "segments", "cascade", "error")
+    
+    def __init__(self, audio_file, status="ok", duration=0.0, characters=0,
+                 output_files=None, segments=None, cascade=None, error=None):
+        """
+        Args:
+            audio_file: Ruta del audio
+            status: "ok" o "error"
+            duration: Segundos cubiertos por los segmentos transcritos
+            characters: Caracteres del texto transcrito
+            output_files: Diccionario formato -> ruta de los archivos de salida
+            segments: SegmentTable con los segmentos (solo si se ha pedido)
+            cascade: Estadísticas de la cascada de modelos (o None)
+            error: Descripción del error (o None)
+        """
+        self.audio_file = audio_file
+        self.status = status
+        self.duration = duration
+        self.characters = characters
+        self.output_files = output_files
+        self.segments = segments
+        self.cascade = cascade
+        self.error = error
+    
+    @classmethod
+    def from_transcription(cls, audio_file, transcription, keep_segments=False):
+        """Resume una transcripción; la transcripción completa puede descartarse después."""
+        segments = transcription.get("segments") or []
+        return cls(
+            audio_file,
+            duration=segments[-1]["end"] if segments else 0.0,
+            characters=len(transcription["text"]),
+            output_files={fmt: str(path) for fmt, path in (transcription.get("output_files") or {}).items()},
+            segments=SegmentTable(segments) if keep_segments else None,
+            cascade=transcription.get("cascade")
+        )
+    
+    @classmethod
+    def failed(cls, audio_file, error):
+        return cls(audio_file, status="error", error=str(error))
+    
+    @property
+    def ok(self):
+        return self.status == "ok"
+    
+    def to_dict(self):
+        result = {name: getattr(self, name) for name in self.__slots__ if name != "segments"}
+        result["audio_file"] = str(self.audio_file)
+        if self.segments is not None:
+            result["segments"] = self.segments.to_dicts()
+        return result
+    
+    def __repr__(self):
+        return f"TranscriptionResult({str(self.audio_file)!r}, status={self.status!r}, characters={self.characters})"
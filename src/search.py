@@ -0,0 +1,247 @@
+"""
+Índice de búsqueda de texto completo sobre las transcripciones (SQLite FTS5).
+"""
+import os
+import json
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+from config import settings
+
+logger = logging.getLogger("vimeo_transcriber")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    video TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    start REAL,
+    end REAL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_file ON segments(file_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text, content='segments', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS segments_ai AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS segments_ad AFTER DELETE ON segments BEGIN
+    INSERT INTO segments_fts(segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+def _fts_query(query):
+    """
+    Convierte el texto buscado en una consulta FTS5 segura: cada palabra se
+    busca literalmente (todas deben aparecer) y un * final busca por prefijo.
+    """
+    terms = []
+    for word in query.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+class SearchIndex:
+    """
+    Índice de los segmentos de las transcripciones.
+    
+    Cada archivo se registra con su fecha de modificación, tamaño y SHA-256:
+    al actualizar solo se vuelven a leer los archivos nuevos o modificados, y
+    solo se reindexan si su contenido ha cambiado.
+    """
+    
+    def __init__(self, db_path=None):
+        """
+        Args:
+            db_path: Ruta de la base de datos (por defecto settings.SEARCH_INDEX_PATH)
+        """
+        self.db_path = Path(db_path) if db_path else settings.SEARCH_INDEX_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # El servicio indexa desde su hilo de trabajos
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+        try:
+            with self._conn:
+                self._conn.execute("PRAGMA foreign_keys = ON")
+                self._conn.executescript(SCHEMA)
+        except sqlite3.OperationalError as e:
+            self._conn.close()
+            raise RuntimeError(f"SQLite no admite FTS5 en este sistema: {str(e)}")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+    
+    def close(self):
+        self._conn.close()
+    
+    @staticmethod
+    def _read_segments(path):
+        """Segmentos (inicio, fin, texto) de un archivo JSON o TXT de transcripción."""
+        if path.suffix == ".json":
+            with open(path, "r", encoding="utf-8") as f:
+                transcription = json.load(f)
+            return [
+                (segment.get("start"), segment.get("end"), segment["text"].strip())
+                for segment in transcription.get("segments", [])
+                if segment.get("text", "").strip()
+            ]
+        # El TXT no tiene tiempos: se indexa como un único segmento
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read().strip()
+        return [(None, None, text)] if text else []
+    
+    def index_file(self, path):
+        """
+        Indexa un archivo de transcripción si es nuevo o ha cambiado.
+        
+        Returns:
+            True si se ha reindexado
+        """
+        path = Path(path).resolve()
+        stat = path.stat()
+        key = str(path)
+        
+        with self._lock:
+            if path.suffix == ".json":
+                # El JSON sustituye al TXT de la misma transcripción
+                self._remove_file(path.with_suffix(".txt"))
+            row = self._conn.execute(
+                "SELECT id, mtime, size, sha256 FROM files WHERE path = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] == stat.st_mtime and row[2] == stat.st_size:
+                return False
+            
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            with self._conn:
+                if row is not None and row[3] == digest:
+                    # Solo ha cambiado la fecha: no hace falta reindexar
+                    self._conn.execute(
+                        "UPDATE files SET mtime = ?, size = ? WHERE id = ?",
+                        (stat.st_mtime, stat.st_size, row[0])
+                    )
+                    return False
+                
+                segments = self._read_segments(path)
+                if row is not None:
+                    self._conn.execute("DELETE FROM segments WHERE file_id = ?", (row[0],))
+                    self._conn.execute(
+                        "UPDATE files SET mtime = ?, size = ?, sha256 = ? WHERE id = ?",
+                        (stat.st_mtime, stat.st_size, digest, row[0])
+                    )
+                    file_id = row[0]
+                else:
+                    file_id = self._conn.execute(
+                        "INSERT INTO files (path, video, mtime, size, sha256) VALUES (?, ?, ?, ?, ?)",
+                        (key, path.stem, stat.st_mtime, stat.st_size, digest)
+                    ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO segments (file_id, start, end, text) VALUES (?, ?, ?, ?)",
+                    [(file_id, start, end, text) for start, end, text in segments]
+                )
+        logger.debug(f"Indexado: {path} ({len(segments)} segmentos)")
+        return True
+    
+    def _remove_file(self, path):
+        """Elimina del índice un archivo y sus segmentos, si estaba indexado."""
+        with self._conn:
+            row = self._conn.execute("SELECT id FROM files WHERE path = ?", (str(path),)).fetchone()
+            if row is not None:
+                self._conn.execute("DELETE FROM segments WHERE file_id = ?", row)
+                self._conn.execute("DELETE FROM files WHERE id = ?", row)
+                logger.debug(f"Eliminado del índice: {path}")
+    
+    def index_outputs(self, output_files):
+        """
+        Indexa la transcripción recién guardada a partir de sus archivos de
+        salida: el JSON si existe (tiene los tiempos) o, si no, el TXT.
+        """
+        path = output_files.get("json") or output_files.get("txt")
+        if path:
+            self.index_file(path)
+    
+    def update(self, directory=None):
+        """
+        Sincroniza el índice con un directorio de transcripciones.
+        
+        Para cada transcripción se indexa el JSON o, si no existe, el TXT, y se
+        eliminan del índice los archivos que ya no existen.
+        
+        Returns:
+            Tupla (archivos reindexados, archivos eliminados del índice)
+        """
+        directory = Path(directory) if directory else settings.TRANSCRIPTION_DIR
+        sources = {}
+        for path in sorted(directory.glob("*.txt")) + sorted(directory.glob("*.json")):
+            # El JSON sustituye al TXT de la misma transcripción
+            sources[path.stem] = path
+        
+        indexed = 0
+        for path in sources.values():
+            try:
+                indexed += self.index_file(path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"No se pudo indexar {path}: {str(e)}")
+        
+        wanted = {str(path.resolve()) for path in sources.values()}
+        prefix = str(directory.resolve()) + os.sep
+        with self._lock, self._conn:
+            stale = [
+                (file_id,) for file_id, path in self._conn.execute("SELECT id, path FROM files")
+                if path.startswith(prefix) and path not in wanted
+            ]
+            self._conn.executemany("DELETE FROM segments WHERE file_id = ?", stale)
+            self._conn.executemany("DELETE FROM files WHERE id = ?", stale)
+        
+        if indexed or stale:
+            logger.info(f"Índice actualizado: {indexed} transcripciones indexadas, {len(stale)} eliminadas")
+        return indexed, len(stale)
+    
+    def search(self, query, limit=20):
+        """
+        Busca segmentos que contengan todas las palabras de `query`.
+        
+        Returns:
+            Lista de diccionarios con video, path, start, end, text y snippet,
+            ordenados por relevancia (BM25)
+        """
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT files.video, files.path, segments.start, segments.end, segments.text,
+                       snippet(segments_fts, 0, '[', ']', '…', 12), bm25(segments_fts)
+                FROM segments_fts
+                JOIN segments ON segments.id = segments_fts.rowid
+                JOIN files ON files.id = segments.file_id
+                WHERE segments_fts MATCH ?
+                ORDER BY bm25(segments_fts)
+                LIMIT ?
+                """,
+                (fts_query, limit)
+            ).fetchall()
+        return [
+            {"video": video, "path": path, "start": start, "end": end,
+             "text": text, "snippet": snippet, "score": -score}
+            for video, path, start, end, text, snippet, score in rows
+        ]
@@ -0,0 +1,363 @@
+"""
+Servicio de transcripción persistente con modelos residentes y API HTTP local.
+"""
+import os
+import gc
+import json
+import time
+import uuid
+import queue
+import socket
+import logging
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from pathlib import Path
+from socketserver import ThreadingMixIn
+
+from config import settings
+from src.downloader import VimeoDownloader
+from src.transcriber import WhisperTranscriber
+from src.metrics import metrics
+from src.utils import Timer
+
+logger = logging.getLogger("vimeo_transcriber")
+
+class ModelRegistry:
+    """
+    Mantiene cargados varios transcriptores indexados por nombre de modelo.
+    
+    Cuando se supera el máximo se descarga el modelo usado hace más tiempo.
+    """
+    
+    def __init__(self, max_models=None, cache=None, engine=None, search_index=None):
+        """
+        Args:
+            max_models: Número máximo de modelos cargados a la vez
+            cache: Instancia de TranscriptionCache compartida por los transcriptores
+            engine: Motor de inferencia de los modelos ("fp32" o "int8")
+            search_index: Instancia de SearchIndex que se actualiza tras cada transcripción
+        """
+        self.max_models = max(1, max_models or settings.SERVER_MAX_MODELS)
+        self.cache = cache
+        self.engine = engine
+        self.search_index = search_index
+        self._transcribers = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, model_name):
+        """Devuelve el transcriptor del modelo indicado, cargándolo si es necesario."""
+        with self._lock:
+            transcriber = self._transcribers.get(model_name)
+            if transcriber is not None:
+                self._transcribers.move_to_end(model_name)
+                return transcriber
+            
+            while len(self._transcribers) >= self.max_models:
+                evicted_name, evicted = self._transcribers.popitem(last=False)
+                evicted.close()
+                evicted.model = None
+                logger.info(f"Modelo descargado de memoria: {evicted_name}")
+            gc.collect()
+            
+            transcriber = WhisperTranscriber(model_name=model_name, cache=self.cache, engine=self.engine)
+            transcriber.search_index = self.search_index
+            transcriber.load_model()
+            self._transcribers[model_name] = transcriber
+            return transcriber
+    
+    def loaded_models(self):
+        """Lista los modelos cargados, del menos al más usado recientemente."""
+        with self._lock:
+            return list(self._transcribers)
+
+class JobManager:
+    """Cola de trabajos de transcripción atendida por un hilo con los modelos en memoria."""
+    
+    def __init__(self, registry, downloader=None, output_dir=None, max_jobs=None, metrics_dir=None):
+        """
+        Args:
+            registry: Instancia de ModelRegistry
+            downloader: Instancia de VimeoDownloader para los trabajos con URL
+            output_dir: Directorio de salida por defecto
+            max_jobs: Número máximo de trabajos terminados que se recuerdan
+            metrics_dir: Directorio donde exportar las métricas tras cada trabajo
+        """
+        self.registry = registry
+        self.downloader = downloader or VimeoDownloader()
+        self.output_dir = Path(output_dir) if output_dir else settings.TRANSCRIPTION_DIR
+        self.max_jobs = max_jobs or settings.SERVER_MAX_JOBS
+        self.metrics_dir = metrics_dir
+        self._jobs = OrderedDict()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="servicio-trabajos", daemon=True)
+    
+    def start(self):
+        self._worker.start()
+    
+    def stop(self):
+        self._queue.put(None)
+        self._worker.join()
+    
+    def submit(self, url=None, audio_path=None, model=None, language=None,
+               output_dir=None, keep_audio=False):
+        """
+        Encola un trabajo.
+        
+        Returns:
+            Diccionario con el estado inicial del trabajo
+        """
+        if not url and not audio_path:
+            raise ValueError("Se necesita una URL o una ruta de audio")
+        if audio_path and not Path(audio_path).exists():
+            raise ValueError(f"El archivo de audio no existe: {audio_path}")
+        
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "url": url,
+            "audio_path": str(audio_path) if audio_path else None,
+            "model": model or settings.WHISPER_MODEL,
+            "language": language or settings.DEFAULT_LANGUAGE,
+            "output_dir": str(output_dir or self.output_dir),
+            "keep_audio": bool(keep_audio),
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "error": None,
+            "output_files": None,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._forget_old_jobs()
+        self._queue.put(job["id"])
+        logger.info(f"Trabajo {job['id']} encolado: {url or audio_path}")
+        return dict(job)
+    
+    def get(self, job_id):
+        """Devuelve una copia del estado del trabajo o None si no existe."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+    
+    def list(self):
+        with self._lock:
+            return [dict(job) for job in self._jobs.values()]
+    
+    def _forget_old_jobs(self):
+        """Elimina los trabajos terminados más antiguos si se supera el máximo."""
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in ("done", "error")]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
+    
+    def _update(self, job_id, **changes):
+        with self._lock:
+            self._jobs[job_id].update(changes)
+    
+    def _run(self):
+        """Bucle del hilo de trabajos."""
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+            job = self.get(job_id)
+            if job is None:
+                continue
+            
+            self._update(job_id, status="running", started=time.time())
+            try:
+                with Timer(stage="job"):
+                    output_files = self._process(job)
+                self._update(job_id, status="done", output_files=output_files, finished=time.time())
+                metrics.inc("jobs_total", status="done")
+                logger.info(f"Trabajo {job_id} completado")
+            except Exception as e:
+                logger.error(f"Error en el trabajo {job_id}: {str(e)}")
+                self._update(job_id, status="error", error=str(e), finished=time.time())
+                metrics.inc("jobs_total", status="error")
+            
+            if self.metrics_dir:
+                try:
+                    metrics.export(self.metrics_dir)
+                except OSError as e:
+                    logger.warning(f"No se pudieron exportar las métricas: {str(e)}")
+    
+    def _process(self, job):
+        """Ejecuta un trabajo y devuelve las rutas de sus archivos de salida."""
+        audio_file = job["audio_path"]
+        downloaded = False
+        if job["url"]:
+            audio_file = self.downloader.download_audio(job["url"])
+            if not audio_file:
+                raise RuntimeError(f"No se pudo descargar el audio de: {job['url']}")
+            downloaded = True
+        
+        transcriber = self.registry.get(job["model"])
+        transcriber.language = job["language"]
+        try:
+            transcription = transcriber.transcribe(audio_file, output_dir=job["output_dir"])
+        finally:
+            if downloaded and not job["keep_audio"] and os.path.exists(audio_file):
+                os.remove(audio_file)
+        
+        if not transcription:
+            raise RuntimeError("La transcripción no devolvió resultados")
+        return transcription["output_files"]
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """
+    API del servicio:
+    
+    - POST /jobs                     Encola un trabajo ({"url"} o {"audio_path"})
+    - GET  /jobs                     Lista los trabajos
+    - GET  /jobs/<id>                Estado de un trabajo
+    - GET  /jobs/<id>/outputs/<fmt>  Contenido de un archivo de salida
+    - GET  /health                   Estado del servicio y modelos cargados
+    - GET  /metrics                  Métricas en formato de texto de Prometheus
+    """
+    
+    server_version = "VimeoTranscriber"
+    
+    def log_message(self, format, *args):
+        logger.debug("HTTP " + format % args)
+    
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        jobs = self.server.jobs
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        
+        if parts == ["health"]:
+            self._send_json(200, {"status": "ok", "models": jobs.registry.loaded_models()})
+        elif parts == ["metrics"]:
+            body = metrics.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif parts == ["jobs"]:
+            self._send_json(200, jobs.list())
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = jobs.get(parts[1])
+            if job is None:
+                self._send_json(404, {"error": "Trabajo no encontrado"})
+            else:
+                self._send_json(200, job)
+        elif len(parts) == 4 and parts[0] == "jobs" and parts[2] == "outputs":
+            self._send_output(jobs.get(parts[1]), parts[3])
+        else:
+            self._send_json(404, {"error": "Ruta no encontrada"})
+    
+    def _send_output(self, job, fmt):
+        if job is None:
+            self._send_json(404, {"error": "Trabajo no encontrado"})
+            return
+        if job["status"] != "done":
+            self._send_json(409, {"error": f"El trabajo está en estado {job['status']}"})
+            return
+        path = (job["output_files"] or {}).get(fmt)
+        if not path or not os.path.exists(path):
+            self._send_json(404, {"error": f"No hay salida en formato {fmt}"})
+            return
+        
+        with open(path, "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Content-Disposition", f'attachment; filename="{os.path.basename(path)}"')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_POST(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if parts != ["jobs"]:
+            self._send_json(404, {"error": "Ruta no encontrada"})
+            return
+        
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(length) or b"{}")
+            job = self.server.jobs.submit(
+                url=data.get("url"),
+                audio_path=data.get("audio_path"),
+                model=data.get("model"),
+                language=data.get("language"),
+                output_dir=data.get("output_dir"),
+                keep_audio=data.get("keep_audio", False),
+            )
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(202, job)
+
+class _UnixHTTPServer(ThreadingMixIn, HTTPServer):
+    """Servidor HTTP sobre un socket Unix."""
+    
+    address_family = socket.AF_UNIX
+    daemon_threads = True
+    
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        self.socket.bind(self.server_address)
+        self.server_name = "localhost"
+        self.server_port = 0
+    
+    def get_request(self):
+        request, _ = self.socket.accept()
+        return request, ("local", 0)
+
+def serve(host=None, port=None, socket_path=None, preload=None, max_models=None,
+          cache=None, downloader=None, output_dir=None, metrics_dir=None, engine=None,
+          search_index=None):
+    """
+    Arranca el servicio y atiende peticiones hasta recibir Ctrl+C.
+    
+    Args:
+        host, port: Dirección HTTP en la que escuchar
+        socket_path: Ruta de un socket Unix (sustituye a host/port)
+        preload: Lista de modelos a cargar al arrancar
+        max_models: Número máximo de modelos cargados a la vez
+        cache: Instancia de TranscriptionCache (opcional)
+        downloader: Instancia de VimeoDownloader (opcional)
+        output_dir: Directorio de salida por defecto
+        metrics_dir: Directorio donde exportar las métricas tras cada trabajo (opcional)
+        engine: Motor de inferencia de los modelos ("fp32" o "int8")
+        search_index: Instancia de SearchIndex (opcional)
+    """
+    registry = ModelRegistry(max_models=max_models, cache=cache, engine=engine, search_index=search_index)
+    for model_name in preload or []:
+        registry.get(model_name)
+    
+    jobs = JobManager(registry, downloader=downloader, output_dir=output_dir, metrics_dir=metrics_dir)
+    jobs.start()
+    
+    if socket_path:
+        server = _UnixHTTPServer(str(socket_path), _RequestHandler)
+        address = f"unix:{socket_path}"
+    else:
+        host = host or settings.SERVER_HOST
+        port = settings.SERVER_PORT if port is None else port
+        server = ThreadingHTTPServer((host, port), _RequestHandler)
+        address = f"http://{host}:{server.server_port}"
+    server.jobs = jobs
+    
+    logger.info(f"Servicio de transcripción escuchando en {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Deteniendo el servicio...")
+    finally:
+        server.server_close()
+        jobs.stop()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
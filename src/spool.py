@@ -0,0 +1,151 @@
+"""
+Spool de audios descargados pendientes de transcribir, con límite de espacio.
+"""
+import os
+import time
+import shutil
+import logging
+import threading
+from pathlib import Path
+
+from config import settings
+from src.metrics import metrics, BYTES_BUCKETS
+
+logger = logging.getLogger("vimeo_transcriber")
+
+# Cada cuánto se comprueba, mientras se espera, si se han borrado audios por
+# fuera del spool
+POLL_SECONDS = 1.0
+
+class AudioSpool:
+    """
+    Directorio de audios en espera con un presupuesto de bytes y/o archivos.
+    
+    Cada descarga reserva un hueco antes de empezar (reserve) y se bloquea
+    mientras el spool esté lleno; al terminar registra el archivo (add) o
+    libera el hueco si ha fallado (cancel). El consumidor avisa con release
+    cuando ha terminado con un audio. Los audios que desaparecen del disco
+    (porque se han borrado tras transcribirlos) dejan de contar aunque nadie
+    avise.
+    
+    Como el tamaño de una descarga no se conoce de antemano, para el límite de
+    bytes cada hueco reservado cuenta con el tamaño medio de los audios vistos
+    hasta el momento. Con el spool vacío nunca se bloquea, de modo que un
+    único audio mayor que el presupuesto no detiene el lote.
+    """
+    
+    def __init__(self, directory=None, max_bytes=None, max_files=None):
+        """
+        Args:
+            directory: Directorio del spool (por defecto settings.SPOOL_DIR o, si no
+                está definido, settings.AUDIO_DIR)
+            max_bytes: Bytes de audio en espera como máximo (0 = sin límite)
+            max_files: Audios en espera como máximo (0 = sin límite)
+        """
+        self.directory = Path(directory or settings.SPOOL_DIR or settings.AUDIO_DIR)
+        self.max_bytes = settings.SPOOL_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_files = settings.SPOOL_MAX_FILES if max_files is None else max_files
+        self._files = {}
+        self._reserved = 0
+        self._seen_files = 0
+        self._seen_bytes = 0
+        self._condition = threading.Condition()
+    
+    @property
+    def limited(self):
+        return bool(self.max_bytes or self.max_files)
+    
+    def _refresh(self):
+        """Deja de contar los audios que ya no existen."""
+        for path in [path for path in self._files if not path.exists()]:
+            del self._files[path]
+    
+    def _used_bytes(self):
+        return sum(self._files.values())
+    
+    def _full(self):
+        self._refresh()
+        slots = len(self._files) + self._reserved
+        if not slots:
+            return False
+        if self.max_files and slots >= self.max_files:
+            return True
+        if self.max_bytes:
+            average = self._seen_bytes / self._seen_files if self._seen_files else 0
+            return self._used_bytes() + (self._reserved + 1) * average > self.max_bytes
+        return False
+    
+    def reserve(self):
+        """Reserva un hueco para una descarga, esperando a que haya espacio."""
+        with self._condition:
+            if self.limited and self._full():
+                logger.info(f"Spool lleno ({self.describe()}), esperando a que se transcriban audios...")
+                started = time.perf_counter()
+                while self._full():
+                    self._condition.wait(POLL_SECONDS)
+                waited = time.perf_counter() - started
+                metrics.observe("spool_wait_seconds", waited)
+                logger.info(f"Espacio libre en el spool tras {waited:.1f} segundos")
+            self._reserved += 1
+    
+    def cancel(self):
+        """Libera el hueco de una descarga que ha fallado."""
+        with self._condition:
+            self._reserved = max(0, self._reserved - 1)
+            self._condition.notify_all()
+    
+    def add(self, path):
+        """Registra un audio descargado en el hueco reservado."""
+        path = Path(path)
+        size = path.stat().st_size
+        with self._condition:
+            self._reserved = max(0, self._reserved - 1)
+            self._files[path] = size
+            self._seen_files += 1
+            self._seen_bytes += size
+            used = self._used_bytes()
+            self._condition.notify_all()
+        metrics.observe("spool_bytes", used, buckets=BYTES_BUCKETS)
+        logger.debug(f"Spool: {self.describe()}")
+    
+    def release(self, path, keep_dir=None):
+        """
+        Deja de contar un audio con el que el consumidor ya ha terminado.
+        
+        Si el audio sigue existiendo (se conserva o falló su transcripción) y se
+        indica `keep_dir`, se mueve allí para liberar el spool.
+        """
+        path = Path(path)
+        if keep_dir is not None and path.exists() and path.parent.resolve() != Path(keep_dir).resolve():
+            os.makedirs(keep_dir, exist_ok=True)
+            destination = Path(keep_dir) / path.name
+            shutil.move(str(path), str(destination))
+            logger.info(f"Audio movido fuera del spool: {destination}")
+        with self._condition:
+            self._files.pop(path, None)
+            self._condition.notify_all()
+    
+    def occupancy(self):
+        """Ocupación actual del spool."""
+        with self._condition:
+            self._refresh()
+            return {
+                "files": len(self._files),
+                "reserved": self._reserved,
+                "bytes": self._used_bytes(),
+                "max_files": self.max_files,
+                "max_bytes": self.max_bytes,
+            }
+    
+    def describe(self):
+        """Ocupación del spool como texto para el log."""
+        with self._condition:
+            files = len(self._files)
+            used = self._used_bytes()
+        text = f"{files} audios"
+        if self.max_files:
+            text += f" de {self.max_files}"
+        text += f", {used / 1e6:.1f} MB"
+        if self.max_bytes:
+            text += f" de {self.max_bytes / 1e6:.1f} MB"
+        return text
@@ -0,0 +1,94 @@
+"""
+Puntos de control para la transcripción incremental por ventanas.
+"""
+import os
+import json
+import logging
+from pathlib import Path
+
+logger = logging.getLogger("vimeo_transcriber")
+
+class TranscriptionCheckpoint:
+    """
+    Registro en disco de las ventanas ya transcritas de un archivo.
+    
+    Es un archivo JSON Lines: la primera línea describe la transcripción
+    (modelo, idioma, tamaño de ventana y número de muestras) y cada línea
+    siguiente contiene los segmentos de una ventana terminada. Cada ventana se
+    añade con fsync, así que tras una interrupción se pierde como mucho la
+    ventana en curso.
+    """
+    
+    def __init__(self, path, header):
+        """
+        Args:
+            path: Ruta del archivo de control
+            header: Diccionario que identifica la transcripción; si el archivo
+                existente no coincide, se descarta
+        """
+        self.path = Path(path)
+        self.header = header
+        self.windows_done = 0
+        self.segments = []
+        self._file = None
+    
+    def load(self):
+        """
+        Carga el progreso guardado, si es compatible.
+        
+        Returns:
+            Número de ventanas ya terminadas
+        """
+        if not self.path.exists():
+            return 0
+        
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        
+        try:
+            header = json.loads(lines[0]) if lines else None
+        except ValueError:
+            header = None
+        if header != self.header:
+            logger.warning(f"Punto de control incompatible, se empieza de cero: {self.path}")
+            return 0
+        
+        for line in lines[1:]:
+            try:
+                window = json.loads(line)
+            except ValueError:
+                break  # Última línea a medio escribir
+            self.segments.extend(window["segments"])
+            self.windows_done = window["window"] + 1
+        
+        if self.windows_done:
+            logger.info(f"Reanudando desde la ventana {self.windows_done} ({len(self.segments)} segmentos)")
+        return self.windows_done
+    
+    def open(self):
+        """Abre el archivo para añadir ventanas, reescribiéndolo con el progreso cargado."""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.header) + "\n")
+            if self.windows_done:
+                f.write(json.dumps({"window": self.windows_done - 1, "segments": self.segments}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+    
+    def append(self, window_index, segments):
+        """Registra una ventana terminada."""
+        self._file.write(json.dumps({"window": window_index, "segments": segments}, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.windows_done = window_index + 1
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def remove(self):
+        """Elimina el archivo de control una vez terminada la transcripción."""
+        self.close()
+        if self.path.exists():
+            self.path.unlink()
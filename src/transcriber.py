@@ -2,40 +2,353 @@
 Módulo para transcribir audio usando Whisper.
 """
 import os
-import json
+import itertools
 import logging
-import whisper
 from pathlib import Path
 
 from config import settings
 from src.utils import Timer
+from src.metrics import metrics, RATIO_BUCKETS
+from src.chunking import SAMPLE_RATE, find_cut_points, split_windows, stitch_windows
+from src.audio import is_native_pcm, load_pcm
+from src.writers import create_writers, write_outputs
+from src.streaming import TranscriptionCheckpoint
+from src.results import TranscriptionResult
+from src.vad import extract_speech
 
 logger = logging.getLogger("vimeo_transcriber")
 
 class WhisperTranscriber:
     """Clase para gestionar la transcripción de audio con Whisper."""
     
-    def __init__(self, model_name=None, language=None):
+    def __init__(self, model_name=None, language=None, cache=None,
+                 chunk_seconds=None, chunk_overlap=None, chunk_workers=None, engine=None):
         """
         Inicializa el transcriptor.
         
         Args:
             model_name: Nombre del modelo de Whisper a usar
             language: Código de idioma para la transcripción
+            cache: Instancia de TranscriptionCache (opcional)
+            chunk_seconds: Duración de las ventanas para audios largos (0 desactiva la división)
+            chunk_overlap: Solapamiento entre ventanas en segundos
+            chunk_workers: Procesos que transcriben las ventanas en paralelo
+            engine: Motor de inferencia, "fp32" o "int8" (ver src.engines)
         """
         self.model_name = model_name or settings.WHISPER_MODEL
         self.language = language or settings.DEFAULT_LANGUAGE
         self.model = None
+        self.engine = engine or settings.INFERENCE_ENGINE
+        self.cache = cache
+        # Índice de búsqueda que se actualiza tras guardar cada transcripción (opcional)
+        self.search_index = None
+        # Opciones adicionales para model.transcribe (forman parte de la clave de caché)
+        self.decode_options = {}
+        self.chunk_seconds = settings.CHUNK_SECONDS if chunk_seconds is None else chunk_seconds
+        self.chunk_overlap = settings.CHUNK_OVERLAP_SECONDS if chunk_overlap is None else chunk_overlap
+        self.chunk_workers = max(1, chunk_workers or settings.TRANSCRIPTION_WORKERS)
+        self._chunk_pool = None
+        # Opciones de los archivos de salida
+        self.output_formats = list(settings.OUTPUT_FORMATS)
+        self.compact_json = settings.JSON_COMPACT
+        self.json_tokens = settings.JSON_TOKENS
+        # Escribir los segmentos a medida que se decodifica cada ventana
+        self.stream = False
+        self.stream_window = settings.STREAM_WINDOW_SECONDS
+        # Transcribir solo los tramos con voz (ver src.vad)
+        self.vad = settings.VAD_ENABLED
+        self.vad_threshold_db = settings.VAD_THRESHOLD_DB
+        # ModelCascade que re-transcribe los tramos dudosos con un modelo mayor (opcional)
+        self.cascade = None
+        
+    def close(self):
+        """Libera los procesos auxiliares que se hayan creado."""
+        if self._chunk_pool is not None:
+            self._chunk_pool.close()
+            self._chunk_pool = None
         
     def load_model(self):
         """Carga el modelo de Whisper."""
         if self.model is None:
-            logger.info(f"Cargando modelo Whisper: {self.model_name}")
-            with Timer("Carga de modelo"):
-                self.model = whisper.load_model(self.model_name)
+            logger.info(f"Cargando modelo Whisper: {self.model_name} ({self.engine})")
+            # Importa whisper y torch: solo se paga al cargar el modelo
+            from src.engines import load_engine_model
+            with Timer("Carga de modelo") as timer:
+                self.model = load_engine_model(self.model_name, self.engine)
+            metrics.observe("model_load_seconds", timer.elapsed, model=self.model_name, engine=self.engine)
             logger.info("Modelo Whisper cargado correctamente")
         return self.model
         
+    def run_model(self, audio):
+        """
+        Ejecuta el modelo sobre un audio sin guardar ningún archivo.
+        
+        Args:
+            audio: Ruta al archivo de audio o array con las muestras a 16 kHz
+            
+        Returns:
+            Diccionario devuelto por model.transcribe
+        """
+        # Cargar el modelo si no se ha hecho
+        self.load_model()
+        
+        with Timer("Transcripción", stage="inference") as timer:
+            result = self.model.transcribe(
+                audio,
+                language=self.language,
+                verbose=False,
+                **self.decode_options
+            )
+        if not isinstance(audio, (str, Path)):
+            self._record_inference(len(audio), timer.elapsed)
+        return result
+    
+    def run_speech(self, audio, run=None):
+        """
+        Ejecuta `run` (por defecto run_model) sobre un array de muestras. Con
+        el VAD activado solo se transcriben los tramos con voz y los tiempos se
+        devuelven a la línea de tiempo del audio original.
+        """
+        run = run or self.run_model
+        if not self.vad:
+            return run(audio)
+        
+        with Timer(stage="vad"):
+            speech, timeline = extract_speech(audio, threshold_db=self.vad_threshold_db)
+        if not len(speech):
+            return {"text": "", "segments": [], "language": self.language}
+        return timeline.remap(run(speech))
+    
+    def _record_inference(self, samples, seconds):
+        """Registra los segundos de audio transcritos y el factor de tiempo real."""
+        duration = samples / SAMPLE_RATE
+        if duration > 0:
+            metrics.inc("audio_seconds_total", duration, model=self.model_name)
+            metrics.observe("realtime_factor", seconds / duration, buckets=RATIO_BUCKETS, model=self.model_name)
+        
+    def load_audio(self, audio_file):
+        """
+        Carga un archivo de audio como array de muestras a 16 kHz.
+        
+        Los audios ya extraídos a PCM 16 kHz mono (.wav o .npy) se mapean en
+        memoria directamente; el resto se decodifica con ffmpeg.
+        """
+        with Timer("Decodificación de audio", stage="decode"):
+            if is_native_pcm(audio_file):
+                return load_pcm(audio_file)
+            import whisper
+            return whisper.load_audio(str(audio_file))
+    
+    def cache_options(self, mode="sequential"):
+        """
+        Opciones que afectan al resultado y deben formar parte de la clave de caché.
+        
+        Args:
+            mode: "sequential" (transcribe), "pool" (los procesos del pool
+                transcriben cada archivo completo, sin ventanas) o "batched"
+                (inferencia por lotes entre archivos)
+        """
+        options = dict(self.decode_options)
+        if mode == "batched":
+            options["batched"] = True
+        if self.engine != "fp32":
+            options["engine"] = self.engine
+        if self.stream and mode == "sequential":
+            options["stream_window"] = self.stream_window
+        else:
+            if self.vad:
+                options["vad_threshold_db"] = self.vad_threshold_db
+            if mode != "sequential":
+                return options
+            if self.cascade is not None:
+                options["cascade"] = self.cascade.cache_options()
+            if self.chunk_seconds:
+                options["chunk_seconds"] = self.chunk_seconds
+                options["chunk_overlap"] = self.chunk_overlap
+        return options
+    
+    def _transcribe_audio(self, audio_path):
+        """
+        Transcribe un archivo completo (solo sus tramos con voz si el VAD está
+        activado), dividiéndolo en ventanas si es largo.
+        """
+        return self.run_speech(self.load_audio(audio_path), self._transcribe_samples)
+    
+    def _transcribe_samples(self, audio):
+        if not self.chunk_seconds or len(audio) <= self.chunk_seconds * SAMPLE_RATE * 1.25:
+            transcription = self.run_model(audio)
+        else:
+            transcription = self._transcribe_chunked(audio)
+        if self.cascade is not None:
+            transcription = self.cascade.refine(audio, transcription)
+        return transcription
+    
+    def _transcribe_chunked(self, audio):
+        """
+        Transcribe un audio largo por ventanas solapadas y une los resultados.
+        
+        Con varios procesos las ventanas se transcriben en paralelo en un pool
+        que se mantiene abierto entre archivos hasta llamar a close().
+        """
+        windows = split_windows(audio, self.chunk_seconds, self.chunk_overlap)
+        logger.info(f"Audio dividido en {len(windows)} ventanas de ~{self.chunk_seconds} segundos")
+        
+        if self.chunk_workers == 1:
+            results = [self.run_model(audio[w["start"]:w["end"]]) for w in windows]
+            return stitch_windows(results, windows)
+        
+        if self._chunk_pool is None:
+            from src.pool import TranscriptionPool
+            self._chunk_pool = TranscriptionPool(
+                self.model_name,
+                self.language,
+                workers=self.chunk_workers,
+                decode_options=self.decode_options,
+                engine=self.engine
+            )
+            self._chunk_pool.start()
+        
+        tasks = [(i, audio[w["start"]:w["end"]]) for i, w in enumerate(windows)]
+        results = [None] * len(windows)
+        errors = []
+        with Timer(stage="inference") as timer:
+            for i, transcription, error in self._chunk_pool.imap_unordered(tasks):
+                if error is not None:
+                    errors.append(f"ventana {i}: {error}")
+                results[i] = transcription
+        self._record_inference(len(audio), timer.elapsed)
+        
+        if errors:
+            raise RuntimeError(f"Error al transcribir {len(errors)} ventanas ({'; '.join(errors)})")
+        return stitch_windows(results, windows)
+        
+    def stream_segments(self, audio, start_window=0, previous_text=""):
+        """
+        Transcribe un audio ventana a ventana y devuelve los segmentos de cada una
+        en cuanto se decodifica.
+        
+        Las ventanas duran unos `stream_window` segundos y se cortan en silencios.
+        El final del texto anterior se pasa como initial_prompt a la siguiente
+        ventana para mantener el contexto entre ventanas.
+        
+        Args:
+            audio: Array con las muestras a 16 kHz
+            start_window: Primera ventana a transcribir (para reanudar)
+            previous_text: Texto ya transcrito antes de start_window
+            
+        Yields:
+            Tuplas (índice de ventana, número total de ventanas, segmentos con
+            timestamps absolutos)
+        """
+        cuts = find_cut_points(audio, self.stream_window, min(3, self.stream_window / 10))
+        total = len(cuts) - 1
+        
+        for index in range(start_window, total):
+            start, end = cuts[index], cuts[index + 1]
+            offset = start / SAMPLE_RATE
+            
+            options = dict(self.decode_options)
+            if previous_text and "initial_prompt" not in options:
+                options["initial_prompt"] = previous_text[-200:]
+            
+            self.load_model()
+            with Timer(stage="inference") as timer:
+                result = self.model.transcribe(
+                    audio[start:end],
+                    language=self.language,
+                    verbose=False,
+                    **options
+                )
+            self._record_inference(end - start, timer.elapsed)
+            
+            segments = []
+            for segment in result["segments"]:
+                segment = dict(segment)
+                segment["start"] = round(segment["start"] + offset, 3)
+                segment["end"] = round(min(segment["end"] + offset, end / SAMPLE_RATE), 3)
+                segment["seek"] = segment.get("seek", 0) + int(round(offset * 100))
+                if segment["end"] > segment["start"]:
+                    segments.append(segment)
+            
+            previous_text += "".join(segment["text"] for segment in segments)
+            yield index, total, segments
+    
+    def _transcribe_streaming(self, audio_path, output_dir):
+        """
+        Transcribe un archivo escribiendo TXT/VTT/SRT de forma incremental.
+        
+        El progreso se guarda en `<nombre>.partial.jsonl` dentro del directorio
+        de salida; si el proceso se interrumpe, la siguiente ejecución continúa
+        desde la última ventana terminada. El JSON se escribe al final.
+        """
+        audio = self.load_audio(audio_path)
+        base_path = Path(output_dir) / audio_path.stem
+        checkpoint = TranscriptionCheckpoint(
+            base_path.with_name(f"{audio_path.stem}.partial.jsonl"),
+            {
+                "model": self.model_name,
+                "language": self.language,
+                "window": self.stream_window,
+                "samples": len(audio),
+                "options": self.decode_options,
+            }
+        )
+        start_window = checkpoint.load()
+        checkpoint.open()
+        
+        # Los formatos de texto se escriben segmento a segmento; el JSON, al final
+        streamed_formats = [fmt for fmt in self.output_formats if fmt != "json"]
+        writers = create_writers(base_path, streamed_formats)
+        segments = list(checkpoint.segments)
+        try:
+            for writer in writers:
+                writer.open()
+                writer.begin({"segments": segments})
+            for index, segment in enumerate(segments, 1):
+                for writer in writers:
+                    writer.write_segment(index, segment)
+            
+            previous_text = "".join(segment["text"] for segment in segments)
+            for window, total, new_segments in self.stream_segments(audio, start_window, previous_text):
+                for segment in new_segments:
+                    if segments:
+                        segment["start"] = max(segment["start"], segments[-1]["end"])
+                    segment["id"] = len(segments)
+                    segments.append(segment)
+                    for writer in writers:
+                        writer.write_segment(len(segments), segment)
+                for writer in writers:
+                    writer.flush()
+                checkpoint.append(window, new_segments)
+                logger.info(f"Ventana {window + 1}/{total} transcrita ({len(segments)} segmentos)")
+            
+            transcription = {
+                "text": "".join(segment["text"] for segment in segments),
+                "segments": segments,
+                "language": self.language,
+            }
+            for writer in writers:
+                writer.end(transcription)
+        finally:
+            for writer in writers:
+                writer.close()
+            checkpoint.close()
+        
+        output_files = {writer.extension: str(writer.path) for writer in writers}
+        if "json" in self.output_formats:
+            output_files.update(write_outputs(
+                transcription, base_path, formats=["json"],
+                compact_json=self.compact_json, json_tokens=self.json_tokens
+            ))
+        checkpoint.remove()
+        
+        # Respetar el orden de formatos configurado
+        transcription["output_files"] = {
+            fmt: output_files[fmt] for fmt in self.output_formats if fmt in output_files
+        }
+        self._index_outputs(transcription["output_files"])
+        return transcription
+        
     def transcribe(self, audio_file, output_dir=None):
         """
         Transcribe un archivo de audio.
@@ -58,87 +371,83 @@ class WhisperTranscriber:
             
         # Usar el directorio especificado o el predeterminado
         output_dir = Path(output_dir) if output_dir else settings.TRANSCRIPTION_DIR
+        os.makedirs(output_dir, exist_ok=True)
         
-        # Crear nombre base para archivos de salida
-        base_name = audio_path.stem
-        txt_file = output_dir / f"{base_name}.txt"
-        json_file = output_dir / f"{base_name}.json"
-        vtt_file = output_dir / f"{base_name}.vtt"
-        srt_file = output_dir / f"{base_name}.srt"
-        
-        # Cargar el modelo si no se ha hecho
-        self.load_model()
-        
-        # Transcribir el audio
-        logger.info(f"Iniciando transcripción de: {audio_file}")
-        with Timer("Transcripción"):
-            transcription = self.model.transcribe(
-                str(audio_path),
-                language=self.language,
-                verbose=False
+        # Buscar la transcripción en caché
+        cache_key = None
+        transcription = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(
+                audio_path, self.model_name, self.language, self.cache_options()
             )
+            transcription = self.cache.get(cache_key)
         
-        logger.info(f"Transcripción completada: {len(transcription['text'])} caracteres")
+        if transcription is None and self.stream:
+            metrics.inc("transcriptions_total", source="model")
+            # Las salidas se escriben a medida que avanza la transcripción
+            logger.info(f"Iniciando transcripción incremental de: {audio_file}")
+            transcription = self._transcribe_streaming(audio_path, output_dir)
+            if self.cache is not None:
+                self.cache.put(cache_key, {k: v for k, v in transcription.items() if k != "output_files"})
+            logger.info(f"Transcripción completada: {len(transcription['text'])} caracteres")
+            logger.info(f"Archivos guardados en: {output_dir}")
+            return transcription
         
-        # Guardar transcripción en formato texto plano
-        with open(txt_file, "w", encoding="utf-8") as f:
-            f.write(transcription["text"])
-        
-        # Guardar transcripción completa en JSON para procesamiento posterior
-        with open(json_file, "w", encoding="utf-8") as f:
-            json.dump(transcription, f, ensure_ascii=False, indent=2)
-        
-        # Guardar transcripción en formato VTT (Web Video Text Tracks)
-        self._save_vtt(transcription, vtt_file)
+        if transcription is None:
+            logger.info(f"Iniciando transcripción de: {audio_file}")
+            transcription = self._transcribe_audio(audio_path)
+            metrics.inc("transcriptions_total", source="model")
+            
+            if self.cache is not None:
+                self.cache.put(cache_key, transcription)
+        else:
+            metrics.inc("transcriptions_total", source="cache")
         
-        # Guardar transcripción en formato SRT (SubRip)
-        self._save_srt(transcription, srt_file)
+        logger.info(f"Transcripción completada: {len(transcription['text'])} caracteres")
         
         # Añadir rutas de archivos a los resultados
-        transcription["output_files"] = {
-            "txt": str(txt_file),
-            "json": str(json_file),
-            "vtt": str(vtt_file),
-            "srt": str(srt_file)
-        }
+        transcription["output_files"] = self.save_outputs(
+            transcription, audio_path.stem, output_dir
+        )
         
         logger.info(f"Archivos guardados en: {output_dir}")
         return transcription
-        
-    def _save_vtt(self, transcription, vtt_file):
-        """Guarda la transcripción en formato VTT."""
-        with open(vtt_file, "w", encoding="utf-8") as f:
-            f.write("WEBVTT\n\n")
-            for segment in transcription["segments"]:
-                start_time = self._format_timestamp(segment["start"])
-                end_time = self._format_timestamp(segment["end"])
-                f.write(f"{start_time} --> {end_time}\n")
-                f.write(f"{segment['text'].strip()}\n\n")
-    
-    def _save_srt(self, transcription, srt_file):
-        """Guarda la transcripción en formato SRT."""
-        with open(srt_file, "w", encoding="utf-8") as f:
-            for i, segment in enumerate(transcription["segments"], 1):
-                start_time = self._format_timestamp(segment["start"], ms_delimiter=",")
-                end_time = self._format_timestamp(segment["end"], ms_delimiter=",")
-                f.write(f"{i}\n")
-                f.write(f"{start_time} --> {end_time}\n")
-                f.write(f"{segment['text'].strip()}\n\n")
-    
-    def _format_timestamp(self, seconds, ms_delimiter="."):
-        """
-        Formatea un tiempo en segundos a formato HH:MM:SS.mmm.
+    
+    def save_outputs(self, transcription, base_name, output_dir):
+        """
+        Guarda una transcripción en los formatos configurados (TXT, JSON, VTT y SRT
+        por defecto) con una sola pasada por los segmentos.
         
         Args:
-            seconds: Tiempo en segundos
-            ms_delimiter: Delimitador para milisegundos (. para VTT, , para SRT)
+            transcription: Diccionario devuelto por model.transcribe
+            base_name: Nombre base de los archivos de salida
+            output_dir: Directorio de salida
+            
+        Returns:
+            Diccionario con las rutas de los archivos generados
         """
-        hours = int(seconds / 3600)
-        minutes = int((seconds % 3600) / 60)
-        seconds = seconds % 60
-        return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}".replace(".", ms_delimiter)
+        with Timer(stage="write_outputs"):
+            output_files = write_outputs(
+                transcription,
+                Path(output_dir) / base_name,
+                formats=self.output_formats,
+                compact_json=self.compact_json,
+                json_tokens=self.json_tokens
+            )
+        self._index_outputs(output_files)
+        return output_files
+    
+    def _index_outputs(self, output_files):
+        """Añade la transcripción recién guardada al índice de búsqueda, si lo hay."""
+        if self.search_index is None:
+            return
+        try:
+            with Timer(stage="search_index"):
+                self.search_index.index_outputs(output_files)
+        except Exception as e:
+            logger.warning(f"No se pudo actualizar el índice de búsqueda: {str(e)}")
         
-    def transcribe_batch(self, audio_files, output_dir=None, keep_audio=False):
+    def transcribe_batch(self, audio_files, output_dir=None, keep_audio=False, workers=None, batch_size=None):
         """
         Transcribe múltiples archivos de audio.
         
@@ -146,36 +455,305 @@ class WhisperTranscriber:
             audio_files: Lista de rutas a archivos de audio
             output_dir: Directorio donde guardar las transcripciones
             keep_audio: Si es False, elimina los archivos de audio después de transcribirlos
+            workers: Número de procesos de transcripción (por defecto settings.TRANSCRIPTION_WORKERS)
+            batch_size: Ventanas de 30 s decodificadas a la vez entre archivos
+                (por defecto settings.INFERENCE_BATCH_SIZE)
             
         Returns:
-            Lista de diccionarios con información de las transcripciones
+            Lista de TranscriptionResult, uno por archivo (sin las transcripciones
+            completas, que ya están en los archivos de salida; ver iter_transcribe)
+        """
+        return list(self.iter_transcribe(audio_files, output_dir, keep_audio, workers, batch_size))
+    
+    def iter_transcribe(self, audio_files, output_dir=None, keep_audio=False, workers=None,
+                        batch_size=None, keep_segments=False):
+        """
+        Transcribe múltiples archivos de audio y devuelve un resultado ligero
+        por archivo en cuanto termina.
+        
+        Las transcripciones completas se guardan en los archivos de salida y se
+        descartan, de modo que la memoria no crece con el tamaño del lote.
+        
+        Args:
+            audio_files: Rutas a archivos de audio
+            output_dir: Directorio donde guardar las transcripciones
+            keep_audio: Si es False, elimina los archivos de audio después de transcribirlos
+            workers: Número de procesos de transcripción (por defecto settings.TRANSCRIPTION_WORKERS)
+            batch_size: Ventanas de 30 s decodificadas a la vez entre archivos
+                (por defecto settings.INFERENCE_BATCH_SIZE)
+            keep_segments: Si es True, cada resultado incluye sus segmentos en
+                una SegmentTable (columnas compactas, sin tokens)
+        
+        Yields:
+            TranscriptionResult de cada archivo (con status "ok" o "error"); con
+            varios procesos o lotes de inferencia, en el orden en que terminan
         """
-        results = []
+        audio_files = list(audio_files)
+        workers = workers or settings.TRANSCRIPTION_WORKERS
+        batch_size = batch_size or settings.INFERENCE_BATCH_SIZE
+        if self.cascade is not None and (workers > 1 or batch_size > 1):
+            # La cascada necesita los dos modelos en este proceso
+            logger.info("Con la cascada de modelos los archivos se transcriben uno a uno")
+            workers = batch_size = 1
+        if self.stream and (workers > 1 or batch_size > 1):
+            # Las salidas incrementales y los puntos de reanudación solo se
+            # escriben en la transcripción archivo a archivo
+            logger.info("Con --stream los archivos se transcriben uno a uno")
+            workers = batch_size = 1
+        if batch_size > 1 and len(audio_files) > 1:
+            results = self._transcribe_batch_batched(audio_files, output_dir, keep_audio, batch_size, keep_segments)
+        elif workers > 1 and len(audio_files) > 1:
+            results = self._transcribe_batch_parallel(audio_files, output_dir, keep_audio, workers, keep_segments)
+        else:
+            results = self._transcribe_batch_sequential(audio_files, output_dir, keep_audio, keep_segments)
+        
+        done = 0
         failed_files = []
+        for result in results:
+            if result.ok:
+                done += 1
+            else:
+                failed_files.append(result.audio_file)
+            yield result
         
+        self._log_batch_results(done, failed_files, len(audio_files))
+    
+    def _transcribe_batch_sequential(self, audio_files, output_dir, keep_audio, keep_segments):
+        """Transcribe un lote archivo a archivo en este proceso."""
         for i, audio_file in enumerate(audio_files, 1):
             logger.info(f"Transcribiendo archivo {i}/{len(audio_files)}: {audio_file}")
             
             try:
                 transcription = self.transcribe(audio_file, output_dir)
-                if transcription:
-                    results.append(transcription)
-                    
-                    # Eliminar el archivo de audio si no se debe conservar
-                    if not keep_audio:
-                        os.remove(audio_file)
-                        logger.info(f"Archivo de audio eliminado: {audio_file}")
-                else:
-                    failed_files.append(audio_file)
+                if not transcription:
+                    yield TranscriptionResult.failed(audio_file, "La transcripción no devolvió resultados")
+                    continue
+                
+                result = TranscriptionResult.from_transcription(audio_file, transcription, keep_segments)
+                del transcription
+                
+                # Eliminar el archivo de audio si no se debe conservar
+                if not keep_audio:
+                    os.remove(audio_file)
+                    logger.info(f"Archivo de audio eliminado: {audio_file}")
+                yield result
             except Exception as e:
                 logger.error(f"Error al transcribir {audio_file}: {str(e)}")
-                failed_files.append(audio_file)
+                metrics.inc("transcriptions_total", source="error")
+                yield TranscriptionResult.failed(audio_file, e)
+    
+    def _transcribe_batch_parallel(self, audio_files, output_dir, keep_audio, workers, keep_segments):
+        """
+        Transcribe un lote en un pool de procesos.
+        
+        Los aciertos de caché se resuelven en este proceso; el resto se reparte
+        entre los procesos del pool y este proceso guarda los resultados a
+        medida que llegan.
+        """
+        from src.pool import TranscriptionPool
+        
+        output_dir = Path(output_dir) if output_dir else settings.TRANSCRIPTION_DIR
+        os.makedirs(output_dir, exist_ok=True)
+        cache_keys = {}
+        tasks = []
+        
+        for audio_file in audio_files:
+            audio_path = Path(audio_file)
+            if not audio_path.exists():
+                logger.error(f"El archivo de audio no existe: {audio_file}")
+                yield TranscriptionResult.failed(audio_file, "El archivo de audio no existe")
+                continue
+            
+            if self.cache is not None:
+                try:
+                    key = self.cache.make_key(audio_path, self.model_name, self.language, self.cache_options("pool"))
+                except OSError as e:
+                    # Un archivo ilegible (o que desaparece) solo hace fallar ese archivo
+                    logger.error(f"No se pudo leer {audio_file}: {str(e)}")
+                    yield TranscriptionResult.failed(audio_file, e)
+                    continue
+                cached = self.cache.get(key)
+                if cached is not None:
+                    metrics.inc("transcriptions_total", source="cache")
+                    try:
+                        result = self._finish_file(cached, audio_path, output_dir, keep_audio, keep_segments)
+                    except Exception as e:
+                        logger.error(f"Error al guardar la transcripción de {audio_file}: {str(e)}")
+                        result = TranscriptionResult.failed(audio_file, e)
+                    yield result
+                    continue
+                cache_keys[str(audio_path)] = key
+            
+            tasks.append((str(audio_path), str(audio_path)))
+        
+        if not tasks:
+            return
+        
+        pool = TranscriptionPool(
+            self.model_name,
+            self.language,
+            workers=min(workers, len(tasks)),
+            decode_options=self.decode_options,
+            engine=self.engine,
+            vad_threshold_db=self.vad_threshold_db if self.vad else None
+        )
+        with pool:
+            for done, (audio_file, transcription, error) in enumerate(pool.imap_unordered(tasks), 1):
+                if error is not None:
+                    logger.error(f"Error al transcribir {audio_file}: {error}")
+                    metrics.inc("transcriptions_total", source="error")
+                    yield TranscriptionResult.failed(audio_file, error)
+                    continue
+                
+                logger.info(f"Transcrito {done}/{len(tasks)}: {audio_file}")
+                metrics.inc("transcriptions_total", source="model")
+                try:
+                    if audio_file in cache_keys:
+                        self.cache.put(cache_keys.pop(audio_file), transcription)
+                    result = self._finish_file(transcription, Path(audio_file), output_dir, keep_audio, keep_segments)
+                except Exception as e:
+                    logger.error(f"Error al guardar la transcripción de {audio_file}: {str(e)}")
+                    result = TranscriptionResult.failed(audio_file, e)
+                del transcription
+                yield result
+    
+    def _transcribe_batch_batched(self, audio_files, output_dir, keep_audio, batch_size, keep_segments):
+        """
+        Transcribe un lote empaquetando ventanas de varios archivos en cada
+        llamada al modelo (ver src.batching).
+        
+        Los archivos más largos que settings.BATCH_MAX_SECONDS se transcriben
+        después uno a uno, para conservar el contexto entre ventanas.
+        """
+        from src.batching import BatchedInference
+        
+        output_dir = Path(output_dir) if output_dir else settings.TRANSCRIPTION_DIR
+        os.makedirs(output_dir, exist_ok=True)
+        cache_keys = {}
+        long_files = []
+        # Correspondencia de tiempos de los audios recortados por el VAD
+        timelines = {}
+        # Resultados de los archivos que se resuelven mientras se cargan los audios
+        # (errores y aciertos de caché), devueltos entre lote y lote
+        ready = []
+        
+        def pending_audio():
+            """Carga los audios que no están en caché, de uno en uno."""
+            for audio_file in audio_files:
+                audio_path = Path(audio_file)
+                if not audio_path.exists():
+                    logger.error(f"El archivo de audio no existe: {audio_file}")
+                    ready.append(TranscriptionResult.failed(audio_file, "El archivo de audio no existe"))
+                    continue
+                
+                if self.cache is not None:
+                    try:
+                        key = self.cache.make_key(audio_path, self.model_name, self.language, self.cache_options("batched"))
+                    except OSError as e:
+                        # Un archivo ilegible (o que desaparece) solo hace fallar ese archivo
+                        logger.error(f"No se pudo leer {audio_file}: {str(e)}")
+                        ready.append(TranscriptionResult.failed(audio_file, e))
+                        continue
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        metrics.inc("transcriptions_total", source="cache")
+                        try:
+                            ready.append(self._finish_file(cached, audio_path, output_dir, keep_audio, keep_segments))
+                        except Exception as e:
+                            logger.error(f"Error al guardar la transcripción de {audio_file}: {str(e)}")
+                            ready.append(TranscriptionResult.failed(audio_file, e))
+                        continue
+                    cache_keys[str(audio_path)] = key
                 
-        # Registrar resultados
+                try:
+                    audio = self.load_audio(audio_path)
+                except Exception as e:
+                    logger.error(f"Error al decodificar {audio_file}: {str(e)}")
+                    ready.append(TranscriptionResult.failed(audio_file, e))
+                    continue
+                if len(audio) > settings.BATCH_MAX_SECONDS * SAMPLE_RATE:
+                    long_files.append(audio_file)
+                    continue
+                if self.vad:
+                    with Timer(stage="vad"):
+                        audio, timelines[str(audio_path)] = extract_speech(audio, threshold_db=self.vad_threshold_db)
+                yield str(audio_path), audio
+        
+        # El modelo solo se carga si algún archivo no está en caché
+        audio_items = pending_audio()
+        first = next(audio_items, None)
+        while ready:
+            yield ready.pop(0)
+        if first is not None:
+            batcher = BatchedInference(
+                self.load_model(),
+                self.language,
+                batch_size,
+                decode_options=self.decode_options,
+                on_batch=self._record_inference
+            )
+            transcriptions = batcher.transcribe_files(itertools.chain([first], audio_items))
+            for done, (audio_file, transcription, error) in enumerate(transcriptions, 1):
+                while ready:
+                    yield ready.pop(0)
+                if error is not None:
+                    timelines.pop(audio_file, None)
+                    logger.error(f"Error al transcribir {audio_file}: {error}")
+                    metrics.inc("transcriptions_total", source="error")
+                    yield TranscriptionResult.failed(audio_file, error)
+                    continue
+            
+                logger.info(f"Transcrito {done}: {audio_file}")
+                metrics.inc("transcriptions_total", source="model")
+                if audio_file in timelines:
+                    transcription = timelines.pop(audio_file).remap(transcription)
+                try:
+                    if audio_file in cache_keys:
+                        self.cache.put(cache_keys.pop(audio_file), transcription)
+                    result = self._finish_file(transcription, Path(audio_file), output_dir, keep_audio, keep_segments)
+                except Exception as e:
+                    logger.error(f"Error al guardar la transcripción de {audio_file}: {str(e)}")
+                    result = TranscriptionResult.failed(audio_file, e)
+                del transcription
+                yield result
+        while ready:
+            yield ready.pop(0)
+        
+        for audio_file in long_files:
+            logger.info(f"Transcribiendo por separado (audio largo): {audio_file}")
+            try:
+                transcription = self.transcribe(audio_file, output_dir)
+                result = TranscriptionResult.from_transcription(audio_file, transcription, keep_segments)
+                del transcription
+                if not keep_audio:
+                    os.remove(audio_file)
+                    logger.info(f"Archivo de audio eliminado: {audio_file}")
+                yield result
+            except Exception as e:
+                logger.error(f"Error al transcribir {audio_file}: {str(e)}")
+                metrics.inc("transcriptions_total", source="error")
+                yield TranscriptionResult.failed(audio_file, e)
+    
+    def _finish_file(self, transcription, audio_path, output_dir, keep_audio, keep_segments=False):
+        """
+        Guarda las salidas de un archivo transcrito, elimina el audio si procede
+        y devuelve su TranscriptionResult.
+        """
+        transcription["output_files"] = self.save_outputs(
+            transcription, audio_path.stem, output_dir
+        )
+        logger.info(f"Transcripción completada: {len(transcription['text'])} caracteres")
+        
+        if not keep_audio:
+            os.remove(audio_path)
+            logger.info(f"Archivo de audio eliminado: {audio_path}")
+        return TranscriptionResult.from_transcription(str(audio_path), transcription, keep_segments)
+    
+    def _log_batch_results(self, done, failed_files, total):
+        """Registra el resumen de un lote."""
         if failed_files:
             logger.warning(f"No se pudieron transcribir {len(failed_files)} archivos")
             for file in failed_files:
                 logger.warning(f"  - {file}")
         
-        logger.info(f"Transcritos {len(results)} de {len(audio_files)} archivos")
-        return results
\ No newline at end of file
+        logger.info(f"Transcritos {done} de {total} archivos")
@@ -7,6 +7,7 @@ from datetime import datetime
 from pathlib import Path
 
 from config import settings
+from src.metrics import metrics
 
 def setup_logger():
     """Configura y devuelve un logger configurado."""
@@ -54,18 +55,27 @@ def get_safe_filename(title):
     return safe_title
 
 class Timer:
-    """Clase para medir el tiempo de ejecución de bloques de código."""
+    """
+    Clase para medir el tiempo de ejecución de bloques de código.
+    
+    Si se indica `stage`, la duración se registra en el histograma
+    stage_seconds de src.metrics; si se indica `name`, se escribe en el log.
+    """
     
-    def __init__(self, name=None):
+    def __init__(self, name=None, stage=None):
         self.name = name
+        self.stage = stage
         self.start_time = None
+        self.elapsed = None
         
     def __enter__(self):
-        self.start_time = time.time()
+        self.start_time = time.perf_counter()
         return self
         
     def __exit__(self, exc_type, exc_val, exc_tb):
-        elapsed = time.time() - self.start_time
+        self.elapsed = time.perf_counter() - self.start_time
+        if self.stage:
+            metrics.observe("stage_seconds", self.elapsed, stage=self.stage)
         if self.name:
-            print(f"{self.name} completado en {elapsed:.2f} segundos")
-        return False  # No suprimir excepciones
\ No newline at end of file
+            logging.getLogger("vimeo_transcriber").info(f"{self.name} completado en {self.elapsed:.2f} segundos")
+        return False  # No suprimir excepciones.
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+Detección de voz (VAD) por energía y espectro, sin modelos externos.
+
+Antes de la inferencia se buscan los tramos con voz, se concatenan en un audio
+más corto y, tras transcribirlo, los tiempos de los segmentos se devuelven a
+la línea de tiempo del audio original.
+"""
+import logging
+
+import numpy as np
+
+from config import settings
+from src.chunking import SAMPLE_RATE, FRAME_SECONDS
+from src.metrics import metrics
+
+logger = logging.getLogger("vimeo_transcriber")
+
+# Banda en la que se concentra la energía de la voz
+VOICE_BAND = (200, 4000)
+# Fracción mínima de la energía de una trama dentro de la banda de voz
+MIN_VOICE_RATIO = 0.5
+# Tramas de ~1 s para medir la fracción de tramas de baja energía: la voz la
+# tiene alta (sílabas y pausas) y la música sostenida, baja
+MODULATION_SECONDS = 1.0
+MIN_LOW_ENERGY_RATIO = 0.1
+# Silencio que se deja entre tramos al concatenarlos
+GAP_SECONDS = 0.2
+# Tramas por bloque al calcular los espectros (acota la memoria en audios largos)
+BLOCK_FRAMES = 4096
+
+def _moving_average(values, width):
+    """Media móvil centrada de anchura `width` (en tramas)."""
+    if width <= 1 or len(values) == 0:
+        return values
+    cumulative = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    half = width // 2
+    index = np.arange(len(values))
+    low = np.clip(index - half, 0, len(values))
+    high = np.clip(index + half + 1, 0, len(values))
+    return (cumulative[high] - cumulative[low]) / (high - low)
+
+def frame_features(audio, sample_rate=SAMPLE_RATE):
+    """
+    Calcula por trama la energía en dB, la fracción de energía en la banda de
+    voz y la fracción de tramas de baja energía a su alrededor.
+    
+    Returns:
+        Tupla (energía en dB, fracción en banda de voz, fracción de baja
+        energía, muestras por trama)
+    """
+    frame = max(1, int(FRAME_SECONDS * sample_rate))
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        empty = np.zeros(0, dtype=np.float32)
+        return empty, empty, empty, frame
+    
+    frames = np.asarray(audio[:n_frames * frame], dtype=np.float32).reshape(n_frames, frame)
+    power = np.square(frames).mean(axis=1)
+    energy_db = 10 * np.log10(power + 1e-10)
+    
+    n_fft = 1 << (frame - 1).bit_length()
+    frequencies = np.fft.rfftfreq(n_fft, 1 / sample_rate)
+    band = (frequencies >= VOICE_BAND[0]) & (frequencies <= VOICE_BAND[1])
+    window = np.hanning(frame).astype(np.float32)
+    voice_ratio = np.empty(n_frames, dtype=np.float32)
+    for start in range(0, n_frames, BLOCK_FRAMES):
+        block = frames[start:start + BLOCK_FRAMES] * window
+        spectrum = np.square(np.abs(np.fft.rfft(block, n=n_fft, axis=1)))
+        voice_ratio[start:start + len(block)] = spectrum[:, band].sum(axis=1) / (spectrum.sum(axis=1) + 1e-10)
+    
+    width = max(1, int(MODULATION_SECONDS / FRAME_SECONDS))
+    low_energy = power < 0.5 * _moving_average(power, width)
+    low_energy_ratio = _moving_average(low_energy.astype(np.float64), width)
+    return energy_db, voice_ratio, low_energy_ratio, frame
+
+def detect_speech(audio, sample_rate=SAMPLE_RATE, threshold_db=None, min_speech=None,
+                  min_silence=None, padding=None):
+    """
+    Busca los tramos con voz de un audio.
+    
+    Una trama es de voz si su energía supera en `threshold_db` el ruido de
+    fondo (percentil 10 de la energía del audio), la mayor parte de su energía
+    está en la banda de voz y a su alrededor hay pausas entre sílabas (lo que
+    descarta buena parte de la música sostenida). Después se unen los tramos
+    separados por menos de `min_silence`, se descartan los de menos de
+    `min_speech` y se amplían `padding` segundos por cada lado.
+    
+    Returns:
+        Lista de tuplas (inicio, fin) en muestras, ordenadas y sin solaparse
+    """
+    threshold_db = settings.VAD_THRESHOLD_DB if threshold_db is None else threshold_db
+    min_speech = settings.VAD_MIN_SPEECH_SECONDS if min_speech is None else min_speech
+    min_silence = settings.VAD_MIN_SILENCE_SECONDS if min_silence is None else min_silence
+    padding = settings.VAD_PADDING_SECONDS if padding is None else padding
+    
+    energy_db, voice_ratio, low_energy_ratio, frame = frame_features(audio, sample_rate)
+    if len(energy_db) == 0:
+        return []
+    
+    noise_floor = np.percentile(energy_db, 10)
+    speech = (
+        (energy_db > noise_floor + threshold_db)
+        & (voice_ratio >= MIN_VOICE_RATIO)
+        & (low_energy_ratio >= MIN_LOW_ENERGY_RATIO)
+    )
+    
+    # Límites de los tramos de tramas consecutivas con voz
+    edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1) * frame
+    ends = np.flatnonzero(edges == -1) * frame
+    
+    regions = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if regions and start - regions[-1][1] < min_silence * sample_rate:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+    
+    pad = int(padding * sample_rate)
+    merged = []
+    for start, end in regions:
+        if end - start < min_speech * sample_rate:
+            continue
+        start, end = max(0, start - pad), min(len(audio), end + pad)
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+class SpeechTimeline:
+    """
+    Correspondencia entre los tiempos del audio con solo los tramos de voz y
+    los del audio original.
+    """
+    
+    def __init__(self, regions, gap, total, sample_rate=SAMPLE_RATE):
+        """
+        Args:
+            regions: Tramos de voz (inicio, fin) en muestras del audio original
+            gap: Muestras de silencio entre tramos en el audio compacto
+            total: Muestras del audio original
+            sample_rate: Frecuencia de muestreo
+        """
+        self.sample_rate = sample_rate
+        self.total_seconds = total / sample_rate
+        lengths = np.array([end - start for start, end in regions], dtype=np.float64)
+        self.original_starts = np.array([start for start, _ in regions], dtype=np.float64) / sample_rate
+        self.lengths = lengths / sample_rate
+        # Inicio de cada tramo en el audio compacto
+        offsets = np.concatenate(([0.0], np.cumsum(lengths + gap)[:-1])) if len(regions) else np.zeros(0)
+        self.compact_starts = offsets / sample_rate
+        self.speech_seconds = float(self.lengths.sum())
+    
+    def to_original(self, seconds):
+        """Convierte un tiempo del audio compacto al audio original."""
+        if not len(self.compact_starts):
+            return seconds
+        index = max(0, int(np.searchsorted(self.compact_starts, seconds, side="right")) - 1)
+        # Los tiempos que caen en el silencio añadido se llevan al final del tramo
+        offset = min(max(seconds - self.compact_starts[index], 0.0), self.lengths[index])
+        return round(float(self.original_starts[index] + offset), 3)
+    
+    def remap(self, transcription):
+        """Devuelve la transcripción con los tiempos del audio original."""
+        segments = []
+        for segment in transcription["segments"]:
+            segment = dict(segment)
+            segment["start"] = self.to_original(segment["start"])
+            segment["end"] = max(segment["start"], self.to_original(segment["end"]))
+            if "words" in segment:
+                segment["words"] = [
+                    dict(word, start=self.to_original(word["start"]), end=self.to_original(word["end"]))
+                    for word in segment["words"]
+                ]
+            segments.append(segment)
+        return dict(transcription, segments=segments)
+
+def extract_speech(audio, sample_rate=SAMPLE_RATE, **options):
+    """
+    Concatena los tramos con voz de un audio, separados por un breve silencio.
+    
+    Args:
+        audio: Array de muestras
+        **options: Umbrales de detect_speech
+    
+    Returns:
+        Tupla (audio con solo la voz, SpeechTimeline)
+    """
+    regions = detect_speech(audio, sample_rate, **options)
+    gap = int(GAP_SECONDS * sample_rate)
+    timeline = SpeechTimeline(regions, gap, len(audio), sample_rate)
+    
+    pieces = []
+    for i, (start, end) in enumerate(regions):
+        if i:
+            pieces.append(np.zeros(gap, dtype=np.float32))
+        pieces.append(np.asarray(audio[start:end], dtype=np.float32))
+    speech = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+    
+    skipped = max(0.0, timeline.total_seconds - timeline.speech_seconds)
+    metrics.inc("vad_speech_seconds_total", timeline.speech_seconds)
+    metrics.inc("vad_skipped_seconds_total", skipped)
+    logger.info(
+        f"VAD: {timeline.speech_seconds:.1f} s de voz en {len(regions)} tramos de "
+        f"{timeline.total_seconds:.1f} s de audio (se omiten {skipped:.1f} s)"
+    )
+    return speech, timeline
@@ -0,0 +1,141 @@
+"""
+Normalización de URLs de Vimeo y caché persistente de metadatos de videos.
+"""
+import os
+import re
+import json
+import time
+import logging
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+from config import settings
+from src.metrics import metrics
+
+logger = logging.getLogger("vimeo_transcriber")
+
+VimeoVideo = namedtuple("VimeoVideo", ["id", "hash", "url"])
+
+_HOSTS = ("vimeo.com", "www.vimeo.com", "player.vimeo.com")
+# Hash de privacidad de los videos no listados (vimeo.com/<id>/<hash>)
+_HASH_PATTERN = re.compile(r"^[0-9a-f]{6,}$", re.IGNORECASE)
+
+# Campos de extract_info que se guardan en la caché de metadatos
+METADATA_FIELDS = ("id", "title", "duration", "uploader", "upload_date", "webpage_url", "ext")
+
+def parse_vimeo_url(url):
+    """
+    Extrae el identificador de un video de Vimeo de cualquiera de sus formas
+    de URL (con o sin www, player.vimeo.com/video/<id>, channels/groups, con
+    parámetros o fragmentos).
+    
+    Returns:
+        VimeoVideo(id, hash, url canónica) o None si no es una URL de video de Vimeo
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    parsed = urlparse(url)
+    if parsed.netloc.lower() not in _HOSTS:
+        return None
+    
+    parts = [part for part in parsed.path.split("/") if part]
+    numeric = [i for i, part in enumerate(parts) if part.isdigit()]
+    if not numeric:
+        return None
+    index = numeric[-1]
+    video_id = parts[index]
+    
+    # El hash va tras el identificador o, en el reproductor, en el parámetro h
+    video_hash = None
+    if index + 1 < len(parts) and _HASH_PATTERN.match(parts[index + 1]):
+        video_hash = parts[index + 1].lower()
+    else:
+        video_hash = (parse_qs(parsed.query).get("h") or [None])[0]
+    
+    canonical = f"https://vimeo.com/{video_id}" + (f"/{video_hash}" if video_hash else "")
+    return VimeoVideo(video_id, video_hash, canonical)
+
+def dedupe_urls(urls):
+    """
+    Normaliza las URLs y elimina los videos repetidos.
+    
+    Se conserva el orden de la primera aparición de cada video; si alguna de
+    sus apariciones lleva el hash de privacidad, se usa esa. Las URLs que no
+    son de Vimeo se mantienen tal cual (sin repetir).
+    
+    Returns:
+        Lista de URLs canónicas
+    """
+    videos = {}
+    for url in urls:
+        video = parse_vimeo_url(url)
+        key = video.id if video else url.strip()
+        if key in videos:
+            if video and video.hash and not videos[key].hash:
+                videos[key] = video
+            else:
+                logger.info(f"URL repetida, se omite: {url}")
+            continue
+        videos[key] = video or VimeoVideo(None, None, url.strip())
+    
+    if len(videos) < len(urls):
+        logger.info(f"{len(urls) - len(videos)} URLs repetidas eliminadas")
+    return [video.url for video in videos.values()]
+
+class MetadataCache:
+    """
+    Caché en disco de los metadatos de extract_info indexados por el
+    identificador del video, con caducidad.
+    """
+    
+    def __init__(self, cache_dir=None, ttl=None):
+        """
+        Args:
+            cache_dir: Directorio de la caché (por defecto settings.METADATA_CACHE_DIR)
+            ttl: Segundos que una entrada se considera válida (por defecto settings.METADATA_TTL_SECONDS)
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else settings.METADATA_CACHE_DIR
+        self.ttl = settings.METADATA_TTL_SECONDS if ttl is None else ttl
+    
+    def _entry_path(self, video_id):
+        return self.cache_dir / f"{video_id}.json"
+    
+    def get(self, video_id):
+        """Devuelve los metadatos guardados o None si no existen o han caducado."""
+        entry = self._load(video_id)
+        metrics.inc("metadata_requests_total", result="miss" if entry is None else "hit")
+        return entry
+    
+    def _load(self, video_id):
+        path = self._entry_path(video_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Metadatos corruptos, se ignoran: {path} ({str(e)})")
+            return None
+        
+        if self.ttl and time.time() - entry.get("fetched_at", 0) > self.ttl:
+            return None
+        return entry
+    
+    def put(self, video_id, info):
+        """Guarda los campos relevantes de un resultado de extract_info."""
+        entry = {field: info.get(field) for field in METADATA_FIELDS}
+        entry["fetched_at"] = time.time()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._entry_path(video_id))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return entry
@@ -0,0 +1,247 @@
+"""
+Vigilancia de un directorio al que llegan audios para transcribir.
+
+En Linux se usa inotify (a través de ctypes, sin dependencias) para enterarse
+al momento de los archivos nuevos; si no está disponible, se recorre el
+directorio periódicamente. En ambos casos un audio solo se entrega cuando ha
+terminado de escribirse, es decir, cuando su tamaño y su fecha de
+modificación no han cambiado durante unos segundos.
+"""
+import os
+import time
+import errno
+import struct
+import select
+import ctypes
+import ctypes.util
+import logging
+import threading
+from pathlib import Path
+
+from config import settings
+from src.metrics import metrics
+
+logger = logging.getLogger("vimeo_transcriber")
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# Cabecera de struct inotify_event: wd, mask, cookie, len
+_EVENT = struct.Struct("iIII")
+
+class _Inotify:
+    """Descriptor de inotify sobre un directorio."""
+    
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify no disponible")
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        if libc.inotify_add_watch(fd, os.fsencode(str(directory)), WATCH_MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(error, os.strerror(error))
+        self.fd = fd
+    
+    def read(self, timeout):
+        """
+        Espera eventos durante `timeout` segundos como mucho.
+        
+        Returns:
+            Lista de nombres de archivo afectados, o None si la cola del kernel
+            se ha desbordado y hay que volver a recorrer el directorio
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        
+        names = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+    
+    def close(self):
+        os.close(self.fd)
+
+class FolderWatcher:
+    """
+    Entrega en lotes los audios nuevos o modificados de un directorio, una vez
+    que han terminado de escribirse.
+    
+    Los audios que ya existen al empezar también se entregan. Un audio
+    entregado no vuelve a entregarse salvo que cambie su contenido (o se
+    borre y vuelva a aparecer).
+    """
+    
+    def __init__(self, directory=None, extensions=None, settle_seconds=None,
+                 poll_seconds=None, use_inotify=None):
+        """
+        Args:
+            directory: Directorio vigilado (por defecto settings.AUDIO_DIR)
+            extensions: Extensiones de audio que se tienen en cuenta
+            settle_seconds: Segundos sin cambios para dar un audio por terminado
+            poll_seconds: Intervalo entre recorridos del directorio sin inotify
+            use_inotify: Usar inotify si está disponible
+        """
+        self.directory = Path(directory or settings.AUDIO_DIR)
+        self.extensions = {
+            f".{extension.lower()}" for extension in (extensions or settings.AUDIO_EXTENSIONS)
+        }
+        self.settle_seconds = settings.WATCH_SETTLE_SECONDS if settle_seconds is None else settle_seconds
+        self.poll_seconds = poll_seconds or settings.WATCH_POLL_SECONDS
+        use_inotify = settings.WATCH_INOTIFY if use_inotify is None else use_inotify
+        
+        # Audios en escritura: ruta -> ((tamaño, mtime), instante del último cambio)
+        self._pending = {}
+        # Audios ya entregados: ruta -> (tamaño, mtime)
+        self._delivered = {}
+        self._stop = threading.Event()
+        
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify(self.directory)
+            except OSError as e:
+                logger.warning(f"inotify no disponible ({e}), se recorrerá {self.directory} "
+                               f"cada {self.poll_seconds} segundos")
+        self._scan()
+    
+    @property
+    def backend(self):
+        return "inotify" if self._inotify is not None else f"sondeo cada {self.poll_seconds} s"
+    
+    def _is_audio(self, path):
+        return path.suffix.lower() in self.extensions and not path.name.startswith(".")
+    
+    def _observe(self, path):
+        """Anota el estado actual de un archivo."""
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self._pending.pop(path, None)
+            self._delivered.pop(path, None)
+            return
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if self._delivered.get(path) == signature:
+            return
+        previous = self._pending.get(path)
+        if previous is None or previous[0] != signature:
+            self._pending[path] = (signature, time.monotonic())
+    
+    def _scan(self):
+        """Recorre el directorio completo."""
+        present = set()
+        for entry in os.scandir(self.directory):
+            path = Path(entry.path)
+            if entry.is_file() and self._is_audio(path):
+                present.add(path)
+                self._observe(path)
+        for path in [path for path in self._delivered if path not in present]:
+            del self._delivered[path]
+        for path in [path for path in self._pending if path not in present]:
+            del self._pending[path]
+    
+    def _ready(self):
+        """Audios en espera que llevan settle_seconds sin cambiar."""
+        ready = []
+        now = time.monotonic()
+        for path in list(self._pending):
+            self._observe(path)
+            if path not in self._pending:
+                continue
+            signature, since = self._pending[path]
+            # Un archivo vacío suele estar recién creado, todavía sin datos
+            if signature[0] > 0 and now - since >= self.settle_seconds:
+                del self._pending[path]
+                self._delivered[path] = signature
+                ready.append(path)
+        return sorted(ready)
+    
+    def wait(self, timeout=None):
+        """
+        Espera a que haya audios terminados.
+        
+        Args:
+            timeout: Segundos de espera como máximo (None = hasta que haya
+                alguno o se llame a stop)
+        
+        Returns:
+            Lista de rutas de audios listos para transcribir (vacía si se
+            agota el tiempo o se detiene la vigilancia)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._stop.is_set():
+            ready = self._ready()
+            if ready:
+                metrics.inc("watch_files_total", len(ready))
+                return ready
+            
+            # Con audios en escritura se comprueba a menudo si ya han terminado
+            interval = min(self.poll_seconds, max(0.1, self.settle_seconds / 2)) if self._pending else self.poll_seconds
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                interval = min(interval, remaining)
+            
+            if self._inotify is None:
+                self._stop.wait(interval)
+                self._scan()
+                continue
+            names = self._inotify.read(interval)
+            if names is None:
+                logger.warning("Cola de eventos de inotify desbordada, se recorre el directorio")
+                self._scan()
+                continue
+            for name in names:
+                path = self.directory / name
+                if self._is_audio(path):
+                    self._observe(path)
+        return []
+    
+    def __iter__(self):
+        """Lotes de audios terminados hasta que se llama a stop."""
+        while not self._stop.is_set():
+            ready = self.wait()
+            if ready:
+                yield ready
+    
+    def stop(self):
+        """Detiene la vigilancia (se puede llamar desde otro hilo)."""
+        self._stop.set()
+    
+    def close(self):
+        self.stop()
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,229 @@
+"""
+Escritores de los archivos de salida de una transcripción.
+
+Todos los formatos pedidos se generan en una sola pasada por los segmentos y
+con escrituras en búfer.
+"""
+import sys
+import json
+import base64
+from array import array
+from pathlib import Path
+
+from config import settings
+
+def format_timestamp(seconds, ms_delimiter="."):
+    """
+    Formatea un tiempo en segundos a formato HH:MM:SS.mmm.
+    
+    Args:
+        seconds: Tiempo en segundos
+        ms_delimiter: Delimitador para milisegundos (. para VTT, , para SRT)
+    """
+    hours = int(seconds / 3600)
+    minutes = int((seconds % 3600) / 60)
+    seconds = seconds % 60
+    return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}".replace(".", ms_delimiter)
+
+def pack_tokens(tokens):
+    """Empaqueta una lista de tokens como int32 little-endian codificados en base64."""
+    packed = array("i", tokens)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+def unpack_tokens(packed):
+    """Operación inversa de pack_tokens."""
+    tokens = array("i")
+    tokens.frombytes(base64.b64decode(packed))
+    if sys.byteorder == "big":
+        tokens.byteswap()
+    return tokens.tolist()
+
+class OutputWriter:
+    """
+    Escritor base. Recibe la transcripción en tres fases: begin (antes de los
+    segmentos), write_segment (una vez por segmento) y end.
+    """
+    
+    extension = None
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = None
+    
+    def open(self):
+        self._file = open(self.path, "w", encoding="utf-8", buffering=settings.WRITE_BUFFER_SIZE)
+    
+    def flush(self):
+        """Vuelca a disco lo escrito hasta ahora."""
+        if self._file is not None:
+            self._file.flush()
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def begin(self, transcription):
+        pass
+    
+    def write_segment(self, index, segment):
+        pass
+    
+    def end(self, transcription):
+        pass
+
+class TxtWriter(OutputWriter):
+    """Texto plano."""
+    
+    extension = "txt"
+    
+    def write_segment(self, index, segment):
+        self._file.write(segment["text"])
+
+class VttWriter(OutputWriter):
+    """Subtítulos WebVTT."""
+    
+    extension = "vtt"
+    
+    def begin(self, transcription):
+        self._file.write("WEBVTT\n\n")
+    
+    def write_segment(self, index, segment):
+        start_time = format_timestamp(segment["start"])
+        end_time = format_timestamp(segment["end"])
+        self._file.write(f"{start_time} --> {end_time}\n{segment['text'].strip()}\n\n")
+
+class SrtWriter(OutputWriter):
+    """Subtítulos SubRip."""
+    
+    extension = "srt"
+    
+    def write_segment(self, index, segment):
+        start_time = format_timestamp(segment["start"], ms_delimiter=",")
+        end_time = format_timestamp(segment["end"], ms_delimiter=",")
+        self._file.write(f"{index}\n{start_time} --> {end_time}\n{segment['text'].strip()}\n\n")
+
+class JsonWriter(OutputWriter):
+    """
+    Transcripción completa en JSON, escrita segmento a segmento.
+    
+    En modo compacto se omiten los espacios y la indentación. Los tokens de
+    cada segmento se pueden conservar ("full"), empaquetar en base64
+    ("packed", campo tokens_packed) o eliminar ("drop").
+    """
+    
+    extension = "json"
+    
+    def __init__(self, path, compact=False, tokens="full"):
+        super().__init__(path)
+        self.compact = compact
+        self.tokens = tokens
+        self._first = True
+    
+    def _dumps(self, value, level):
+        if self.compact:
+            return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        text = json.dumps(value, ensure_ascii=False, indent=2)
+        return text.replace("\n", "\n" + "  " * level)
+    
+    def _top_level_items(self, transcription, before_segments):
+        """Claves de primer nivel antes o después de "segments", en su orden original."""
+        keys = [key for key in transcription if key != "output_files"]
+        position = keys.index("segments") if "segments" in keys else len(keys)
+        selected = keys[:position] if before_segments else keys[position + 1:]
+        return [(key, transcription[key]) for key in selected]
+    
+    def _write_items(self, items):
+        for key, value in items:
+            if self.compact:
+                self._file.write(f"{json.dumps(key)}:{self._dumps(value, 1)},")
+            else:
+                self._file.write(f"\n  {json.dumps(key)}: {self._dumps(value, 1)},")
+    
+    def begin(self, transcription):
+        self._file.write("{")
+        self._write_items(self._top_level_items(transcription, before_segments=True))
+        self._file.write('"segments":[' if self.compact else '\n  "segments": [')
+        self._first = True
+    
+    def write_segment(self, index, segment):
+        if self.tokens != "full" and "tokens" in segment:
+            segment = dict(segment)
+            tokens = segment.pop("tokens")
+            if self.tokens == "packed":
+                segment["tokens_packed"] = pack_tokens(tokens)
+        
+        separator = "" if self._first else ","
+        if self.compact:
+            self._file.write(separator + self._dumps(segment, 2))
+        else:
+            self._file.write(f"{separator}\n    {self._dumps(segment, 2)}")
+        self._first = False
+    
+    def end(self, transcription):
+        items = self._top_level_items(transcription, before_segments=False)
+        if self.compact:
+            self._file.write("]")
+            for key, value in items:
+                self._file.write(f",{json.dumps(key)}:{self._dumps(value, 1)}")
+            self._file.write("}")
+        else:
+            self._file.write("]" if self._first else "\n  ]")
+            for key, value in items:
+                self._file.write(f",\n  {json.dumps(key)}: {self._dumps(value, 1)}")
+            self._file.write("\n}")
+
+WRITERS = {
+    "txt": TxtWriter,
+    "json": JsonWriter,
+    "vtt": VttWriter,
+    "srt": SrtWriter,
+}
+
+def create_writers(base_path, formats=None, compact_json=False, json_tokens="full"):
+    """
+    Crea los escritores de los formatos indicados.
+    
+    Args:
+        base_path: Ruta de salida sin extensión
+        formats: Formatos a generar (por defecto settings.OUTPUT_FORMATS)
+        compact_json: Escribir el JSON sin espacios ni indentación
+        json_tokens: "full", "packed" o "drop"
+    """
+    base_path = Path(base_path)
+    writers = []
+    for fmt in formats or settings.OUTPUT_FORMATS:
+        if fmt not in WRITERS:
+            raise ValueError(f"Formato de salida no soportado: {fmt}")
+        path = base_path.with_name(f"{base_path.name}.{fmt}")
+        if fmt == "json":
+            writers.append(JsonWriter(path, compact=compact_json, tokens=json_tokens))
+        else:
+            writers.append(WRITERS[fmt](path))
+    return writers
+
+def write_outputs(transcription, base_path, formats=None, compact_json=False, json_tokens="full"):
+    """
+    Escribe una transcripción en los formatos indicados con una sola pasada
+    por sus segmentos.
+    
+    Returns:
+        Diccionario {formato: ruta} con los archivos generados
+    """
+    writers = create_writers(base_path, formats, compact_json, json_tokens)
+    try:
+        for writer in writers:
+            writer.open()
+            writer.begin(transcription)
+        for index, segment in enumerate(transcription["segments"], 1):
+            for writer in writers:
+                writer.write_segment(index, segment)
+        for writer in writers:
+            writer.end(transcription)
+    finally:
+        for writer in writers:
+            writer.close()
+    
+    return {writer.extension: str(writer.path) for writer in writers}
@@ -0,0 +1,8 @@
+"""
+Configuración común de las pruebas.
+"""
+import os
+import sys
+
+# Asegurar que los módulos del proyecto son importables
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,99 @@
+"""
+Pruebas de la inferencia por lotes con un modelo simulado: el reparto de
+ventanas entre lotes y la reconstrucción de cada archivo.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.batching import BatchedInference, parse_segments
+from src.chunking import SAMPLE_RATE
+
+TB = 50000  # Identificador ficticio de <|0.00|>
+
+def ts(seconds):
+    return TB + int(round(seconds / 0.02))
+
+def test_parse_segments():
+    segments, complete = parse_segments([ts(0), 1, 2, ts(1.5), ts(1.5), 3, ts(3)], TB)
+    assert segments == [(0.0, 1.5, [ts(0), 1, 2, ts(1.5)]), (1.5, 3.0, [ts(1.5), 3, ts(3)])]
+    assert complete
+
+def test_parse_segments_incomplete():
+    # La ventana termina a mitad de segmento: el último queda sin fin
+    segments, complete = parse_segments([ts(0), 1, ts(2), ts(2), 4, 5], TB)
+    assert segments == [(0.0, 2.0, [ts(0), 1, ts(2)]), (2.0, None, [ts(2), 4, 5])]
+    assert not complete
+
+def test_parse_segments_without_timestamps():
+    assert parse_segments([1, 2], TB) == ([(0.0, None, [1, 2])], False)
+    assert parse_segments([], TB) == ([], True)
+    # Tokens de tiempo sin texto no forman segmentos
+    assert parse_segments([ts(0), ts(1)], TB) == ([], True)
+
+def fake_model():
+    return SimpleNamespace(is_multilingual=True, num_languages=99, device=SimpleNamespace(type="cpu"))
+
+class FakeBatchedInference(BatchedInference):
+    """Decodifica cada ventana como un segmento que dura toda la ventana."""
+    
+    def __init__(self, batch_size, fail_batch=None):
+        super().__init__(fake_model(), "es", batch_size)
+        self.batches = []
+        self.fail_batch = fail_batch
+    
+    def _decode(self, audios):
+        self.batches.append(len(audios))
+        if len(self.batches) == self.fail_batch:
+            raise RuntimeError("sin memoria")
+        text = self.tokenizer.encode(" hola")
+        return [
+            SimpleNamespace(
+                tokens=[self.tokenizer.timestamp_begin, *text,
+                        self.tokenizer.timestamp_begin + int(len(audio) / SAMPLE_RATE / 0.02)],
+                no_speech_prob=0.0, avg_logprob=-0.1, compression_ratio=1.0, temperature=0.0
+            )
+            for audio in audios
+        ]
+
+def noise(seconds):
+    return (np.random.default_rng(0).standard_normal(int(seconds * SAMPLE_RATE)) * 0.1).astype(np.float32)
+
+def test_windows_are_shared_between_files():
+    inference = FakeBatchedInference(batch_size=2)
+    items = [("a", noise(10)), ("b", noise(50)), ("c", noise(5)), ("vacio", np.zeros(0, dtype=np.float32))]
+    results = list(inference.transcribe_files(items))
+    
+    assert [key for key, _, _ in results] == ["a", "b", "c", "vacio"]
+    assert inference.batches == [2, 2]
+    transcriptions = {key: transcription for key, transcription, error in results if error is None}
+    assert transcriptions["vacio"] == {"text": "", "segments": [], "language": "es"}
+    segments = transcriptions["b"]["segments"]
+    assert [segment["id"] for segment in segments] == [0, 1]
+    # Tiempos absolutos y continuos entre las ventanas del archivo
+    assert segments[0]["start"] == 0.0
+    assert segments[0]["end"] == pytest.approx(segments[1]["start"], abs=0.02)
+    assert segments[1]["end"] == pytest.approx(50.0, abs=0.02)
+    assert transcriptions["b"]["text"] == " hola hola"
+
+def test_failed_batch_fails_only_its_files():
+    inference = FakeBatchedInference(batch_size=1, fail_batch=2)
+    results = {key: (transcription, error) for key, transcription, error in
+               inference.transcribe_files([("a", noise(5)), ("b", noise(5)), ("c", noise(5))])}
+    assert results["b"] == (None, "sin memoria")
+    assert results["a"][1] is None and results["c"][1] is None
+
+def test_incomplete_window_falls_back_to_transcribe():
+    inference = FakeBatchedInference(batch_size=1)
+    decode = inference._decode
+    inference._decode = lambda audios: [
+        SimpleNamespace(**{**vars(result), "tokens": result.tokens[:-1]}) for result in decode(audios)
+    ]
+    inference.model.transcribe = lambda audio, **options: {
+        "segments": [{"seek": 0, "start": 0.0, "end": 99.0, "text": " respaldo"}]
+    }
+    [(key, transcription, error)] = inference.transcribe_files([("a", noise(5))])
+    assert transcription["text"] == " respaldo"
+    # El fin se recorta a la duración de la ventana
+    assert transcription["segments"][0]["end"] == 5.0
@@ -0,0 +1,60 @@
+"""
+Pruebas de la caché de transcripciones: claves, lectura, escritura y expulsión.
+"""
+import os
+
+from src.cache import TranscriptionCache
+
+def entry(text):
+    return {"text": text, "segments": [], "language": "es"}
+
+def entry_size(cache, key):
+    return cache._entry_path(key).stat().st_size
+
+def test_key_depends_on_content_and_options(tmp_path):
+    cache = TranscriptionCache(tmp_path / "cache")
+    first, copy, other = tmp_path / "a.wav", tmp_path / "b.wav", tmp_path / "c.wav"
+    first.write_bytes(b"audio")
+    copy.write_bytes(b"audio")
+    other.write_bytes(b"otro audio")
+    
+    key = cache.make_key(first, "base", "es", {"beam_size": 5})
+    # El nombre del archivo no cuenta, solo su contenido
+    assert cache.make_key(copy, "base", "es", {"beam_size": 5}) == key
+    assert cache.make_key(other, "base", "es", {"beam_size": 5}) != key
+    assert cache.make_key(first, "small", "es", {"beam_size": 5}) != key
+    assert cache.make_key(first, "base", "en", {"beam_size": 5}) != key
+    assert cache.make_key(first, "base", "es", {"beam_size": 1}) != key
+
+def test_get_and_put(tmp_path):
+    cache = TranscriptionCache(tmp_path)
+    assert cache.get("k") is None
+    cache.put("k", entry(" Hola ñandú"))
+    
+    assert cache.get("k") == entry(" Hola ñandú")
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert not list(tmp_path.glob("*.tmp"))
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = TranscriptionCache(tmp_path)
+    (tmp_path / "k.json").write_text("{no es json", encoding="utf-8")
+    assert cache.get("k") is None
+    assert cache.misses == 1
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = TranscriptionCache(tmp_path, max_bytes=10 ** 6)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, entry(key * 100))
+        os.utime(cache._entry_path(key), (100 + i, 100 + i))
+    # Leer "a" la convierte en la más reciente
+    assert cache.get("a") is not None
+    
+    cache.max_bytes = sum(entry_size(cache, key) for key in ["a", "b", "c"])
+    cache.put("d", entry("d" * 100))
+    
+    assert sorted(path.stem for path in tmp_path.glob("*.json")) == ["a", "c", "d"]
+
+def test_evicts_until_within_limit(tmp_path):
+    cache = TranscriptionCache(tmp_path, max_bytes=0)
+    cache.put("a", entry("a"))
+    assert not list(tmp_path.glob("*.json"))
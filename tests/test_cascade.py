@@ -0,0 +1,93 @@
+"""
+Pruebas de la cascada de modelos con un modelo grande simulado.
+"""
+import numpy as np
+import pytest
+
+from config import settings
+from src.cascade import ModelCascade, is_weak, splice_segments, weak_spans
+from src.chunking import SAMPLE_RATE
+
+THRESHOLDS = {"logprob_threshold": -0.8, "compression_threshold": 2.2, "no_speech_threshold": 0.6}
+
+def segment(start, end, text, **extra):
+    return {"start": start, "end": end, "text": text, **extra}
+
+def test_is_weak():
+    assert not is_weak(segment(0, 1, " a", avg_logprob=-0.2), **THRESHOLDS)
+    assert is_weak(segment(0, 1, " a", avg_logprob=-1.2), **THRESHOLDS)
+    assert is_weak(segment(0, 1, " a", compression_ratio=3.0), **THRESHOLDS)
+    assert is_weak(segment(0, 1, " a", no_speech_prob=0.9), **THRESHOLDS)
+
+def test_weak_spans_merge_close_segments():
+    segments = [
+        segment(0.0, 2.0, " a", avg_logprob=-1.0),
+        segment(2.5, 4.0, " b", avg_logprob=-1.0),
+        segment(4.0, 8.0, " c"),
+        segment(10.0, 12.0, " d", no_speech_prob=0.9),
+    ]
+    assert weak_spans(segments, 1.0, **THRESHOLDS) == [(0.0, 4.0), (10.0, 12.0)]
+
+def test_splice_replaces_segments_in_span():
+    segments = [segment(0.0, 2.0, " a"), segment(2.0, 4.0, " b?"), segment(4.0, 6.0, " c")]
+    replacements = [segment(1.9, 3.0, " b1"), segment(3.0, 4.0, " b2")]
+    spliced = splice_segments(segments, replacements, [(2.0, 4.0)])
+    
+    assert [(s["id"], s["start"], s["end"], s["text"]) for s in spliced] == [
+        (0, 0.0, 2.0, " a"), (1, 2.0, 3.0, " b1"), (2, 3.0, 4.0, " b2"), (3, 4.0, 6.0, " c"),
+    ]
+
+def test_splice_keeps_originals_without_replacement():
+    segments = [segment(0.0, 2.0, " a"), segment(2.0, 4.0, " b?"), segment(6.0, 8.0, " c?")]
+    # El modelo grande solo devuelve algo para el primer tramo
+    spliced = splice_segments(segments, [segment(2.0, 4.0, " b")], [(2.0, 4.0), (6.0, 8.0)])
+    assert [s["text"] for s in spliced] == [" a", " b", " c?"]
+
+def test_splice_drops_fully_covered_segments():
+    segments = [segment(0.0, 5.0, " a")]
+    spliced = splice_segments(segments, [segment(1.0, 3.0, " b")], [(4.9, 5.0)])
+    # El nuevo segmento queda tapado por el original, que no está en el tramo
+    assert [s["text"] for s in spliced] == [" a"]
+
+class FakeModel:
+    """Modelo que devuelve un segmento por tramo con tiempos relativos al trozo."""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def transcribe(self, audio, language=None, verbose=False, **options):
+        self.calls.append((len(audio) / SAMPLE_RATE, options.get("initial_prompt")))
+        seconds = len(audio) / SAMPLE_RATE
+        return {"segments": [
+            segment(0.0, 0.2, " margen"),
+            segment(0.3, seconds - 0.3, " mejor", seek=0, words=[{"word": " mejor", "start": 0.3, "end": 1.0}]),
+        ]}
+
+def test_refine_replaces_weak_spans(monkeypatch):
+    monkeypatch.setattr(settings, "CASCADE_MARGIN_SECONDS", 0.3)
+    monkeypatch.setattr(settings, "CASCADE_MERGE_GAP_SECONDS", 0.5)
+    cascade = ModelCascade("small", "es", **THRESHOLDS)
+    cascade.model = FakeModel()
+    transcription = {"text": " Hola. Dudoso. Adiós.", "language": "es", "segments": [
+        segment(0.0, 2.0, " Hola."),
+        segment(2.0, 4.0, " Dudoso.", avg_logprob=-1.5),
+        segment(4.0, 6.0, " Adiós."),
+    ]}
+    refined = cascade.refine(np.zeros(6 * SAMPLE_RATE, dtype=np.float32), transcription)
+    
+    assert refined["text"] == " Hola. mejor Adiós."
+    assert [(s["start"], s["end"]) for s in refined["segments"]] == [(0.0, 2.0), (2.0, 4.0), (4.0, 6.0)]
+    assert refined["segments"][1]["model"] == "small"
+    assert refined["segments"][1]["words"][0]["start"] == pytest.approx(2.0)
+    assert cascade.model.calls == [(pytest.approx(2.6), "Hola.")]
+    assert refined["cascade"]["spans"] == 1
+    assert refined["cascade"]["escalated_ratio"] == pytest.approx(2 / 6, abs=1e-4)
+
+def test_refine_without_weak_segments_skips_model():
+    cascade = ModelCascade("small", "es", **THRESHOLDS)
+    transcription = {"text": " Hola.", "segments": [segment(0.0, 2.0, " Hola.")]}
+    refined = cascade.refine(np.zeros(2 * SAMPLE_RATE, dtype=np.float32), transcription)
+    
+    assert cascade.model is None
+    assert refined["segments"] == transcription["segments"]
+    assert refined["cascade"]["spans"] == 0
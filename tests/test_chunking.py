@@ -0,0 +1,84 @@
+"""
+Pruebas de la división de audios en ventanas solapadas y de la unión de sus
+transcripciones.
+"""
+import numpy as np
+import pytest
+
+from src.chunking import SAMPLE_RATE, find_cut_points, split_windows, stitch_windows
+
+def tone_with_gaps(seconds, gaps):
+    """Ruido continuo con silencios de 0,2 s centrados en `gaps` (segundos)."""
+    audio = np.random.default_rng(0).uniform(-0.5, 0.5, int(seconds * SAMPLE_RATE)).astype(np.float32)
+    for gap in gaps:
+        audio[int((gap - 0.1) * SAMPLE_RATE):int((gap + 0.1) * SAMPLE_RATE)] = 0
+    return audio
+
+def test_cuts_land_in_silences():
+    cuts = find_cut_points(tone_with_gaps(65, [11.5]), chunk_seconds=10, search_seconds=2)
+    assert cuts[0] == 0 and cuts[-1] == 65 * SAMPLE_RATE
+    assert cuts[1] / SAMPLE_RATE == pytest.approx(11.5, abs=0.1)
+    # Ningún fragmento supera el tamaño pedido más el margen de búsqueda
+    assert all(b - a <= 12.5 * SAMPLE_RATE for a, b in zip(cuts, cuts[1:]))
+
+def test_short_audio_is_not_cut():
+    assert find_cut_points(np.zeros(12 * SAMPLE_RATE), chunk_seconds=10, search_seconds=1) == [0, 12 * SAMPLE_RATE]
+
+def test_split_windows_overlap_and_ownership():
+    audio = tone_with_gaps(30, [10, 20])
+    windows = split_windows(audio, chunk_seconds=10, overlap_seconds=2, search_seconds=1)
+    assert len(windows) == 3
+    assert windows[0]["start"] == 0 and windows[-1]["end"] == len(audio)
+    assert windows[0]["own_start"] == float("-inf") and windows[-1]["own_end"] == float("inf")
+    for previous, current in zip(windows, windows[1:]):
+        # Cada ventana se extiende 1 s dentro de la siguiente y los tramos propios se tocan
+        assert previous["own_end"] == current["own_start"]
+        assert previous["end"] - current["start"] == 2 * SAMPLE_RATE
+
+def segment(start, end, text, **extra):
+    return {"start": start, "end": end, "text": text, **extra}
+
+def test_stitch_windows_drops_duplicates_and_shifts_times():
+    windows = [
+        {"start": 0, "end": 11 * SAMPLE_RATE, "own_start": float("-inf"), "own_end": 10.0},
+        {"start": 9 * SAMPLE_RATE, "end": 20 * SAMPLE_RATE, "own_start": 10.0, "own_end": float("inf")},
+    ]
+    results = [
+        {"language": "es", "segments": [
+            segment(0.0, 4.0, " Uno."),
+            segment(4.0, 9.6, " Dos.", words=[{"word": " Dos.", "start": 4.0, "end": 9.6}]),
+            # Segmento del solapamiento cuyo centro cae en la segunda ventana
+            segment(9.8, 11.0, " Tres."),
+        ]},
+        {"language": "es", "segments": [
+            # Repite "Dos." (pertenece a la primera ventana)
+            segment(0.0, 0.6, " Dos."),
+            segment(0.4, 2.0, " Tres."),
+            segment(2.0, 5.0, " Cuatro.", words=[{"word": " Cuatro.", "start": 2.0, "end": 5.0}]),
+        ]},
+    ]
+    stitched = stitch_windows(results, windows)
+    
+    assert stitched["text"] == " Uno. Dos. Tres. Cuatro."
+    assert stitched["language"] == "es"
+    assert [(s["id"], s["start"], s["end"]) for s in stitched["segments"]] == [
+        (0, 0.0, 4.0), (1, 4.0, 9.6), (2, 9.6, 11.0), (3, 11.0, 14.0),
+    ]
+    assert stitched["segments"][3]["words"] == [{"word": " Cuatro.", "start": 11.0, "end": 14.0}]
+    assert stitched["segments"][3]["seek"] == 900
+
+def test_stitch_windows_never_overlaps_segments():
+    windows = [
+        {"start": 0, "end": 12 * SAMPLE_RATE, "own_start": float("-inf"), "own_end": 10.0},
+        {"start": 8 * SAMPLE_RATE, "end": 20 * SAMPLE_RATE, "own_start": 10.0, "own_end": float("inf")},
+    ]
+    results = [
+        {"segments": [segment(6.0, 11.0, " a")]},
+        # Empieza antes de que termine el anterior y otro queda completamente tapado
+        {"segments": [segment(2.5, 3.0, " b"), segment(2.8, 5.0, " c")]},
+    ]
+    segments = stitch_windows(results, windows)["segments"]
+    assert [(s["text"], s["start"], s["end"]) for s in segments] == [(" a", 6.0, 11.0), (" c", 11.0, 13.0)]
+
+def test_stitch_windows_without_results():
+    assert stitch_windows([], []) == {"text": "", "segments": [], "language": None}
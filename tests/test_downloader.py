@@ -0,0 +1,106 @@
+"""
+Pruebas de VimeoDownloader con un YoutubeDL simulado (sin red ni ffmpeg).
+"""
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from config import settings
+from src.downloader import VimeoDownloader
+from src.spool import AudioSpool
+from src.vimeo import MetadataCache
+
+# Todas las descargas devuelven el mismo ID para forzar colisiones de nombre
+SHARED_ID = "999"
+
+class FakeYoutubeDL:
+    """Sustituto de yt_dlp.YoutubeDL que escribe un audio en el outtmpl pedido."""
+    
+    calls = []
+    lock = threading.Lock()
+    
+    def __init__(self, options):
+        self.options = options
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def extract_info(self, url, download=True):
+        with FakeYoutubeDL.lock:
+            FakeYoutubeDL.calls.append((url, self.options["outtmpl"]))
+        if url.endswith("/3"):
+            raise RuntimeError("video no disponible")
+        # Las primeras URLs tardan más, para que terminen fuera de orden
+        time.sleep(0.05 * (6 - int(url.rsplit("/", 1)[-1])))
+        path = Path(self.options["outtmpl"].replace("%(id)s", SHARED_ID).replace("%(ext)s", "wav"))
+        path.write_text(url)
+        return {"id": SHARED_ID, "title": "mismo título", "requested_downloads": [{"filepath": str(path)}]}
+
+@pytest.fixture
+def downloader(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "AUDIO_DIR", tmp_path / "audios")
+    FakeYoutubeDL.calls = []
+    return VimeoDownloader(
+        workers=4,
+        rate_limit=0,
+        ydl_factory=FakeYoutubeDL,
+        audio_format="wav",
+        metadata_cache=MetadataCache(tmp_path / "metadata")
+    )
+
+URLS = [f"https://vimeo.com/{i}" for i in range(1, 6)]
+
+def test_results_in_input_order(downloader):
+    results = list(downloader.iter_download(URLS))
+    assert [url for url, _ in results] == URLS
+
+def test_failure_is_isolated(downloader):
+    results = dict(downloader.iter_download(URLS))
+    assert results["https://vimeo.com/3"] is None
+    for url in URLS:
+        if url != "https://vimeo.com/3":
+            assert results[url] is not None
+            assert Path(results[url]).read_text() == url
+
+def test_collision_free_paths(downloader):
+    results = dict(downloader.iter_download(URLS))
+    paths = [path for path in results.values() if path is not None]
+    assert len(paths) == len(set(paths)) == 4
+    assert all(path.parent == settings.AUDIO_DIR for path in paths)
+    # Cada descarga usa su propio directorio temporal
+    staging_dirs = {Path(outtmpl).parent for _, outtmpl in FakeYoutubeDL.calls}
+    assert len(staging_dirs) == len(URLS)
+    assert not list(settings.AUDIO_DIR.glob(".descarga_*"))
+
+def test_reuses_audio_named_by_cached_title(downloader):
+    # Audio descargado cuando se nombraban por título: la caché de metadatos
+    # permite encontrarlo sin llamar a extract_info
+    downloader.metadata_cache.put("42", {"id": "42", "title": "Charla: parte 1"})
+    settings.AUDIO_DIR.mkdir(parents=True)
+    legacy = settings.AUDIO_DIR / "Charla_ parte 1.wav"
+    legacy.write_text("audio")
+    
+    assert downloader.download_audio("https://player.vimeo.com/video/42") == legacy
+    assert FakeYoutubeDL.calls == []
+
+def test_reused_audio_counts_in_spool(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "AUDIO_DIR", tmp_path / "audios")
+    spool = AudioSpool(tmp_path / "spool", max_bytes=0, max_files=2)
+    downloader = VimeoDownloader(
+        rate_limit=0,
+        ydl_factory=FakeYoutubeDL,
+        audio_format="wav",
+        metadata_cache=MetadataCache(tmp_path / "metadata"),
+        spool=spool
+    )
+    spool.directory.mkdir(parents=True)
+    (spool.directory / "7.wav").write_text("audio")
+    
+    assert downloader.download_audio("https://vimeo.com/7") == spool.directory / "7.wav"
+    occupancy = spool.occupancy()
+    assert occupancy["files"] == 1 and occupancy["bytes"] == 5 and occupancy["reserved"] == 0
@@ -0,0 +1,47 @@
+"""
+Pruebas de la tasa de error por palabras y del motor int8 con un modelo diminuto.
+"""
+import pytest
+
+from src.engines import (
+    _load_quantized, _save_quantized, load_engine_model, quantize_model, quantized_model_path,
+    word_error_rate
+)
+
+@pytest.mark.parametrize("reference, hypothesis, expected", [
+    ("hola que tal", "hola que tal", 0.0),
+    # Sin distinguir mayúsculas ni signos de puntuación
+    ("Hola, ¿qué tal?", "hola qué tal", 0.0),
+    ("hola que tal", "hola tal", 1 / 3),
+    ("hola que tal", "hola que tal estás", 1 / 3),
+    ("hola que tal", "adiós que tal", 1 / 3),
+    ("uno dos", "tres cuatro cinco", 3 / 2),
+    ("", "", 0.0),
+    ("", "algo", 1.0),
+])
+def test_word_error_rate(reference, hypothesis, expected):
+    assert word_error_rate(reference, hypothesis) == pytest.approx(expected)
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError):
+        load_engine_model("tiny", engine="fp16")
+
+def tiny_whisper():
+    from whisper.model import ModelDimensions, Whisper
+    return Whisper(ModelDimensions(
+        n_mels=80, n_audio_ctx=8, n_audio_state=16, n_audio_head=2, n_audio_layer=1,
+        n_vocab=64, n_text_ctx=8, n_text_state=16, n_text_head=2, n_text_layer=1
+    ))
+
+def test_quantized_model_roundtrip(tmp_path):
+    torch = pytest.importorskip("torch")
+    model = quantize_model(tiny_whisper())
+    path = quantized_model_path("diminuto", tmp_path)
+    _save_quantized(model, path)
+    
+    loaded = _load_quantized("diminuto", path)
+    mel = torch.zeros(1, 80, 16)
+    tokens = torch.zeros(1, 4, dtype=torch.long)
+    with torch.no_grad():
+        assert torch.allclose(model(mel, tokens), loaded(mel, tokens))
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,196 @@
+"""
+Pruebas de JobStore y JobWorker con un descargador y un transcriptor simulados.
+"""
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src import jobstore
+from src.jobstore import JobStore, JobWorker
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(tmp_path / "jobs.db", lease_seconds=60, max_attempts=2, retry_seconds=0)
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj controlado para las concesiones y los reintentos."""
+    now = [1000.0]
+    monkeypatch.setattr(jobstore, "time", SimpleNamespace(time=lambda: now[0], sleep=time.sleep))
+    return now
+
+def steal_lease(store, url):
+    """Simula que la concesión caduca y la reclama otro trabajador."""
+    conn = sqlite3.connect(str(store.db_path))
+    with conn:
+        conn.execute("UPDATE jobs SET lease_owner = 'otro:1' WHERE url = ?", (url,))
+    conn.close()
+
+class FakeDownloader:
+    def __init__(self, directory, on_download=None):
+        self.directory = directory
+        self.on_download = on_download or (lambda url: None)
+    
+    def download_audio(self, url):
+        path = self.directory / f"{url.rsplit('/', 1)[-1]}.wav"
+        path.write_text(url)
+        self.on_download(url)
+        return path
+
+class FakeTranscriber:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.transcribed = []
+    
+    def transcribe(self, audio_file, output_dir=None):
+        if self.fail:
+            raise RuntimeError("sin memoria")
+        self.transcribed.append(audio_file)
+        return {"text": "hola"}
+
+def test_retry_failed_clears_error(store, tmp_path):
+    store.add(["https://vimeo.com/1"])
+    worker = JobWorker(store, FakeDownloader(tmp_path), FakeTranscriber(fail=True), poll_seconds=0)
+    worker.run()
+    assert store.failures() == [("https://vimeo.com/1", 2, "sin memoria")]
+    
+    assert store.retry_failed() == 1
+    assert store.failures() == []
+    job = store.get("https://vimeo.com/1")
+    assert job.state == "downloaded" and job.attempts == 0
+
+def test_lost_lease_after_download_removes_audio(store, tmp_path):
+    url = "https://vimeo.com/1"
+    store.add([url])
+    transcriber = FakeTranscriber()
+    worker = JobWorker(store, FakeDownloader(tmp_path, lambda url: steal_lease(store, url)), transcriber)
+    
+    assert worker.process(store.claim(worker.owner)) is False
+    assert transcriber.transcribed == []
+    assert not (tmp_path / "1.wav").exists()
+    # La URL sigue pendiente para el otro trabajador, sin error
+    assert store.get(url).state == "pending"
+
+def test_lost_lease_keeps_audio_registered_for_the_job(store, tmp_path):
+    url = "https://vimeo.com/1"
+    store.add([url])
+    worker = JobWorker(store, FakeDownloader(tmp_path), FakeTranscriber())
+    job = store.claim(worker.owner)
+    
+    class StealingTranscriber(FakeTranscriber):
+        def transcribe(self, audio_file, output_dir=None):
+            steal_lease(store, url)
+            return super().transcribe(audio_file, output_dir)
+    
+    worker.transcriber = StealingTranscriber()
+    assert worker.process(job) is False
+    # El audio consta en la cola: el nuevo trabajador lo retomará desde downloaded
+    assert (tmp_path / "1.wav").exists()
+    assert store.get(url).state == "downloaded"
+
+def test_lost_lease_with_keep_audio(store, tmp_path):
+    store.add(["https://vimeo.com/1"])
+    worker = JobWorker(
+        store, FakeDownloader(tmp_path, lambda url: steal_lease(store, url)), FakeTranscriber(), keep_audio=True
+    )
+    assert worker.process(store.claim(worker.owner)) is False
+    assert (tmp_path / "1.wav").exists()
+
+def test_add_ignores_existing_urls(store):
+    assert store.add(["a", "b"]) == 2
+    assert store.add(["b", "c"]) == 1
+    assert store.counts()["pending"] == 3
+
+def test_claim_in_order_with_exclusive_lease(store, clock):
+    store.add(["a", "b"])
+    first = store.claim("w1")
+    assert (first.url, first.state, first.attempts) == ("a", "pending", 1)
+    # Mientras la concesión está vigente nadie más recibe "a"
+    assert store.claim("w2").url == "b"
+    assert store.claim("w3") is None
+    
+    clock[0] += store.lease_seconds - 1
+    assert store.renew("a", "w1") and store.renew("b", "w2")
+    clock[0] += store.lease_seconds - 1
+    assert store.claim("w3") is None
+    
+    # Al caducar, otro trabajador la retoma y el anterior ya no puede avanzar
+    assert store.renew("b", "w2")
+    clock[0] += 2
+    assert store.claim("w3").url == "a"
+    assert not store.renew("a", "w1")
+    assert not store.advance("a", "w1", "downloaded", "a.wav")
+    assert store.advance("a", "w3", "downloaded", "a.wav")
+    assert store.get("a") == jobstore.Job("a", "downloaded", 2, "a.wav")
+
+def test_done_releases_lease(store):
+    store.add(["a"])
+    store.claim("w1")
+    assert store.advance("a", "w1", "done")
+    assert store.unfinished() == 0
+    assert store.claim("w2") is None
+    with pytest.raises(ValueError):
+        store.advance("a", "w1", "desconocido")
+
+def test_fail_retries_with_backoff_until_attempts_run_out(tmp_path, clock):
+    store = JobStore(tmp_path / "jobs.db", lease_seconds=60, max_attempts=3, retry_seconds=10)
+    store.add(["a"])
+    store.claim("w1")
+    store.fail("a", "w1", RuntimeError("red caída"))
+    assert store.claim("w1") is None
+    clock[0] += 11
+    assert store.claim("w1").attempts == 2
+    
+    # La espera se duplica en cada intento
+    store.fail("a", "w1", RuntimeError("red caída"))
+    clock[0] += 11
+    assert store.claim("w1") is None
+    clock[0] += 10
+    assert store.claim("w1").attempts == 3
+    
+    store.fail("a", "w1", RuntimeError("red caída otra vez"))
+    assert store.failures() == [("a", 3, "red caída otra vez")]
+    assert store.unfinished() == 0
+
+def test_concurrent_claims_never_share_a_url(store):
+    urls = [f"u{i}" for i in range(40)]
+    store.add(urls)
+    claimed = []
+    lock = threading.Lock()
+    
+    def work(owner):
+        while True:
+            job = store.claim(owner)
+            if job is None:
+                return
+            with lock:
+                claimed.append(job.url)
+    
+    threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(urls)
+
+def test_worker_resumes_from_downloaded(store, tmp_path):
+    audio = tmp_path / "1.wav"
+    audio.write_text("audio")
+    store.add(["https://vimeo.com/1"])
+    store.claim("anterior")
+    store.advance("https://vimeo.com/1", "anterior", "downloaded", audio)
+    store.fail("https://vimeo.com/1", "anterior", RuntimeError("proceso interrumpido"))
+    
+    class NoDownloads:
+        def download_audio(self, url):
+            raise AssertionError("no debería descargarse de nuevo")
+    
+    transcriber = FakeTranscriber()
+    worker = JobWorker(store, NoDownloads(), transcriber, poll_seconds=0)
+    assert worker.run() == 1
+    assert transcriber.transcribed == [audio]
+    assert not audio.exists()
+    assert store.counts()["done"] == 1
@@ -0,0 +1,97 @@
+"""
+Pruebas de BatchPipeline con un descargador y un transcriptor simulados.
+"""
+import threading
+import time
+
+import pytest
+
+from src.pipeline import BatchPipeline
+
+URLS = [f"https://vimeo.com/{i}" for i in range(1, 9)]
+
+class FakeDownloader:
+    """Descarga instantánea que crea el audio; falla con las URLs de `failing`."""
+    
+    def __init__(self, directory, failing=()):
+        self.directory = directory
+        self.failing = set(failing)
+        self.downloaded = []
+    
+    def iter_download(self, urls):
+        for url in urls:
+            time.sleep(0.01)
+            if url in self.failing:
+                yield url, None
+                continue
+            path = self.directory / f"{url.rsplit('/', 1)[-1]}.wav"
+            path.write_text(url)
+            self.downloaded.append(url)
+            yield url, path
+
+class FakeTranscriber:
+    """Transcribe leyendo el audio; `fail` decide qué hacer con cada archivo."""
+    
+    def __init__(self, fail=None):
+        self.fail = fail or (lambda audio_file: None)
+        self.transcribed = []
+    
+    def transcribe(self, audio_file, output_dir=None):
+        self.fail(audio_file)
+        self.transcribed.append(audio_file.name)
+        return {"text": audio_file.read_text()}
+
+def pipeline_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "pipeline-download"]
+
+def test_per_item_results(tmp_path):
+    downloader = FakeDownloader(tmp_path, failing={URLS[2]})
+    
+    def fail(audio_file):
+        if audio_file.name == "5.wav":
+            raise RuntimeError("modelo sin memoria")
+    
+    results = BatchPipeline(downloader, FakeTranscriber(fail), queue_size=2).run(URLS, output_dir=tmp_path)
+    
+    assert [r["url"] for r in results] == URLS
+    statuses = {r["url"]: r["status"] for r in results}
+    assert statuses.pop(URLS[2]) == "download_error"
+    assert statuses.pop(URLS[4]) == "transcription_error"
+    assert set(statuses.values()) == {"ok"}
+    assert results[2]["audio_file"] is None
+    assert results[4]["error"] == "modelo sin memoria"
+    # Solo se conserva el audio que no se pudo transcribir
+    assert [path.name for path in tmp_path.glob("*.wav")] == ["5.wav"]
+
+def test_keep_audio(tmp_path):
+    results = BatchPipeline(FakeDownloader(tmp_path), FakeTranscriber(), queue_size=2).run(
+        URLS, output_dir=tmp_path, keep_audio=True
+    )
+    assert all(r["audio_file"].exists() for r in results)
+
+@pytest.mark.parametrize("exception", [KeyboardInterrupt, SystemExit])
+def test_shutdown_on_interrupt(tmp_path, exception):
+    downloader = FakeDownloader(tmp_path)
+    
+    def fail(audio_file):
+        if audio_file.name == "2.wav":
+            raise exception()
+    
+    with pytest.raises(exception):
+        BatchPipeline(downloader, FakeTranscriber(fail), queue_size=1).run(URLS, output_dir=tmp_path)
+    # La etapa de descarga se detiene sin llegar al final del lote
+    assert not pipeline_threads()
+    assert len(downloader.downloaded) < len(URLS)
+
+def test_shutdown_on_error(tmp_path):
+    downloader = FakeDownloader(tmp_path)
+    
+    class BrokenSpool:
+        def release(self, path, keep_dir=None):
+            raise OSError("disco lleno")
+    
+    pipeline = BatchPipeline(downloader, FakeTranscriber(), queue_size=1, spool=BrokenSpool())
+    with pytest.raises(OSError):
+        pipeline.run(URLS, output_dir=tmp_path)
+    assert not pipeline_threads()
+    assert len(downloader.downloaded) < len(URLS)
@@ -0,0 +1,61 @@
+"""
+Pruebas de TranscriptionPool con procesos simulados (sin modelo): las tareas
+de un proceso que muere se devuelven como errores.
+"""
+import os
+
+from src.pool import TranscriptionPool, serve_tasks
+
+def fake_worker(worker_id, model_name, language, decode_options, num_threads, engine, vad, tasks, results):
+    """Proceso que "transcribe" devolviendo el audio y muere con el audio "crash"."""
+    def transcribe(audio):
+        if audio == "crash":
+            os._exit(3)
+        if audio == "error":
+            raise ValueError("audio ilegible")
+        return {"text": audio}
+    
+    serve_tasks(worker_id, transcribe, tasks, results)
+
+def fatal_worker(worker_id, model_name, language, decode_options, num_threads, engine, vad, tasks, results):
+    """Proceso que no consigue cargar el modelo."""
+    results.send(("fatal", worker_id, None, "modelo no encontrado"))
+
+def run(items, workers=2, worker_main=fake_worker):
+    with TranscriptionPool("fake", "es", workers=workers, num_threads=1, worker_main=worker_main) as pool:
+        return {task_id: (transcription, error) for task_id, transcription, error in pool.imap_unordered(items)}
+
+def test_results_and_errors():
+    results = run([(i, audio) for i, audio in enumerate(["a", "error", "b"])])
+    assert results[0] == ({"text": "a"}, None)
+    assert results[1] == (None, "audio ilegible")
+    assert results[2] == ({"text": "b"}, None)
+
+def test_crashed_worker_loses_only_its_task():
+    audios = ["a", "b", "crash", "c", "d", "e"]
+    results = run([(i, audio) for i, audio in enumerate(audios)])
+    assert sorted(results) == list(range(len(audios)))
+    transcription, error = results[2]
+    assert transcription is None and "terminó inesperadamente (3)" in error
+    for i, audio in enumerate(audios):
+        if audio != "crash":
+            assert results[i] == ({"text": audio}, None)
+
+def test_all_workers_crash():
+    results = run([(i, "crash") for i in range(4)])
+    assert sorted(results) == [0, 1, 2, 3]
+    assert all(transcription is None and error for transcription, error in results.values())
+
+def test_workers_that_cannot_load_the_model():
+    results = run([(0, "a"), (1, "b")], worker_main=fatal_worker)
+    assert results == {
+        0: (None, "No quedan procesos de transcripción activos"),
+        1: (None, "No quedan procesos de transcripción activos"),
+    }
+
+def test_pool_is_reused_between_calls():
+    with TranscriptionPool("fake", "es", workers=2, num_threads=1, worker_main=fake_worker) as pool:
+        first = sorted(task_id for task_id, _, _ in pool.imap_unordered([("x", "a"), ("y", "b")]))
+        second = dict((task_id, transcription) for task_id, transcription, _ in pool.imap_unordered([(0, "c")]))
+    assert first == ["x", "y"]
+    assert second == {0: {"text": "c"}}
@@ -0,0 +1,96 @@
+"""
+Pruebas de Profiler con bloques anidados y simultáneos.
+"""
+import json
+import threading
+
+import pytest
+
+from src.profiling import Profiler, parse_profilers
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+def allocate(n):
+    data = [bytes(1000) for _ in range(n)]
+    return len(data)
+
+class FakeTranscriber:
+    def transcribe(self, audio_file):
+        busy(20000)
+        allocate(1000)
+        return self.save_outputs(audio_file)
+    
+    def save_outputs(self, base_name):
+        allocate(5000)
+        return base_name
+
+def read_blocks(profiler):
+    profiler.write_summary()
+    with open(profiler.output_dir / "summary.json", encoding="utf-8") as f:
+        return {block["stage"]: block for block in json.load(f)["blocks"]}
+
+def test_nested_stages_get_their_own_profile(tmp_path):
+    profiler = Profiler(tmp_path, kinds=("cprofile", "tracemalloc"))
+    transcriber = FakeTranscriber()
+    profiler.instrument(transcriber, "transcribe", label=lambda audio_file: audio_file)
+    profiler.instrument(transcriber, "save_outputs", label=lambda base_name: base_name)
+    
+    assert transcriber.transcribe("video") == "video"
+    blocks = read_blocks(profiler)
+    assert blocks["transcribe"]["profiled"] and blocks["save_outputs"]["profiled"]
+    # El pico del bloque externo incluye el del anidado
+    assert blocks["save_outputs"]["peak_bytes"] >= 5000 * 1000
+    assert blocks["transcribe"]["peak_bytes"] >= blocks["save_outputs"]["peak_bytes"]
+    
+    report = (profiler.output_dir / "video.txt").read_text(encoding="utf-8")
+    # El bloque anidado termina antes y su sección va primero
+    save_section, transcribe_section = report.split("=== transcribe")
+    # Cada etapa tiene su perfil: lo del bloque anidado no aparece en el externo
+    assert "busy" in transcribe_section and "busy" not in save_section
+    assert "save_outputs" in save_section
+    assert (profiler.output_dir / "video.save_outputs.prof").exists()
+    assert profiler._owner is None and profiler._stack == []
+
+def test_other_threads_are_only_timed(tmp_path):
+    profiler = Profiler(tmp_path, kinds=("cprofile",))
+    inside = threading.Event()
+    release = threading.Event()
+    
+    def hold():
+        with profiler.profile("transcribe", "a"):
+            inside.set()
+            release.wait(5)
+    
+    thread = threading.Thread(target=hold)
+    thread.start()
+    inside.wait(5)
+    with profiler.profile("download", "b") as block:
+        pass
+    release.set()
+    thread.join()
+    
+    assert not block.owner
+    blocks = read_blocks(profiler)
+    assert blocks["transcribe"]["profiled"] and not blocks["download"]["profiled"]
+
+def test_failed_setup_releases_owner(tmp_path, monkeypatch):
+    profiler = Profiler(tmp_path, kinds=("cprofile", "tracemalloc"))
+    
+    def broken():
+        raise RuntimeError("perfilador ocupado")
+    
+    monkeypatch.setattr("src.profiling.cProfile.Profile", broken)
+    with profiler.profile("transcribe", "a") as block:
+        pass
+    assert not block.owner and profiler._owner is None
+    
+    monkeypatch.undo()
+    with profiler.profile("transcribe", "b") as block:
+        pass
+    assert block.owner
+
+def test_parse_profilers():
+    assert parse_profilers("cprofile, TRACEMALLOC,") == ("cprofile", "tracemalloc")
+    with pytest.raises(ValueError):
+        parse_profilers("cprofile,perf")
@@ -0,0 +1,64 @@
+"""
+Pruebas del índice de búsqueda de transcripciones.
+"""
+import json
+import os
+
+import pytest
+
+from src.search import SearchIndex, _fts_query
+
+@pytest.fixture
+def index(tmp_path):
+    try:
+        index = SearchIndex(tmp_path / "search.db")
+    except RuntimeError as e:
+        pytest.skip(str(e))
+    yield index
+    index.close()
+
+def write_json(path, texts):
+    segments = [{"start": i * 2.0, "end": i * 2.0 + 2, "text": f" {text}"} for i, text in enumerate(texts)]
+    path.write_text(json.dumps({"text": "".join(s["text"] for s in segments), "segments": segments}), encoding="utf-8")
+    return path
+
+def test_fts_query_quotes_terms():
+    assert _fts_query('hola "mundo" clave*') == '"hola" """mundo""" "clave"*'
+    assert _fts_query("  * ") == ""
+
+def test_search_with_timestamps(index, tmp_path):
+    write_json(tmp_path / "111.json", ["Bienvenidos a la charla", "Hablamos de canciones"])
+    assert index.update(tmp_path) == (1, 0)
+    
+    hits = index.search("cancion*")
+    assert [(hit["video"], hit["start"], hit["end"]) for hit in hits] == [("111", 2.0, 4.0)]
+    # Sin distinguir mayúsculas ni tildes
+    assert len(index.search("CANCIÓNES")) == 1
+    assert len(index.search("bienvenidos charla")) == 1
+    assert index.search("bienvenidos canciones") == []
+
+def test_update_is_incremental(index, tmp_path):
+    path = write_json(tmp_path / "111.json", ["uno"])
+    assert index.update(tmp_path) == (1, 0)
+    assert index.update(tmp_path) == (0, 0)
+    
+    # Con otro contenido se reindexa; si solo cambia la fecha, no
+    write_json(path, ["dos"])
+    assert index.update(tmp_path) == (1, 0)
+    os.utime(path, (0, 0))
+    assert index.update(tmp_path) == (0, 0)
+    assert index.search("dos") and not index.search("uno")
+    
+    path.unlink()
+    assert index.update(tmp_path) == (0, 1)
+    assert index.search("dos") == []
+
+def test_json_replaces_txt_of_same_transcription(index, tmp_path):
+    txt = tmp_path / "111.txt"
+    txt.write_text("texto de la charla", encoding="utf-8")
+    index.index_outputs({"txt": str(txt)})
+    assert [hit["start"] for hit in index.search("charla")] == [None]
+    
+    json_path = write_json(tmp_path / "111.json", ["texto de la charla"])
+    index.index_outputs({"txt": str(txt), "json": str(json_path)})
+    assert [hit["start"] for hit in index.search("charla")] == [0.0]
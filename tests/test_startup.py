@@ -0,0 +1,34 @@
+"""
+Regresión del tiempo de importación: cargar main no debe importar las
+dependencias pesadas (se importan al usarlas) y debe ser rápido.
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.run import HEAVY_MODULES, STARTUP_BUDGET_SECONDS
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def import_main():
+    code = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "import main\n"
+        "elapsed = time.perf_counter() - started\n"
+        f"print(json.dumps({{'elapsed': elapsed, 'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def test_import_main_skips_heavy_modules():
+    assert import_main()["heavy"] == []
+
+def test_import_main_within_budget():
+    # La mejor de varias ejecuciones, para no depender de una cache de disco fría
+    elapsed = min(import_main()["elapsed"] for _ in range(3))
+    assert elapsed < STARTUP_BUDGET_SECONDS
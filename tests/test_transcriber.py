@@ -0,0 +1,64 @@
+"""
+Pruebas de los lotes de WhisperTranscriber que no necesitan el modelo
+(todos los archivos legibles están en la caché).
+"""
+from pathlib import Path
+
+import pytest
+
+from src.cache import TranscriptionCache
+from src.transcriber import WhisperTranscriber
+
+TRANSCRIPTION = {
+    "text": " Hola.",
+    "segments": [{"id": 0, "start": 0.0, "end": 1.5, "text": " Hola."}],
+    "language": "es",
+}
+
+class FlakyCache(TranscriptionCache):
+    """Caché que no puede leer los audios de `unreadable` (como si desaparecieran)."""
+    
+    def __init__(self, cache_dir):
+        super().__init__(cache_dir)
+        self.unreadable = set()
+    
+    def hash_file(self, audio_file):
+        if audio_file.name in self.unreadable:
+            raise PermissionError(f"Permiso denegado: {audio_file}")
+        return super().hash_file(audio_file)
+
+@pytest.fixture
+def transcriber(tmp_path):
+    cache = FlakyCache(tmp_path / "cache")
+    transcriber = WhisperTranscriber(model_name="tiny", language="es", cache=cache)
+    transcriber.output_formats = ["txt"]
+    transcriber.search_index = None
+    return transcriber
+
+@pytest.mark.parametrize("mode, options", [
+    ("batched", {"batch_size": 4}),
+    ("pool", {"workers": 2}),
+])
+def test_unreadable_file_fails_alone(transcriber, tmp_path, mode, options):
+    audio_files = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.wav"
+        path.write_bytes(name.encode() * 100)
+        audio_files.append(path)
+        transcriber.cache.put(
+            transcriber.cache.make_key(path, "tiny", "es", transcriber.cache_options(mode)), TRANSCRIPTION
+        )
+    transcriber.cache.unreadable = {"b.wav"}
+    
+    def fail_load():
+        raise AssertionError("no debería cargarse el modelo")
+    
+    transcriber.load_model = fail_load
+    results = {
+        Path(result.audio_file).name: result
+        for result in transcriber.iter_transcribe(audio_files, output_dir=tmp_path / "out", keep_audio=True, **options)
+    }
+    assert sorted(results) == ["a.wav", "b.wav", "c.wav"]
+    assert results["a.wav"].ok and results["c.wav"].ok
+    assert not results["b.wav"].ok and "Permiso denegado" in str(results["b.wav"].error)
+    assert (tmp_path / "out" / "a.txt").read_text(encoding="utf-8").strip() == "Hola."
@@ -0,0 +1,72 @@
+"""
+Pruebas de la detección de voz y de la vuelta de los tiempos al audio original.
+"""
+import numpy as np
+import pytest
+
+from src.chunking import SAMPLE_RATE
+from src.vad import GAP_SECONDS, SpeechTimeline, detect_speech, extract_speech
+
+def syllables(seconds):
+    """Tono de 1 kHz que se enciende y apaga cuatro veces por segundo, como sílabas."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.5 * np.sin(2 * np.pi * 1000 * t) * (np.sin(2 * np.pi * 4 * t) > 0)).astype(np.float32)
+
+def speech_between_silences():
+    """2 s de silencio, 3 s de voz, 4 s de silencio, 2 s de voz y 1 s de silencio."""
+    silence = lambda seconds: np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    return np.concatenate([silence(2), syllables(3), silence(4), syllables(2), silence(1)])
+
+def timeline():
+    # Tramos de voz en 2-5 s y 9-11 s de un audio de 12 s
+    regions = [(2 * SAMPLE_RATE, 5 * SAMPLE_RATE), (9 * SAMPLE_RATE, 11 * SAMPLE_RATE)]
+    return SpeechTimeline(regions, int(GAP_SECONDS * SAMPLE_RATE), 12 * SAMPLE_RATE)
+
+def test_to_original_maps_each_region():
+    line = timeline()
+    assert line.speech_seconds == 5.0
+    assert line.to_original(0.0) == 2.0
+    assert line.to_original(1.5) == 3.5
+    # El segundo tramo empieza en 3 s + 0,2 s de silencio añadido
+    assert line.to_original(3.2) == 9.0
+    assert line.to_original(4.7) == 10.5
+
+def test_times_in_added_gap_go_to_end_of_region():
+    assert timeline().to_original(3.1) == 5.0
+
+def test_empty_timeline_keeps_times():
+    assert SpeechTimeline([], 0, 10 * SAMPLE_RATE).to_original(4.2) == 4.2
+
+def test_remap_segments_and_words():
+    transcription = {"text": " Hola adiós", "language": "es", "segments": [
+        {"id": 0, "start": 0.5, "end": 3.1, "text": " Hola",
+         "words": [{"word": " Hola", "start": 0.5, "end": 1.0}]},
+        {"id": 1, "start": 3.3, "end": 4.0, "text": " adiós"},
+    ]}
+    remapped = timeline().remap(transcription)
+    
+    assert remapped["text"] == " Hola adiós"
+    assert [(s["start"], s["end"]) for s in remapped["segments"]] == [(2.5, 5.0), (9.1, 9.8)]
+    assert remapped["segments"][0]["words"] == [{"word": " Hola", "start": 2.5, "end": 3.0}]
+    # No modifica la transcripción original
+    assert transcription["segments"][0]["start"] == 0.5
+
+def test_detect_speech_finds_regions():
+    regions = detect_speech(speech_between_silences(), threshold_db=10, min_speech=0.25,
+                            min_silence=0.5, padding=0.1)
+    assert len(regions) == 2
+    assert regions[0][0] / SAMPLE_RATE == pytest.approx(1.9, abs=0.1)
+    assert regions[0][1] / SAMPLE_RATE == pytest.approx(5.1, abs=0.2)
+    assert regions[1][0] / SAMPLE_RATE == pytest.approx(8.9, abs=0.1)
+    assert regions[1][1] / SAMPLE_RATE == pytest.approx(11.1, abs=0.2)
+
+def test_detect_speech_on_empty_audio():
+    assert detect_speech(np.zeros(0, dtype=np.float32)) == []
+
+def test_extract_speech_concatenates_regions():
+    audio = speech_between_silences()
+    speech, line = extract_speech(audio, threshold_db=10, min_speech=0.25, min_silence=0.5, padding=0.1)
+    
+    assert line.total_seconds == len(audio) / SAMPLE_RATE
+    assert len(speech) == pytest.approx(line.speech_seconds * SAMPLE_RATE + GAP_SECONDS * SAMPLE_RATE)
+    assert line.to_original(0.0) == pytest.approx(1.9, abs=0.1)
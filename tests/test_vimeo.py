@@ -0,0 +1,72 @@
+"""
+Pruebas de la normalización de URLs de Vimeo y de la caché de metadatos.
+"""
+import pytest
+
+from src.vimeo import parse_vimeo_url, dedupe_urls, MetadataCache
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://vimeo.com/123456", ("123456", None, "https://vimeo.com/123456")),
+    ("http://www.vimeo.com/123456", ("123456", None, "https://vimeo.com/123456")),
+    ("vimeo.com/123456", ("123456", None, "https://vimeo.com/123456")),
+    ("  https://vimeo.com/123456/  ", ("123456", None, "https://vimeo.com/123456")),
+    # Reproductor, con el hash en el parámetro h
+    ("https://player.vimeo.com/video/123456", ("123456", None, "https://vimeo.com/123456")),
+    ("https://player.vimeo.com/video/123456?h=abcdef12&autoplay=1",
+     ("123456", "abcdef12", "https://vimeo.com/123456/abcdef12")),
+    # Video no listado con su hash de privacidad
+    ("https://vimeo.com/123456/ABCDEF12", ("123456", "abcdef12", "https://vimeo.com/123456/abcdef12")),
+    # Escaparates, canales y grupos
+    ("https://vimeo.com/showcase/987/video/123456", ("123456", None, "https://vimeo.com/123456")),
+    ("https://vimeo.com/channels/staffpicks/123456", ("123456", None, "https://vimeo.com/123456")),
+    ("https://vimeo.com/groups/cine/videos/123456", ("123456", None, "https://vimeo.com/123456")),
+    # Parámetros y fragmentos
+    ("https://vimeo.com/123456?share=copy#t=30s", ("123456", None, "https://vimeo.com/123456")),
+])
+def test_parse_vimeo_url(url, expected):
+    assert tuple(parse_vimeo_url(url)) == expected
+
+@pytest.mark.parametrize("url", [
+    "https://youtube.com/watch?v=123456",
+    "https://vimeo.com/channels/staffpicks",
+    "https://vimeo.com/user/videos",
+    "no es una url",
+])
+def test_parse_vimeo_url_rejects_other_urls(url):
+    assert parse_vimeo_url(url) is None
+
+def test_dedupe_urls_keeps_first_order():
+    urls = [
+        "https://vimeo.com/2",
+        "https://www.vimeo.com/1",
+        "https://player.vimeo.com/video/2?autoplay=1",
+        "https://vimeo.com/showcase/9/video/1",
+        "https://vimeo.com/3?share=copy",
+    ]
+    assert dedupe_urls(urls) == ["https://vimeo.com/2", "https://vimeo.com/1", "https://vimeo.com/3"]
+
+def test_dedupe_urls_prefers_hash():
+    urls = [
+        "https://vimeo.com/1",
+        "https://player.vimeo.com/video/1?h=abcdef12",
+        "https://vimeo.com/1/abcdef99",
+    ]
+    assert dedupe_urls(urls) == ["https://vimeo.com/1/abcdef12"]
+
+def test_dedupe_urls_keeps_other_urls_once():
+    urls = ["https://example.com/a.mp3", " https://example.com/a.mp3", "https://vimeo.com/1"]
+    assert dedupe_urls(urls) == ["https://example.com/a.mp3", "https://vimeo.com/1"]
+
+def test_metadata_cache_expires(tmp_path, monkeypatch):
+    cache = MetadataCache(tmp_path, ttl=60)
+    cache.put("1", {"id": "1", "title": "Charla", "formats": ["no se guarda"]})
+    entry = cache.get("1")
+    assert entry["title"] == "Charla" and "formats" not in entry
+    
+    fetched_at = entry["fetched_at"]
+    monkeypatch.setattr("src.vimeo.time.time", lambda: fetched_at + 61)
+    assert cache.get("1") is None
+
+def test_metadata_cache_ignores_corrupt_entries(tmp_path):
+    (tmp_path / "1.json").write_text("{no es json")
+    assert MetadataCache(tmp_path).get("1") is None
@@ -0,0 +1,103 @@
+"""
+Pruebas de FolderWatcher recorriendo el directorio (sin inotify).
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src import watcher
+from src.watcher import FolderWatcher
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj controlado para los segundos sin cambios."""
+    now = [1000.0]
+    monkeypatch.setattr(watcher, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+def make_watcher(directory, **options):
+    options = {"extensions": ["wav"], "settle_seconds": 2, "poll_seconds": 0.05, "use_inotify": False, **options}
+    return FolderWatcher(directory, **options)
+
+def test_delivers_only_after_settling(tmp_path, clock):
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"a" * 10)
+    folder = make_watcher(tmp_path)
+    
+    clock[0] += 1.5
+    assert folder._ready() == []
+    # Sigue escribiéndose: la espera vuelve a empezar
+    audio.write_bytes(b"a" * 20)
+    folder._scan()
+    clock[0] += 1.5
+    assert folder._ready() == []
+    clock[0] += 0.5
+    assert folder._ready() == [audio]
+    # Ya entregado y sin cambios
+    clock[0] += 10
+    folder._scan()
+    assert folder._ready() == []
+
+def test_ignores_empty_and_other_files(tmp_path, clock):
+    (tmp_path / "vacio.wav").write_bytes(b"")
+    (tmp_path / "notas.txt").write_text("hola")
+    (tmp_path / ".oculto.wav").write_bytes(b"a")
+    folder = make_watcher(tmp_path)
+    
+    clock[0] += 10
+    assert folder._ready() == []
+    
+    # Al recibir datos se entrega
+    (tmp_path / "vacio.wav").write_bytes(b"a")
+    folder._scan()
+    clock[0] += 2
+    assert folder._ready() == [tmp_path / "vacio.wav"]
+
+def test_redelivers_changed_content(tmp_path, clock):
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"a")
+    folder = make_watcher(tmp_path)
+    clock[0] += 2
+    assert folder._ready() == [audio]
+    
+    audio.write_bytes(b"bb")
+    folder._scan()
+    clock[0] += 2
+    assert folder._ready() == [audio]
+
+def test_deleted_file_is_forgotten(tmp_path, clock):
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"a")
+    folder = make_watcher(tmp_path)
+    clock[0] += 2
+    assert folder._ready() == [audio]
+    
+    audio.unlink()
+    folder._scan()
+    audio.write_bytes(b"a")
+    folder._scan()
+    clock[0] += 2
+    assert folder._ready() == [audio]
+
+def test_wait_returns_existing_files_in_order(tmp_path):
+    for name in ["b.wav", "a.wav"]:
+        (tmp_path / name).write_bytes(b"audio")
+    folder = make_watcher(tmp_path, settle_seconds=0.1)
+    
+    assert folder.wait(timeout=5) == [tmp_path / "a.wav", tmp_path / "b.wav"]
+    assert folder.wait(timeout=0.2) == []
+
+def test_wait_picks_up_new_files(tmp_path):
+    folder = make_watcher(tmp_path, settle_seconds=0.1)
+    threading.Timer(0.1, (tmp_path / "nuevo.wav").write_bytes, args=(b"audio",)).start()
+    assert folder.wait(timeout=5) == [tmp_path / "nuevo.wav"]
+
+def test_stop_ends_iteration(tmp_path):
+    folder = make_watcher(tmp_path)
+    threading.Timer(0.2, folder.stop).start()
+    started = time.monotonic()
+    
+    assert list(folder) == []
+    assert time.monotonic() - started < 5